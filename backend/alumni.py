@@ -0,0 +1,244 @@
+"""
+Alumni directory and per-school alumni aggregates.
+
+Alumni are users with user_type="alumni" and a school_id. The directory
+pages through them in DIRECTORY_SORT order (newest graduates first) with
+keyset cursors. The order is on directory_year, which is graduation_year
+or UNKNOWN_YEAR (listed last): range conditions skip nulls, so a cursor
+would never get past an alumnus without a year. The directory filters by
+graduation year, profession (exact, on the normalized profession_key) and
+name (each query word a prefix of one of the user's normalized
+name_terms). Only DIRECTORY_PROJECTION is returned; contact details stay
+private.
+
+alumni_stats holds one document per school:
+
+    {"_id": <school_id>, "count": n,
+     "years": {"2009": n, ...},
+     "professions": {"software engineer": n, ...},
+     "profession_labels": {"software engineer": "Software Engineer", ...}}
+
+Registrations $inc it (stats_update), so reading a school's aggregates is
+one _id lookup however many alumni it has. Every alumnus is counted
+exactly once: users carry COUNTED from the moment their $inc is owed, and
+count_alumni() only $incs users it claimed by setting that field, so it
+can run next to registrations and in several workers at once.
+rebuild_stats() recomputes every school from users with one $group; it
+replaces documents that registrations $inc, so it is only for offline
+loads (populate_mock_data.py).
+"""
+
+import re
+import uuid
+from typing import Dict, List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from normalize import normalize_key
+
+UNKNOWN_YEAR = 0
+DIRECTORY_SORT = [("directory_year", -1), ("name_key", 1), ("id", 1)]
+DIRECTORY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "school_id": 1,
+    "graduation_year": 1,
+    "profession": 1,
+    "location": 1,
+    "name_key": 1,
+    "directory_year": 1,
+}
+TOP_PROFESSIONS = 10
+# Set on a user once its alumni_stats $inc is owed: "registration" when
+# inserted by register_user, the claiming batch's token for count_alumni()
+COUNTED = "stats_counted"
+REGISTRATION = "registration"
+
+
+def is_alumnus(user: dict) -> bool:
+    return user.get("user_type") == "alumni" and bool(user.get("school_id"))
+
+
+def with_directory_keys(user: dict) -> dict:
+    """Add the normalized name and profession fields the directory indexes"""
+    user["name_key"] = normalize_key(user.get("name"))
+    user["name_terms"] = sorted(set(user["name_key"].split()))
+    year = user.get("graduation_year")
+    user["directory_year"] = int(year) if year is not None else UNKNOWN_YEAR
+    if user.get("profession"):
+        user["profession_key"] = normalize_key(user["profession"])
+    return user
+
+
+def directory_filter(school_id: str, name: Optional[str] = None, graduation_year: Optional[int] = None,
+                     year_from: Optional[int] = None, year_to: Optional[int] = None,
+                     profession: Optional[str] = None) -> dict:
+    query = {"school_id": school_id, "user_type": "alumni"}
+    # On directory_year, so the conditions are index bounds
+    if graduation_year is not None:
+        query["directory_year"] = graduation_year
+    elif year_from is not None or year_to is not None:
+        years = {"$gte": year_from} if year_from is not None else {"$gt": UNKNOWN_YEAR}
+        if year_to is not None:
+            years["$lte"] = year_to
+        query["directory_year"] = years
+    if profession:
+        query["profession_key"] = normalize_key(profession)
+    words = normalize_key(name).split() if name else []
+    if words:
+        # Anchored prefixes, so each one is an index range on name_terms
+        query["name_terms"] = {"$all": [re.compile("^" + re.escape(word)) for word in words]}
+    return query
+
+
+def stats_update(user: dict, delta: int = 1) -> Optional[dict]:
+    """$inc (and label $set) recording `user` joining (or, with -1, leaving) its school's aggregates"""
+    if not is_alumnus(user):
+        return None
+    update = {"$inc": {"count": delta}}
+    if user.get("graduation_year") is not None:
+        update["$inc"][f"years.{int(user['graduation_year'])}"] = delta
+    profession_key = normalize_key(user.get("profession"))
+    if profession_key:
+        update["$inc"][f"professions.{profession_key}"] = delta
+        update["$set"] = {f"profession_labels.{profession_key}": user["profession"]}
+    return update
+
+
+async def record_alumnus(stats, user: dict, delta: int = 1):
+    update = stats_update(user, delta)
+    if update:
+        await stats.update_one({"_id": user["school_id"]}, update, upsert=True)
+
+
+def _merge_updates(users: List[dict]) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {}
+    for user in users:
+        update = stats_update(user)
+        if not update:
+            continue
+        school = merged.setdefault(user["school_id"], {"$inc": {}})
+        for field, delta in update["$inc"].items():
+            school["$inc"][field] = school["$inc"].get(field, 0) + delta
+        if "$set" in update:
+            school.setdefault("$set", {}).update(update["$set"])
+    return merged
+
+
+async def count_alumni(users, stats, batch_size: int = 1000) -> int:
+    """$inc alumni_stats for every alumnus not counted yet; returns how many were added"""
+    counted = 0
+    projection = {"_id": 0, "id": 1, "user_type": 1, "school_id": 1, "graduation_year": 1, "profession": 1}
+    while True:
+        batch = await users.find(
+            {"user_type": "alumni", COUNTED: {"$exists": False}}, {"_id": 0, "id": 1}
+        ).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            return counted
+        # Claim first; users another worker claimed in between are its to count
+        token = uuid.uuid4().hex
+        ids = [user["id"] for user in batch]
+        await users.update_many({"id": {"$in": ids}, COUNTED: {"$exists": False}}, {"$set": {COUNTED: token}})
+        claimed = await users.find({"id": {"$in": ids}, COUNTED: token}, projection).to_list(length=batch_size)
+        merged = _merge_updates(claimed)
+        if merged:
+            await stats.bulk_write(
+                [UpdateOne({"_id": school_id}, update, upsert=True) for school_id, update in merged.items()],
+                ordered=False,
+            )
+        counted += len(claimed)
+
+
+async def adopt_legacy_counts(users, stats) -> bool:
+    """
+    Mark alumni counted by aggregates built before COUNTED existed, so
+    count_alumni() does not add them again. Only applies while nothing but
+    registrations has set COUNTED; returns whether it did.
+    """
+    if not await stats.estimated_document_count():
+        return False
+    if await users.find_one({COUNTED: {"$exists": True, "$ne": REGISTRATION}}, {"_id": 1}) is not None:
+        return False
+    await users.update_many({"user_type": "alumni", COUNTED: {"$exists": False}}, {"$set": {COUNTED: "legacy"}})
+    return True
+
+
+def present_stats(school_id: str, doc: Optional[dict], top: int = TOP_PROFESSIONS) -> dict:
+    doc = doc or {}
+    labels = doc.get("profession_labels") or {}
+    professions = sorted(
+        ((count, key) for key, count in (doc.get("professions") or {}).items() if count > 0),
+        key=lambda item: (-item[0], item[1]),
+    )
+    return {
+        "school_id": school_id,
+        "count": doc.get("count", 0),
+        "graduation_years": {
+            year: count for year, count in sorted((doc.get("years") or {}).items()) if count > 0
+        },
+        "top_professions": [
+            {"profession": labels.get(key, key), "count": count} for count, key in professions[:top]
+        ],
+    }
+
+
+async def rebuild_stats(users, stats, batch_size: int = 1000) -> int:
+    """Recompute alumni_stats for every school from users; returns the number of schools"""
+    pipeline = [
+        {"$match": {"user_type": "alumni", "school_id": {"$nin": [None, ""]}}},
+        {
+            "$group": {
+                "_id": {"school": "$school_id", "year": "$graduation_year", "profession": "$profession"},
+                "count": {"$sum": 1},
+            }
+        },
+    ]
+    schools: Dict[str, dict] = {}
+    async for row in users.aggregate(pipeline, allowDiskUse=True):
+        key = row["_id"]
+        doc = schools.setdefault(key["school"], {"count": 0, "years": {}, "professions": {}, "profession_labels": {}})
+        doc["count"] += row["count"]
+        if key.get("year") is not None:
+            year = str(int(key["year"]))
+            doc["years"][year] = doc["years"].get(year, 0) + row["count"]
+        profession_key = normalize_key(key.get("profession"))
+        if profession_key:
+            doc["professions"][profession_key] = doc["professions"].get(profession_key, 0) + row["count"]
+            doc["profession_labels"].setdefault(profession_key, key["profession"])
+
+    operations: List = []
+    for school_id, doc in schools.items():
+        operations.append(ReplaceOne({"_id": school_id}, doc, upsert=True))
+        if len(operations) >= batch_size:
+            await stats.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await stats.bulk_write(operations, ordered=False)
+    await users.update_many({"user_type": "alumni"}, {"$set": {COUNTED: "rebuild"}})
+    return len(schools)
+
+
+async def backfill_directory_keys(users, batch_size: int = 1000) -> int:
+    """Add name_key/name_terms/profession_key/directory_year to alumni written before they existed"""
+    updated = 0
+    operations = []
+    cursor = users.find(
+        {"user_type": "alumni", "directory_year": {"$exists": False}},
+        {"_id": 1, "name": 1, "profession": 1, "graduation_year": 1},
+    ).batch_size(batch_size)
+    async for user in cursor:
+        keys = with_directory_keys({
+            "name": user.get("name"), "profession": user.get("profession"), "graduation_year": user.get("graduation_year")
+        })
+        for field in ("name", "profession", "graduation_year"):
+            keys.pop(field, None)
+        operations.append(UpdateOne({"_id": user["_id"]}, {"$set": keys}))
+        if len(operations) >= batch_size:
+            result = await users.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+    if operations:
+        result = await users.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+    return updated
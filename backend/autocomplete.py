@@ -0,0 +1,211 @@
+"""
+Trie-backed type-ahead for GET /api/autocomplete.
+
+Every label is inserted under each of its word-start suffixes ("delhi
+public school", "public school", "school"), normalized with
+normalize_key(), so a query matches the start of any word. Each node keeps
+its best TOP_K entries, so a lookup is a walk down the query followed by
+reading one list. A partly typed alias ("beng" for "bengaluru") is also
+looked up under its canonical key (see normalize.prefix_keys). Writes only mark the nodes on their path dirty; a dirty
+node rebuilds its list from its own terminal entries and its children's
+lists the next time it is read.
+
+Depth is capped at MAX_DEPTH characters to bound memory; longer queries
+filter the entries of the deepest node.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+
+from normalize import normalize_key, prefix_keys
+
+TOP_K = 16
+MAX_DEPTH = 16
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "top", "dirty")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.terminal: Set[str] = set()
+        self.top: List[str] = []
+        self.dirty = False
+
+
+class Trie:
+    def __init__(self, top_k: int = TOP_K, max_depth: int = MAX_DEPTH):
+        self.top_k = top_k
+        self.max_depth = max_depth
+        self._root = _Node()
+        # entry id -> (score, label, key, payload)
+        self._entries: Dict[str, Tuple[float, str, str, dict]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _suffixes(self, key: str) -> List[str]:
+        words = key.split()
+        return [" ".join(words[i:])[: self.max_depth] for i in range(len(words))]
+
+    def _walk(self, path: str, create: bool) -> List[_Node]:
+        nodes = [self._root]
+        node = self._root
+        for ch in path:
+            child = node.children.get(ch)
+            if child is None:
+                if not create:
+                    return []
+                child = node.children[ch] = _Node()
+            node = child
+            nodes.append(node)
+        return nodes
+
+    def upsert(self, entry_id: str, label: str, score: float, payload: Optional[dict] = None):
+        self.remove(entry_id)
+        key = normalize_key(label)
+        if not key:
+            return
+        self._entries[entry_id] = (score, label, key, payload or {})
+        for suffix in self._suffixes(key):
+            nodes = self._walk(suffix, create=True)
+            nodes[-1].terminal.add(entry_id)
+            for node in nodes:
+                node.dirty = True
+
+    def remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for suffix in self._suffixes(entry[2]):
+            nodes = self._walk(suffix, create=False)
+            if not nodes:
+                continue
+            nodes[-1].terminal.discard(entry_id)
+            for node in nodes:
+                node.dirty = True
+
+    def payload(self, entry_id: str) -> Optional[dict]:
+        entry = self._entries.get(entry_id)
+        return entry[3] if entry is not None else None
+
+    def _rank(self, entry_id):
+        score, label = self._entries[entry_id][:2]
+        return (score, label)
+
+    def _top(self, node: _Node) -> List[str]:
+        if node.dirty:
+            candidates = set(node.terminal)
+            for child in node.children.values():
+                candidates.update(self._top(child))
+            candidates &= self._entries.keys()
+            node.top = heapq.nlargest(self.top_k, candidates, key=self._rank)
+            node.dirty = False
+        return node.top
+
+    def warm(self):
+        """Compute every node's list up front instead of on first read"""
+        self._top(self._root)
+
+    def complete(self, prefix: str, limit: int = 8) -> List[dict]:
+        # A partly typed alias ("beng") also walks down its canonical key
+        # ("bangalore"); the best entries of all the walks are merged
+        candidates = set()
+        for query in prefix_keys(prefix):
+            nodes = self._walk(query[: self.max_depth], create=False)
+            if not nodes:
+                continue
+            for entry_id in self._top(nodes[-1]):
+                key = self._entries[entry_id][2]
+                if len(query) > self.max_depth and not any(
+                    suffix.startswith(query) for suffix in self._full_suffixes(key)
+                ):
+                    continue
+                candidates.add(entry_id)
+        results = []
+        for entry_id in heapq.nlargest(limit, candidates, key=self._rank):
+            score, label, key, payload = self._entries[entry_id]
+            results.append({"label": label, **payload})
+        return results
+
+    @staticmethod
+    def _full_suffixes(key: str) -> List[str]:
+        words = key.split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class Autocomplete:
+    """City and school-name tries kept in step with the schools collection"""
+
+    def __init__(self):
+        self.cities = Trie()
+        self.schools = Trie()
+        # city_key -> [display label, school count]
+        self._city_counts: Dict[str, list] = {}
+
+    @staticmethod
+    def _school_score(school: dict) -> float:
+        return float(school.get("rating") or 0.0) * 1000 + min(int(school.get("reviews_count") or 0), 999)
+
+    @classmethod
+    async def build(cls, collection, batch_size: int = 5000):
+        autocomplete = cls()
+        projection = {"_id": 0, "id": 1, "name": 1, "location.city": 1, "rating": 1, "reviews_count": 1}
+        async for school in collection.find({}, projection).batch_size(batch_size):
+            autocomplete._add_school(school)
+            city = (school.get("location") or {}).get("city")
+            key = normalize_key(city)
+            if key:
+                autocomplete._city_counts.setdefault(key, [city, 0])[1] += 1
+        for key, (label, count) in autocomplete._city_counts.items():
+            autocomplete.cities.upsert(key, label, count, {"count": count})
+        autocomplete.cities.warm()
+        autocomplete.schools.warm()
+        return autocomplete
+
+    def _adjust_city(self, city: Optional[str], delta: int):
+        key = normalize_key(city)
+        if not key:
+            return
+        label, count = self._city_counts.get(key, [city, 0])
+        count += delta
+        if count <= 0:
+            self._city_counts.pop(key, None)
+            self.cities.remove(key)
+            return
+        self._city_counts[key] = [label, count]
+        self.cities.upsert(key, label, count, {"count": count})
+
+    def apply_write(self, school: Optional[dict], previous: Optional[dict]):
+        # The city is taken from the indexed entry rather than `previous`, so
+        # applying a write the index already reflects (a replay after a
+        # rebuild) leaves the counts unchanged
+        indexed = self.schools.payload((school or previous or {}).get("id"))
+        if indexed is not None:
+            self._adjust_city(indexed.get("city"), -1)
+            self.schools.remove(indexed["id"])
+        if school:
+            self._adjust_city((school.get("location") or {}).get("city"), 1)
+            self._add_school(school)
+
+    def _add_school(self, school: dict):
+        self.schools.upsert(
+            school["id"],
+            school.get("name") or "",
+            self._school_score(school),
+            {"id": school["id"], "city": (school.get("location") or {}).get("city")},
+        )
+
+    def complete(self, prefix: str, kind: str = "all", limit: int = 8) -> dict:
+        response = {}
+        if kind in ("all", "city"):
+            response["cities"] = [
+                {"city": entry["label"], "count": entry["count"]}
+                for entry in self.cities.complete(prefix, limit)
+            ]
+        if kind in ("all", "school"):
+            response["schools"] = [
+                {"id": entry["id"], "name": entry["label"], "city": entry["city"]}
+                for entry in self.schools.complete(prefix, limit)
+            ]
+        return response
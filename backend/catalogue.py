@@ -0,0 +1,318 @@
+"""
+Columnar in-memory snapshot of the school list filters (SCHOOL_CATALOGUE=1).
+
+Each worker keeps the fields GET /api/schools filters and sorts on in NumPy
+columns: type, board and city_key as integer codes, annual fee, rating,
+reviews_count, established_year and the ObjectId split into two integers
+for the _id tie-break. A listing is a vectorized boolean mask over those
+columns; the count is the mask's sum, and the page is read off a cached
+sort permutation (rows in sort order, one per sort spec), so only the
+page's ids go to MongoDB. A permutation is sorted once, off the event
+loop for the specs passed to run(), and then patched in place: a new or
+re-ranked row is moved to its binary-searched position, and removed rows
+stay in it but are masked out.
+
+Filter semantics follow build_school_filter exactly, including Mongo's
+ordering of missing values (lowest, so first ascending and last
+descending) and fee ranges never matching schools without a fee.
+
+The snapshot is loaded once, then refresh() pulls only schools whose
+updated_at is at or after the watermark (less WATERMARK_OVERLAP, for clock
+skew between writers), so listings never scan the collection. Writes made
+by this worker are applied at once through the school write hooks.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from normalize import matches_city, normalize_key
+
+logger = logging.getLogger("schooldekho.catalogue")
+
+CATALOGUE_PROJECTION = {
+    "_id": 1,
+    "id": 1,
+    "type": 1,
+    "board": 1,
+    "location.city": 1,
+    "location.city_key": 1,
+    "fees.annual_fee": 1,
+    "rating": 1,
+    "reviews_count": 1,
+    "established_year": 1,
+    "updated_at": 1,
+}
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+# Sort field -> numeric column; missing values are stored as -inf
+SORT_COLUMNS = {
+    "rating": "ratings",
+    "reviews_count": "reviews",
+    "fees.annual_fee": "fees",
+    "established_year": "established",
+}
+# Ordering columns; a write that leaves these alone keeps the cached sort permutations
+ORDER_COLUMNS = ("fees", "ratings", "reviews", "established", "oid_high", "oid_low")
+COLUMNS = ("types", "boards", "cities", "alive") + ORDER_COLUMNS
+MISSING = {"fees": -np.inf, "ratings": -np.inf, "reviews": -np.inf, "established": -np.inf}
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else -np.inf
+
+
+def _oid_parts(value) -> Tuple[int, int]:
+    if isinstance(value, ObjectId):
+        binary = value.binary
+        return int.from_bytes(binary[:4], "big"), int.from_bytes(binary[4:], "big")
+    # Other _id types fall back to a stable but arbitrary order
+    return 0, hash(str(value)) & 0x7FFFFFFFFFFFFFFF
+
+
+class SchoolCatalogue:
+    def __init__(self, capacity: int = 1024):
+        self.types = np.zeros(capacity, dtype=np.int16)
+        self.boards = np.zeros(capacity, dtype=np.int16)
+        self.cities = np.zeros(capacity, dtype=np.int32)
+        self.fees = np.full(capacity, -np.inf)
+        self.ratings = np.full(capacity, -np.inf)
+        self.reviews = np.full(capacity, -np.inf)
+        self.established = np.full(capacity, -np.inf)
+        self.oid_high = np.zeros(capacity, dtype=np.uint32)
+        self.oid_low = np.zeros(capacity, dtype=np.uint64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.type_codes: Dict[str, int] = {}
+        self.board_codes: Dict[str, int] = {}
+        self.city_codes: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        # tuple(sort_spec) -> permutation of the rows
+        self._orders: Dict[tuple, np.ndarray] = {}
+        # Bumped by every upsert; a permutation sorted in a thread is only
+        # kept if no row changed meanwhile
+        self._version = 0
+        self.watermark: Optional[datetime] = None
+        self.ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _grow(self):
+        capacity = len(self.alive) * 2
+        for name in COLUMNS:
+            old = getattr(self, name)
+            new = np.full(capacity, MISSING.get(name, 0), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def upsert(self, school: dict):
+        row = self.rows.get(school["id"])
+        if row is None:
+            row = len(self.ids)
+            if row == len(self.alive):
+                self._grow()
+            self.ids.append(school["id"])
+            self.rows[school["id"]] = row
+            before = None
+        else:
+            before = [getattr(self, name)[row] for name in ORDER_COLUMNS]
+        self._version += 1
+        location = school.get("location") or {}
+        city_key = location.get("city_key") or normalize_key(location.get("city"))
+        self.types[row] = self.type_codes.setdefault(school.get("type") or "", len(self.type_codes))
+        self.boards[row] = self.board_codes.setdefault(school.get("board") or "", len(self.board_codes))
+        self.cities[row] = self.city_codes.setdefault(city_key, len(self.city_codes))
+        self.fees[row] = _number((school.get("fees") or {}).get("annual_fee"))
+        self.ratings[row] = _number(school.get("rating"))
+        self.reviews[row] = _number(school.get("reviews_count"))
+        self.established[row] = _number(school.get("established_year"))
+        if "_id" in school:
+            self.oid_high[row], self.oid_low[row] = _oid_parts(school["_id"])
+        self.alive[row] = True
+        updated_at = school.get("updated_at")
+        if isinstance(updated_at, datetime) and (self.watermark is None or updated_at > self.watermark):
+            self.watermark = updated_at
+        # Watermark refreshes re-read recent schools; unchanged ones keep their place
+        if before is None or before != [getattr(self, name)[row] for name in ORDER_COLUMNS]:
+            for spec, order in self._orders.items():
+                self._orders[spec] = self._place(spec, order, row, moved=before is not None)
+
+    def remove(self, school_id: str):
+        row = self.rows.pop(school_id, None)
+        if row is not None:
+            # The row keeps its place in the permutations; the mask skips it
+            self.alive[row] = False
+
+    async def load(self, collection, batch_size: int = 5000, sort_specs=()):
+        started_at = datetime.now()
+        async for school in collection.find({}, CATALOGUE_PROJECTION).batch_size(batch_size):
+            self.upsert(school)
+        # Schools without updated_at still need a starting point for refreshes
+        if self.watermark is None:
+            self.watermark = started_at
+        await self.warm(sort_specs)
+        self.ready = True
+
+    async def refresh(self, collection, batch_size: int = 5000) -> int:
+        """Apply schools changed since the watermark; returns how many were read"""
+        if self.watermark is None:
+            return 0
+        changed = 0
+        query = {"updated_at": {"$gte": self.watermark - WATERMARK_OVERLAP}}
+        async for school in collection.find(query, CATALOGUE_PROJECTION).batch_size(batch_size):
+            self.upsert(school)
+            changed += 1
+        return changed
+
+    async def run(self, collection, refresh_interval: float = 2.0, sort_specs=()):
+        """Background loop: initial load and sorts, then watermark refreshes"""
+        while not self.ready:
+            try:
+                started = time.perf_counter()
+                await self.load(collection, sort_specs=sort_specs)
+                logger.info("School catalogue loaded %d schools in %.1fs", len(self), time.perf_counter() - started)
+            except Exception as e:
+                logger.error("School catalogue load failed: %s", e)
+                await asyncio.sleep(refresh_interval)
+        while True:
+            await asyncio.sleep(refresh_interval)
+            try:
+                await self.refresh(collection)
+            except Exception as e:
+                logger.error("School catalogue refresh failed: %s", e)
+
+    def _mask(self, used: int, school_type, board, city, city_match, min_fee, max_fee) -> np.ndarray:
+        mask = self.alive[:used].copy()
+        if school_type:
+            mask &= self.types[:used] == self.type_codes.get(school_type, -1)
+        if board:
+            mask &= self.boards[:used] == self.board_codes.get(board, -1)
+        if city:
+            if city_match == "exact":
+                mask &= self.cities[:used] == self.city_codes.get(normalize_key(city), -1)
+            else:
+                codes = [code for city_key, code in self.city_codes.items() if matches_city(city_key, city)]
+                mask &= np.isin(self.cities[:used], codes)
+        # Same truthiness as build_school_filter: a fee bound of 0 is no bound
+        if min_fee:
+            mask &= self.fees[:used] >= min_fee
+        if max_fee:
+            mask &= self.fees[:used] <= max_fee
+        if min_fee or max_fee:
+            mask &= np.isfinite(self.fees[:used])
+        return mask
+
+    def _sort(self, sort_spec: Sequence[Tuple[str, int]], used: int) -> np.ndarray:
+        keys = []
+        for field, direction in sort_spec:
+            if field == "_id":
+                columns = [self.oid_high[:used].astype(np.float64), self.oid_low[:used]]
+            else:
+                columns = [getattr(self, SORT_COLUMNS[field])[:used]]
+            for column in columns:
+                if direction < 0:
+                    column = -column.astype(np.float64) if column.dtype != np.uint64 else np.iinfo(np.uint64).max - column
+                keys.append(column)
+        # np.lexsort sorts by the last key first and is stable, so ties
+        # stay in row order
+        return np.lexsort(keys[::-1])
+
+    def _order(self, sort_spec: Sequence[Tuple[str, int]]) -> np.ndarray:
+        spec = tuple(sort_spec)
+        order = self._orders.get(spec)
+        if order is None:
+            order = self._orders[spec] = self._sort(spec, len(self.ids))
+        return order
+
+    def _rank(self, spec, row: int) -> tuple:
+        """Row's sort key, ascending in permutation order (the same order _sort produces)"""
+        key = []
+        for field, direction in spec:
+            if field == "_id":
+                values = [int(self.oid_high[row]), int(self.oid_low[row])]
+            else:
+                values = [float(getattr(self, SORT_COLUMNS[field])[row])]
+            key.extend(value if direction > 0 else -value for value in values)
+        key.append(row)
+        return tuple(key)
+
+    def _position(self, spec, order: np.ndarray, row: int) -> int:
+        rank = self._rank(spec, row)
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._rank(spec, int(order[middle])) < rank:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _place(self, spec, order: np.ndarray, row: int, moved: bool) -> np.ndarray:
+        """`order` with `row` (re)inserted at its binary-searched position"""
+        if not moved:
+            return np.insert(order, self._position(spec, order, row), row)
+        # Shift within the array rather than copying it: close the row's old
+        # slot, then open one at its new position
+        last = len(order) - 1
+        old = int(np.flatnonzero(order == row)[0])
+        order[old:last] = order[old + 1:]
+        new = self._position(spec, order[:last], row)
+        order[new + 1:] = order[new:last]
+        order[new] = row
+        return order
+
+    async def warm(self, sort_specs: Sequence[Sequence[Tuple[str, int]]]):
+        """Sort the permutations for `sort_specs` in a thread instead of on a request"""
+        for sort_spec in sort_specs:
+            spec = tuple(sort_spec)
+            while spec not in self._orders:
+                version, used = self._version, len(self.ids)
+                order = await asyncio.to_thread(self._sort, spec, used)
+                if version == self._version:
+                    self._orders[spec] = order
+
+    def query(self, sort_spec: Sequence[Tuple[str, int]], offset: int, limit: int, school_type=None, board=None,
+              city=None, city_match="prefix", min_fee=None, max_fee=None) -> Tuple[List[str], int]:
+        """(school ids of the page, total matches)"""
+        self.hits += 1
+        used = len(self.ids)
+        mask = self._mask(used, school_type, board, city, city_match, min_fee, max_fee)
+        total = int(np.count_nonzero(mask))
+        if offset >= total:
+            return [], total
+        order = self._order(sort_spec)
+        # Walk the permutation only as far as the page needs, guessing the
+        # distance from the match density and widening when it falls short
+        needed = offset + limit
+        span = min(used, max(4096, int(needed * used / total * 1.5)))
+        while True:
+            head = order[:span]
+            matched = head[mask[head]]
+            if len(matched) >= needed or span >= used:
+                break
+            span = min(used, span * 4)
+        return [self.ids[row] for row in matched[offset:offset + limit]], total
+
+    def count(self, school_type=None, board=None, city=None, city_match="prefix", min_fee=None, max_fee=None) -> int:
+        self.hits += 1
+        return int(np.count_nonzero(self._mask(len(self.ids), school_type, board, city, city_match, min_fee, max_fee)))
+
+    def supports(self, sort_spec: Sequence[Tuple[str, int]]) -> bool:
+        return all(field == "_id" or field in SORT_COLUMNS for field, _ in sort_spec)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
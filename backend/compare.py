@@ -0,0 +1,109 @@
+"""
+Comparison matrix for POST /api/schools/compare.
+
+Schools are fetched in one $in query and the differences the compare page
+needs (fee deltas, shared/unique facilities, rating rank, which plain
+fields differ) are computed here so the client only renders them.
+"""
+
+from typing import Dict, List
+
+MAX_COMPARE = 10
+
+COMPARE_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "type": 1,
+    "board": 1,
+    "location": 1,
+    "fees": 1,
+    "facilities": 1,
+    "rating": 1,
+    "reviews_count": 1,
+    "established_year": 1,
+    "images": 1,
+    "contact": 1,
+    "admission_info": 1,
+    "website": 1,
+}
+
+FEE_FIELDS = ("annual_fee", "admission_fee")
+PLAIN_FIELDS = {
+    "type": lambda school: school.get("type"),
+    "board": lambda school: school.get("board"),
+    "city": lambda school: (school.get("location") or {}).get("city"),
+    "established_year": lambda school: school.get("established_year"),
+    "reviews_count": lambda school: school.get("reviews_count"),
+}
+
+
+def order_by_request(school_ids: List[str], schools: List[dict]) -> List[dict]:
+    by_id = {school["id"]: school for school in schools}
+    return [by_id[school_id] for school_id in school_ids if school_id in by_id]
+
+
+def _fee_comparison(schools: List[dict]) -> Dict[str, dict]:
+    comparison = {}
+    for field in FEE_FIELDS:
+        values = [(school.get("fees") or {}).get(field) for school in schools]
+        known = [value for value in values if value is not None]
+        lowest = min(known) if known else None
+        comparison[field] = {
+            "values": values,
+            "min": lowest,
+            "max": max(known) if known else None,
+            "delta_from_min": [
+                value - lowest if value is not None and lowest is not None else None
+                for value in values
+            ],
+        }
+    return comparison
+
+
+def _facility_comparison(schools: List[dict]) -> dict:
+    # Match facilities case-insensitively but report the first spelling seen
+    labels: Dict[str, str] = {}
+    per_school = []
+    for school in schools:
+        keys = set()
+        for facility in school.get("facilities") or []:
+            key = facility.strip().casefold()
+            labels.setdefault(key, facility.strip())
+            keys.add(key)
+        per_school.append(keys)
+
+    shared = set.intersection(*per_school) if per_school else set()
+    counts: Dict[str, int] = {}
+    for keys in per_school:
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+    ordered = sorted(labels, key=lambda key: (-counts[key], labels[key]))
+    return {
+        "shared": [labels[key] for key in ordered if key in shared],
+        "unique": {
+            school["id"]: [labels[key] for key in ordered if key in keys and counts[key] == 1]
+            for school, keys in zip(schools, per_school)
+        },
+        "matrix": {labels[key]: [key in keys for keys in per_school] for key in ordered},
+    }
+
+
+def _rating_rank(schools: List[dict]) -> List[int]:
+    """Competition ranking: 1 is best, ties share a rank"""
+    ratings = [school.get("rating") or 0.0 for school in schools]
+    return [1 + sum(other > rating for other in ratings) for rating in ratings]
+
+
+def build_comparison(schools: List[dict]) -> dict:
+    plain = {}
+    for field, value_of in PLAIN_FIELDS.items():
+        values = [value_of(school) for school in schools]
+        plain[field] = {"values": values, "differs": len(set(map(repr, values))) > 1}
+    return {
+        "school_ids": [school["id"] for school in schools],
+        "fees": _fee_comparison(schools),
+        "facilities": _facility_comparison(schools),
+        "rating_rank": _rating_rank(schools),
+        "fields": plain,
+    }
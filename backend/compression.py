@@ -0,0 +1,115 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Only complete (non-streaming) responses of a compressible type and at
+least MIN_SIZE bytes are compressed. Brotli is preferred when the client
+accepts it and the brotli package is installed; otherwise gzip is used.
+Responses that already carry a Content-Encoding (the export stream
+compresses itself) are passed through untouched.
+"""
+
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+MIN_SIZE = 1024
+COMPRESSIBLE = ("application/json", "text/", "application/x-ndjson")
+GZIP_LEVEL = 5
+# Fast brotli setting for per-request compression of dynamic JSON
+BROTLI_QUALITY = 4
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start is None:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._should_compress(start, body):
+                # Streaming or not worth it: release the held start message and pass through
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            compressed = compress(body, encoding)
+            headers = [
+                (name, value) for name, value in start["headers"] if name not in (b"content-length", b"vary", b"etag")
+            ]
+            for name, value in start["headers"]:
+                if name == b"etag":
+                    # The encoded bytes differ, so the validator becomes weak
+                    headers.append((name, value if value.startswith(b"W/") else b"W/" + value))
+            vary = [value for name, value in start["headers"] if name == b"vary"]
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+            headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(compressed)).encode()))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, start, body: bytes) -> bool:
+        if len(body) < self.minimum_size or start["status"] in (204, 206, 304):
+            return False
+        content_type = b""
+        for name, value in start["headers"]:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(COMPRESSIBLE)
@@ -0,0 +1,162 @@
+"""
+Coordination between the worker processes started by serve.py.
+
+Each worker keeps its own in-memory school state (search index,
+autocomplete trie, similar-schools matrix, catalogue, detail cache),
+maintained by the school write hooks, but a write only runs the hooks of
+the worker that served it. SchoolChangeFeed records every school write in
+school_changes, with the documents before and after, and each worker
+polls the log and replays the other workers' writes through its own
+hooks. Entries are stamped with the database server's clock
+($currentDate), so worker clocks and time zones never order the log.
+Reads start OVERLAP before the newest entry seen, so entries that commit
+slightly out of order are still picked up; the ids applied within that
+window are remembered so none is replayed twice. A TTL index (indexes.py)
+expires entries after a day.
+
+Lease makes a startup job (backfills, aggregate rebuilds) run in one
+worker per TTL: the first worker to claim the lease document runs the job
+and the others skip it. A finished job keeps its lease (marked completed)
+until it expires, so workers starting later in the window do not run it
+again; a failed job releases it for the next worker. Leases expire, so a
+worker that dies mid-job does not block the next start.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger("schooldekho.coordination")
+
+OVERLAP = timedelta(seconds=5)
+# Watermark before the first entry; BSON dates come back naive UTC
+EPOCH = datetime(1970, 1, 1)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class SchoolChangeFeed:
+    def __init__(self, collection, apply: Callable[[str, Optional[dict], Optional[dict]], Awaitable[None]],
+                 origin: Optional[str] = None, interval: float = 1.0):
+        self.collection = collection
+        self.apply = apply
+        self.origin = origin or worker_id()
+        self.interval = interval
+        self.watermark: Optional[datetime] = None
+        # entry _id -> at, for the entries inside the overlap window
+        self._applied: Dict[object, datetime] = {}
+        self.recorded = 0
+        self.replayed = 0
+
+    async def start(self):
+        """Replay only writes logged from now on; call before building the in-memory state"""
+        self.watermark = EPOCH
+        self._applied = {}
+        newest = await self.collection.find_one({}, {"at": 1}, sort=[("at", -1)])
+        if newest is not None:
+            self.watermark = newest["at"]
+            # Everything already logged is covered by the state about to be built
+            await self._read(replay=False)
+
+    async def record(self, school_id: str, school: Optional[dict], previous: Optional[dict]):
+        # An upsert so the server can stamp `at`; insert_one cannot use $currentDate
+        await self.collection.update_one(
+            {"_id": ObjectId()},
+            {
+                "$setOnInsert": {
+                    "school_id": school_id,
+                    "school": school,
+                    "previous": previous,
+                    "origin": self.origin,
+                },
+                "$currentDate": {"at": True},
+            },
+            upsert=True,
+        )
+        self.recorded += 1
+
+    async def poll(self) -> int:
+        """Replay other workers' writes since the watermark; returns how many were applied"""
+        if self.watermark is None:
+            await self.start()
+        return await self._read(replay=True)
+
+    async def _read(self, replay: bool) -> int:
+        applied = 0
+        query = {"at": {"$gte": self.watermark - OVERLAP}}
+        async for entry in self.collection.find(query).sort([("at", 1), ("_id", 1)]):
+            if entry["_id"] in self._applied:
+                continue
+            self._applied[entry["_id"]] = entry["at"]
+            if entry["at"] > self.watermark:
+                self.watermark = entry["at"]
+            if not replay or entry.get("origin") == self.origin:
+                continue
+            await self.apply(entry["school_id"], entry.get("school"), entry.get("previous"))
+            applied += 1
+        horizon = self.watermark - OVERLAP
+        self._applied = {key: at for key, at in self._applied.items() if at >= horizon}
+        self.replayed += applied
+        return applied
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error("School change feed poll failed: %s", e)
+
+    def stats(self) -> dict:
+        return {"recorded": self.recorded, "replayed": self.replayed}
+
+
+class Lease:
+    def __init__(self, collection, holder: Optional[str] = None):
+        self.collection = collection
+        self.holder = holder or worker_id()
+
+    async def acquire(self, name: str, ttl: timedelta) -> bool:
+        # UTC, so workers on hosts in different time zones agree on expiry
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches only an expired lease; otherwise the upsert collides on _id
+            await self.collection.update_one(
+                {"_id": name, "expires_at": {"$lt": now}},
+                {"$set": {"holder": self.holder, "acquired_at": now, "expires_at": now + ttl}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def release(self, name: str):
+        await self.collection.delete_one({"_id": name, "holder": self.holder})
+
+    async def complete(self, name: str):
+        """Keep the lease until it expires, marked as done"""
+        await self.collection.update_one(
+            {"_id": name, "holder": self.holder}, {"$set": {"completed_at": datetime.now(timezone.utc)}}
+        )
+
+    async def run_once(self, name: str, job: Callable[[], Awaitable[None]], ttl: timedelta = timedelta(hours=1)) -> bool:
+        """Run `job` unless another worker holds the lease or ran it within `ttl`; returns whether it ran"""
+        if not await self.acquire(name, ttl):
+            logger.info("Skipping %s; another worker is running or has run it", name)
+            return False
+        try:
+            await job()
+        except BaseException:
+            await self.release(name)
+            raise
+        await self.complete(name)
+        return True
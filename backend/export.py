@@ -0,0 +1,120 @@
+"""
+Streaming catalogue export for GET /api/schools/export.
+
+Documents are read from a Motor cursor batch by batch and written out as
+NDJSON or CSV in ~64 KB chunks. StreamingResponse only pulls the next chunk
+once the previous one has been sent, so a slow client throttles the cursor
+and memory stays constant regardless of catalogue size.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 1000
+
+# The public School fields only; derived and internal fields (translations,
+# location.geo, location.city_key, ...) stay out of the export
+EXPORT_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "type": 1,
+    "board": 1,
+    "location.city": 1,
+    "location.state": 1,
+    "location.address": 1,
+    "fees": 1,
+    "facilities": 1,
+    "description": 1,
+    "images": 1,
+    "contact": 1,
+    "admission_info": 1,
+    "rating": 1,
+    "reviews_count": 1,
+    "established_year": 1,
+    "website": 1,
+    "updated_at": 1,
+}
+
+CSV_COLUMNS = {
+    "id": lambda school: school.get("id"),
+    "name": lambda school: school.get("name"),
+    "type": lambda school: school.get("type"),
+    "board": lambda school: school.get("board"),
+    "city": lambda school: (school.get("location") or {}).get("city"),
+    "state": lambda school: (school.get("location") or {}).get("state"),
+    "address": lambda school: (school.get("location") or {}).get("address"),
+    "annual_fee": lambda school: (school.get("fees") or {}).get("annual_fee"),
+    "admission_fee": lambda school: (school.get("fees") or {}).get("admission_fee"),
+    "rating": lambda school: school.get("rating"),
+    "reviews_count": lambda school: school.get("reviews_count"),
+    "established_year": lambda school: school.get("established_year"),
+    "website": lambda school: school.get("website"),
+    "facilities": lambda school: "|".join(school.get("facilities") or []),
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def ndjson_lines(cursor) -> AsyncIterator[str]:
+    async for school in cursor:
+        yield json.dumps(jsonable_encoder(school), separators=(",", ":")) + "\n"
+
+
+async def csv_lines(cursor) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    async for school in cursor:
+        writer.writerow(["" if (value := column(school)) is None else value for column in CSV_COLUMNS.values()])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def chunked(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    parts, size = [], 0
+    async for line in lines:
+        data = line.encode()
+        parts.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+async def gzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(collection, filter_query: dict, fmt: str, gzip: bool) -> AsyncIterator[bytes]:
+    cursor = collection.find(filter_query, EXPORT_PROJECTION).sort("_id", 1).batch_size(BATCH_SIZE)
+    lines = csv_lines(cursor) if fmt == "csv" else ndjson_lines(cursor)
+    stream = chunked(lines)
+    return gzipped(stream) if gzip else stream
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
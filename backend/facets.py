@@ -0,0 +1,147 @@
+"""
+Facet counts behind GET /api/filters/options.
+
+All facets (type, board, city, annual-fee buckets) come from a single
+$facet aggregation. The result is kept in memory and patched in place on
+school writes; a TTL bounds staleness from writes that bypass the API
+(bulk loaders, manual fixes).
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+# Annual fee bucket boundaries; the last bucket is open-ended
+FEE_BUCKETS = [0, 25000, 50000, 100000, 200000, 500000, 1000000]
+_FEE_CEILING = 10 ** 12
+
+FACET_FIELDS = {
+    "school_types": "$type",
+    "boards": "$board",
+    "cities": "$location.city",
+}
+
+
+def facet_pipeline():
+    facets = {
+        name: [
+            {"$match": {field[1:]: {"$nin": [None, ""]}}},
+            {"$group": {"_id": field, "count": {"$sum": 1}}},
+        ]
+        for name, field in FACET_FIELDS.items()
+    }
+    facets["fee_ranges"] = [
+        {"$match": {"fees.annual_fee": {"$type": "number"}}},
+        {
+            "$bucket": {
+                "groupBy": "$fees.annual_fee",
+                "boundaries": FEE_BUCKETS + [_FEE_CEILING],
+                "default": "other",
+                "output": {"count": {"$sum": 1}},
+            }
+        },
+    ]
+    return [{"$facet": facets}]
+
+
+def _fee_bucket(fee) -> Optional[int]:
+    if not isinstance(fee, (int, float)) or fee < 0:
+        return None
+    bucket = None
+    for boundary in FEE_BUCKETS:
+        if fee >= boundary:
+            bucket = boundary
+    return bucket
+
+
+def _school_values(school: Optional[dict]) -> Dict[str, object]:
+    if not school:
+        return {}
+    return {
+        "school_types": school.get("type"),
+        "boards": school.get("board"),
+        "cities": (school.get("location") or {}).get("city"),
+        "fee_ranges": _fee_bucket((school.get("fees") or {}).get("annual_fee")),
+    }
+
+
+class FacetCache:
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.version = 0
+        self._counts: Optional[Dict[str, Dict[object, int]]] = None
+        self._rendered: Optional[dict] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, collection) -> dict:
+        if self._counts is not None and self._expires_at > time.monotonic():
+            self.hits += 1
+            return self._response()
+        async with self._lock:
+            # Another request may have refreshed while we waited
+            if self._counts is None or self._expires_at <= time.monotonic():
+                self.misses += 1
+                await self.refresh(collection)
+            else:
+                self.hits += 1
+        return self._response()
+
+    async def refresh(self, collection):
+        results = await collection.aggregate(facet_pipeline()).to_list(length=1)
+        facets = results[0] if results else {}
+        counts = {
+            name: {row["_id"]: row["count"] for row in facets.get(name, [])}
+            for name in list(FACET_FIELDS) + ["fee_ranges"]
+        }
+        counts["fee_ranges"].pop("other", None)
+        self._counts = counts
+        self._expires_at = time.monotonic() + self.ttl
+        self.version += 1
+
+    def invalidate(self):
+        self._counts = None
+        self.version += 1
+
+    def apply_write(self, school: Optional[dict], previous: Optional[dict]):
+        """Patch counts for one school insert/update/delete"""
+        if self._counts is None:
+            return
+        for name, value in _school_values(previous).items():
+            if value is None:
+                continue
+            remaining = self._counts[name].get(value, 0) - 1
+            if remaining > 0:
+                self._counts[name][value] = remaining
+            else:
+                self._counts[name].pop(value, None)
+        for name, value in _school_values(school).items():
+            if value is not None and value != "":
+                self._counts[name][value] = self._counts[name].get(value, 0) + 1
+        self.version += 1
+
+    def _response(self) -> dict:
+        if self._rendered is not None and self._rendered["version"] == self.version:
+            return self._rendered
+        counts = self._counts
+        response = {name: sorted(counts[name]) for name in FACET_FIELDS}
+        response["counts"] = {name: dict(counts[name]) for name in FACET_FIELDS}
+        boundaries = FEE_BUCKETS + [None]
+        response["fee_ranges"] = [
+            {"min": low, "max": high, "count": counts["fee_ranges"].get(low, 0)}
+            for low, high in zip(boundaries, boundaries[1:])
+        ]
+        response["version"] = self.version
+        self._rendered = response
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": 0 if self._counts is None else 1,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
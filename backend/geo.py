@@ -0,0 +1,117 @@
+"""
+School coordinates and the "schools near me" query.
+
+Schools carry a GeoJSON point at location.geo, indexed 2dsphere (see
+indexes.py). Schools written without coordinates, or loaded before this
+field existed, get their city's centroid and are marked with
+geo_source="city_centroid" so clients can tell approximate positions apart.
+"""
+
+import math
+from typing import Optional
+
+# (lat, lng) city centroids used to backfill schools without coordinates
+CITY_COORDINATES = {
+    "Delhi": (28.6139, 77.2090),
+    "New Delhi": (28.6139, 77.2090),
+    "Mumbai": (19.0760, 72.8777),
+    "Bangalore": (12.9716, 77.5946),
+    "Bengaluru": (12.9716, 77.5946),
+    "Hyderabad": (17.3850, 78.4867),
+    "Chennai": (13.0827, 80.2707),
+    "Kolkata": (22.5726, 88.3639),
+    "Pune": (18.5204, 73.8567),
+    "Ahmedabad": (23.0225, 72.5714),
+    "Jaipur": (26.9124, 75.7873),
+    "Lucknow": (26.8467, 80.9462),
+    "Kochi": (9.9312, 76.2673),
+    "Chandigarh": (30.7333, 76.7794),
+    "Bhopal": (23.2599, 77.4126),
+    "Dehradun": (30.3165, 78.0322),
+    "Coimbatore": (11.0168, 76.9558),
+    "Noida": (28.5355, 77.3910),
+    "Gurgaon": (28.4595, 77.0266),
+    "Indore": (22.7196, 75.8577),
+    "Nagpur": (21.1458, 79.0882),
+    "Thiruvananthapuram": (8.5241, 76.9366),
+    "Visakhapatnam": (17.6868, 83.2185),
+    "Mysore": (12.2958, 76.6394),
+}
+
+MAX_RADIUS_KM = 100
+
+
+def point(lat: float, lng: float) -> dict:
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def validate_coordinates(location: dict) -> dict:
+    """Check optional location lat/lng (School model); raises ValueError, which the API turns into a 422"""
+    lat, lng = location.get("lat"), location.get("lng")
+    if lat is None and lng is None:
+        return location
+    if lat is None or lng is None:
+        raise ValueError("location.lat and location.lng must be given together")
+    for name, value, bound in (("lat", lat, 90), ("lng", lng, 180)):
+        if isinstance(value, bool):
+            raise ValueError(f"location.{name} must be a number")
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"location.{name} must be a number")
+        if not math.isfinite(value) or not -bound <= value <= bound:
+            raise ValueError(f"location.{name} must be between -{bound} and {bound}")
+        location[name] = value
+    return location
+
+
+def with_coordinates(school: dict) -> dict:
+    """Set location.geo from explicit lat/lng, else from the city centroid"""
+    location = school.get("location")
+    if not isinstance(location, dict):
+        return school
+    lat, lng = location.pop("lat", None), location.pop("lng", None)
+    if lat is not None and lng is not None:
+        location["geo"] = point(float(lat), float(lng))
+        location["geo_source"] = "exact"
+    elif not location.get("geo"):
+        centroid = CITY_COORDINATES.get((location.get("city") or "").strip().title())
+        if centroid:
+            location["geo"] = point(*centroid)
+            location["geo_source"] = "city_centroid"
+    return school
+
+
+async def backfill_coordinates(collection) -> int:
+    """Give every school without location.geo its city centroid; returns documents updated"""
+    updated = 0
+    for city, (lat, lng) in CITY_COORDINATES.items():
+        result = await collection.update_many(
+            {"location.city": city, "location.geo": {"$exists": False}},
+            {"$set": {"location.geo": point(lat, lng), "location.geo_source": "city_centroid"}},
+        )
+        updated += result.modified_count
+    return updated
+
+
+def nearby_pipeline(lat: float, lng: float, radius_km: float, filter_query: dict, limit: int, skip: int = 0,
+                    projection: Optional[dict] = None):
+    pipeline = [
+        {
+            "$geoNear": {
+                "near": point(lat, lng),
+                "distanceField": "distance_km",
+                "distanceMultiplier": 0.001,
+                "maxDistance": radius_km * 1000,
+                "query": filter_query,
+                "spherical": True,
+                "key": "location.geo",
+            }
+        },
+    ]
+    if skip:
+        pipeline.append({"$skip": skip})
+    pipeline.append({"$limit": limit})
+    if projection:
+        pipeline.append({"$project": projection})
+    return pipeline
@@ -0,0 +1,75 @@
+"""
+Conditional-GET helpers for cached JSON documents.
+
+A rendered entry holds the response body together with its validators, so
+a cache hit can answer both a full GET and a 304 without touching MongoDB.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from serialization import dumps
+
+CACHE_CONTROL = "no-cache"
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if not isinstance(value, datetime):
+        return None
+    # Documents store naive datetimes; the API writes them in server time,
+    # which deployments run as UTC.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def render_entry(doc: dict) -> dict:
+    body = dumps(doc)
+    last_modified = _as_utc(doc.get("updated_at") or doc.get("created_at"))
+    return {
+        "body": body,
+        "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+        "last_modified": last_modified,
+    }
+
+
+def entry_headers(entry: dict) -> dict:
+    headers = {"ETag": entry["etag"], "Cache-Control": CACHE_CONTROL}
+    if entry["last_modified"] is not None:
+        headers["Last-Modified"] = format_datetime(entry["last_modified"], usegmt=True)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+
+def is_not_modified(request: Request, entry: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, entry["etag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and entry["last_modified"] is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return entry["last_modified"] <= since
+    return False
+
+
+def conditional_response(request: Request, entry: dict) -> Response:
+    headers = entry_headers(entry)
+    if is_not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
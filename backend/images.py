@@ -0,0 +1,354 @@
+"""
+Responsive derivatives of school photos.
+
+Each source URL in School.images is fetched once and stored under the
+SHA-256 of its bytes. Resized WebP and JPEG copies, plus AVIF when the
+pillow-avif-plugin is installed, are rendered in a process pool at the
+standard WIDTHS. Derivatives live in a content-addressed directory with an
+LRU byte budget and are regenerated from the original if they have been
+evicted. Their URLs embed the content hash, so they can be served as
+immutable.
+
+srcset() returns, for an ingested URL, ready-made srcset strings per format
+with the original URL as the fallback.
+
+Source URLs come from admin school writes but are still untrusted, so
+fetches are limited to http(s) hosts that resolve only to public
+addresses, checked again on every redirect hop, and to MAX_SOURCE_BYTES /
+MAX_SOURCE_PIXELS. Each hop connects to the address that was vetted, with
+the original host kept in the Host header and TLS SNI/certificate check, so
+a DNS answer that changes between the check and the connect (rebinding)
+is never used.
+"""
+
+import asyncio
+import hashlib
+import ipaddress
+import logging
+import os
+import socket
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+import httpx
+
+logger = logging.getLogger("schooldekho.images")
+
+WIDTHS = (320, 480, 800, 1200)
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+# Checked from the image header before anything is decoded
+MAX_SOURCE_PIXELS = 50_000_000
+MAX_REDIRECTS = 5
+ALLOWED_SCHEMES = ("http", "https")
+QUALITY = {"avif": 50, "webp": 78, "jpeg": 82}
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _avif_available() -> bool:
+    try:
+        import pillow_avif  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Best first; the order of the srcsets returned to clients
+FORMATS = (("avif",) if _avif_available() else ()) + ("webp", "jpeg")
+
+
+def render_derivatives(original: str, targets: List[Tuple[str, int, str]]) -> List[Tuple[str, int]]:
+    """Decode `original` once and write each (path, width, format); runs in a worker process"""
+    from PIL import Image, ImageOps
+
+    if "avif" in {fmt for _, _, fmt in targets}:
+        import pillow_avif  # noqa: F401
+
+    written = []
+    with Image.open(original) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGB")
+        for path, width, fmt in targets:
+            image = source
+            if width < source.width:
+                height = max(1, round(source.height * width / source.width))
+                image = source.resize((width, height), Image.LANCZOS)
+            if fmt == "jpeg" and image.mode != "RGB":
+                image = image.convert("RGB")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            options = {"optimize": True, "progressive": True} if fmt == "jpeg" else {}
+            image.save(tmp, fmt.upper(), quality=QUALITY[fmt], **options)
+            os.replace(tmp, path)
+            written.append((path, os.path.getsize(path)))
+    return written
+
+
+def _probe(path: str) -> Tuple[int, int]:
+    from PIL import Image
+
+    # Image.open only parses the header; the pixels are decoded later, in render_derivatives
+    with Image.open(path) as image:
+        width, height = image.size
+    if width * height > MAX_SOURCE_PIXELS:
+        raise ValueError(f"image has more than {MAX_SOURCE_PIXELS} pixels")
+    return width, height
+
+
+class UnsafeURL(ValueError):
+    pass
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_public_url(url: httpx.URL) -> str:
+    """Raise UnsafeURL unless `url` is http(s) and every address its host resolves to is public
+
+    Returns the vetted address to connect to.
+    """
+    if url.scheme not in ALLOWED_SCHEMES:
+        raise UnsafeURL(f"scheme {url.scheme!r} is not allowed")
+    if not url.host:
+        raise UnsafeURL("URL has no host")
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(
+            url.host, url.port or (443 if url.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as e:
+        raise UnsafeURL(f"cannot resolve {url.host}: {e}")
+    for *_, sockaddr in addresses:
+        if not _is_public(sockaddr[0]):
+            raise UnsafeURL(f"{url.host} resolves to non-public address {sockaddr[0]}")
+    if not addresses:
+        raise UnsafeURL(f"{url.host} has no addresses")
+    return addresses[0][4][0].split("%", 1)[0]
+
+
+def pinned_request(client: httpx.AsyncClient, url: httpx.URL, address: str) -> httpx.Request:
+    """GET `url` over a connection to `address`, keeping the host for Host, SNI and the certificate check"""
+    host = url.raw_host.decode("ascii")
+    return client.build_request(
+        "GET", url.copy_with(host=address), headers={"Host": url.netloc.decode("ascii")},
+        extensions={"sni_hostname": host},
+    )
+
+
+class ImageService:
+    def __init__(self, root: str, collection, max_bytes: int, base_url: str = "/api/images", workers: int = 2):
+        self.root = root
+        self.collection = collection
+        self.max_bytes = max_bytes
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # source URL -> {"sha256", "width", "height"}
+        self._sources: Dict[str, dict] = {}
+        self._ingesting: Dict[str, asyncio.Future] = {}
+        self._loaded_at: Optional[datetime] = None
+        # derivative path -> size, least recently served first
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.join(root, "originals"), exist_ok=True)
+        os.makedirs(os.path.join(root, "derivatives"), exist_ok=True)
+
+    def _original_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "originals", sha256[:2], sha256)
+
+    def _derivative_path(self, sha256: str, width: int, fmt: str) -> str:
+        return os.path.join(self.root, "derivatives", sha256[:2], f"{sha256}-{width}.{fmt}")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def load(self):
+        """Read known sources from Mongo and rebuild the LRU from the derivative directory"""
+        await self.refresh()
+        await asyncio.get_running_loop().run_in_executor(None, self._scan)
+
+    async def refresh(self) -> int:
+        """Pick up sources ingested since the last load, e.g. by another worker"""
+        started_at = datetime.now()
+        query = {"ingested_at": {"$gte": self._loaded_at - timedelta(seconds=5)}} if self._loaded_at else {}
+        found = 0
+        async for record in self.collection.find(query, {"_id": 0, "url": 1, "sha256": 1, "width": 1, "height": 1}):
+            self._sources[record["url"]] = record
+            found += 1
+        self._loaded_at = started_at
+        return found
+
+    def _scan(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, "derivatives")):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                entries.append((stat.st_atime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._lru[path] = size
+            self._bytes += size
+        self._evict()
+
+    def _remember(self, path: str, size: int):
+        self._bytes += size - self._lru.pop(path, 0)
+        self._lru[path] = size
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._lru) > 1:
+            path, size = self._lru.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def widths_for(self, record: dict) -> List[int]:
+        # Never upscale; a source narrower than every width gets one copy at its own size
+        widths = [width for width in WIDTHS if width <= record["width"]]
+        return widths or [record["width"]]
+
+    def srcset(self, url: str) -> Optional[dict]:
+        record = self._sources.get(url)
+        if record is None:
+            return None
+        widths = self.widths_for(record)
+        return {
+            "src": url,
+            "width": record["width"],
+            "height": record["height"],
+            "srcset": {
+                fmt: ", ".join(f"{self.base_url}/{record['sha256']}/{width}.{fmt} {width}w" for width in widths)
+                for fmt in FORMATS
+            },
+        }
+
+    async def ingest(self, url: str) -> Optional[dict]:
+        """Fetch, store and render one source URL; concurrent calls share the work"""
+        if url in self._sources:
+            return self._sources[url]
+        pending = self._ingesting.get(url)
+        if pending is None:
+            pending = self._ingesting[url] = asyncio.ensure_future(self._ingest(url))
+            pending.add_done_callback(lambda _: self._ingesting.pop(url, None))
+        return await asyncio.shield(pending)
+
+    async def _ingest(self, url: str) -> Optional[dict]:
+        tmp = os.path.join(self.root, "originals", f"fetch-{hashlib.sha1(url.encode()).hexdigest()}")
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            async with httpx.AsyncClient(timeout=30, follow_redirects=False) as client:
+                async with self._fetch(client, url) as response:
+                    length = response.headers.get("content-length")
+                    if length and length.isdigit() and int(length) > MAX_SOURCE_BYTES:
+                        raise ValueError(f"image larger than {MAX_SOURCE_BYTES} bytes")
+                    async with aiofiles.open(tmp, "wb") as f:
+                        async for chunk in response.aiter_bytes(256 * 1024):
+                            size += len(chunk)
+                            if size > MAX_SOURCE_BYTES:
+                                raise ValueError(f"image larger than {MAX_SOURCE_BYTES} bytes")
+                            hasher.update(chunk)
+                            await f.write(chunk)
+            sha256 = hasher.hexdigest()
+            original = self._original_path(sha256)
+            os.makedirs(os.path.dirname(original), exist_ok=True)
+            await aiofiles.os.replace(tmp, original)
+            loop = asyncio.get_running_loop()
+            width, height = await loop.run_in_executor(self._executor(), _probe, original)
+        except Exception as e:
+            logger.warning("Could not ingest image %s: %s", url, e)
+            if os.path.exists(tmp):
+                await aiofiles.os.remove(tmp)
+            return None
+
+        record = {"url": url, "sha256": sha256, "width": width, "height": height}
+        targets = [
+            (self._derivative_path(sha256, w, fmt), w, fmt) for w in self.widths_for(record) for fmt in FORMATS
+        ]
+        for path, size in await loop.run_in_executor(self._executor(), render_derivatives, original, targets):
+            self._remember(path, size)
+        await self.collection.update_one(
+            {"url": url}, {"$set": {**record, "ingested_at": datetime.now()}}, upsert=True
+        )
+        self._sources[url] = record
+        return record
+
+    @asynccontextmanager
+    async def _fetch(self, client: httpx.AsyncClient, url: str):
+        """Streamed GET that follows redirects itself, vetting and pinning the host of every hop"""
+        url = httpx.URL(url)
+        for _ in range(MAX_REDIRECTS + 1):
+            address = await check_public_url(url)
+            response = await client.send(pinned_request(client, url, address), stream=True)
+            if not response.is_redirect:
+                break
+            await response.aclose()
+            # Resolved against the requested URL, not the pinned one
+            url = url.join(response.headers["location"])
+        else:
+            raise ValueError(f"more than {MAX_REDIRECTS} redirects")
+        try:
+            response.raise_for_status()
+            yield response
+        finally:
+            await response.aclose()
+
+    async def derivative(self, sha256: str, width: int, fmt: str) -> Optional[str]:
+        """Path of a derivative, re-rendered from the original if it was evicted"""
+        if fmt not in FORMATS or (width not in WIDTHS and not self._is_native_width(sha256, width)):
+            return None
+        path = self._derivative_path(sha256, width, fmt)
+        if path in self._lru and os.path.exists(path):
+            self._lru.move_to_end(path)
+            self.hits += 1
+            return path
+        original = self._original_path(sha256)
+        if not os.path.exists(original):
+            return None
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        for written, size in await loop.run_in_executor(
+            self._executor(), render_derivatives, original, [(path, width, fmt)]
+        ):
+            self._remember(written, size)
+        return path
+
+    def _is_native_width(self, sha256: str, width: int) -> bool:
+        # Sources narrower than WIDTHS[0] are rendered at their own width
+        return width < WIDTHS[0] and any(
+            record["sha256"] == sha256 and record["width"] == width for record in self._sources.values()
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._lru),
+            "bytes": self._bytes,
+            "sources": len(self._sources),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
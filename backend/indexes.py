@@ -0,0 +1,253 @@
+"""
+Index declarations for every query pattern served by server.py.
+
+INDEX_SPECS is the single source of truth. reconcile_indexes() compares it
+with what MongoDB actually has, creates anything missing and reports drift
+(same name but different keys/options) and unmanaged indexes. Drifted
+indexes are only rebuilt when asked to (REBUILD_DRIFTED_INDEXES=1 at
+startup), since dropping one leaves its queries unindexed until the build
+finishes.
+
+Every sort index ends in _id, the tie-breaker of the get_schools sort specs
+(SORT_OPTIONS, RATING_SORT), so keyset pages are read straight off
+the index instead of being sorted in memory.
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger("schooldekho.indexes")
+
+# Options that make two indexes with the same keys behave differently
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+INDEX_SPECS: Dict[str, List[Dict[str, Any]]] = {
+    "schools": [
+        # get_school / compare_schools
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        # SchoolCatalogue watermark refreshes (catalogue.py)
+        {"name": "updated_at", "keys": [("updated_at", ASCENDING)]},
+        # get_schools: equality on type/board, range on annual fee
+        {
+            "name": "type_board_fee",
+            "keys": [("type", ASCENDING), ("board", ASCENDING), ("fees.annual_fee", ASCENDING), ("_id", ASCENDING)],
+        },
+        {"name": "board_fee", "keys": [("board", ASCENDING), ("fees.annual_fee", ASCENDING), ("_id", ASCENDING)]},
+        # get_schools sort=rating|reviews|established_year behind the type/board
+        # equality filter (sort=fee is served by type_board_fee)
+        {
+            "name": "type_board_rating",
+            "keys": [
+                ("type", ASCENDING),
+                ("board", ASCENDING),
+                ("rating", DESCENDING),
+                ("reviews_count", DESCENDING),
+                ("_id", ASCENDING),
+            ],
+        },
+        {
+            "name": "type_board_reviews",
+            "keys": [("type", ASCENDING), ("board", ASCENDING), ("reviews_count", DESCENDING), ("_id", ASCENDING)],
+        },
+        {
+            "name": "type_board_established",
+            "keys": [("type", ASCENDING), ("board", ASCENDING), ("established_year", ASCENDING), ("_id", ASCENDING)],
+        },
+        {"name": "rating", "keys": [("rating", DESCENDING), ("reviews_count", DESCENDING), ("_id", ASCENDING)]},
+        {
+            "name": "city_key_board_rating",
+            "keys": [
+                ("location.city_key", ASCENDING),
+                ("board", ASCENDING),
+                ("rating", DESCENDING),
+                ("reviews_count", DESCENDING),
+                ("_id", ASCENDING),
+            ],
+        },
+        {"name": "annual_fee", "keys": [("fees.annual_fee", ASCENDING), ("_id", ASCENDING)]},
+        # city filter: exact or anchored-prefix match on the normalized key
+        {
+            "name": "city_key_type_board_fee",
+            "keys": [
+                ("location.city_key", ASCENDING),
+                ("type", ASCENDING),
+                ("board", ASCENDING),
+                ("fees.annual_fee", ASCENDING),
+                ("_id", ASCENDING),
+            ],
+        },
+        # get_nearby_schools: $geoNear with the type/board filter
+        {
+            "name": "geo_type_board",
+            "keys": [("location.geo", "2dsphere"), ("type", ASCENDING), ("board", ASCENDING)],
+        },
+    ],
+    "users": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        # register_user
+        {"name": "email_unique", "keys": [("email", ASCENDING)], "unique": True},
+        # Alumni directory (alumni.py): listing in DIRECTORY_SORT order, then
+        # name-prefix and profession searches within a school
+        {
+            "name": "alumni_directory",
+            "keys": [
+                ("school_id", ASCENDING),
+                ("user_type", ASCENDING),
+                ("directory_year", DESCENDING),
+                ("name_key", ASCENDING),
+                ("id", ASCENDING),
+            ],
+        },
+        {
+            "name": "alumni_name_terms",
+            "keys": [("school_id", ASCENDING), ("user_type", ASCENDING), ("name_terms", ASCENDING)],
+        },
+        {
+            "name": "alumni_profession",
+            "keys": [
+                ("school_id", ASCENDING),
+                ("user_type", ASCENDING),
+                ("profession_key", ASCENDING),
+                ("directory_year", DESCENDING),
+                ("name_key", ASCENDING),
+                ("id", ASCENDING),
+            ],
+        },
+    ],
+    "loan_applications": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        # get_user_loans
+        {"name": "user_created", "keys": [("user_id", ASCENDING), ("created_at", DESCENDING)]},
+        # Admin review queue: best-scored first within a status
+        {
+            "name": "status_score_created",
+            "keys": [
+                ("status", ASCENDING),
+                ("assessment.score", DESCENDING),
+                ("created_at", ASCENDING),
+                ("id", ASCENDING),
+            ],
+        },
+    ],
+    "loan_documents": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "loan", "keys": [("loan_id", ASCENDING)]},
+    ],
+    "upload_sessions": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        # Abandoned resumable uploads expire after a week
+        {"name": "created_ttl", "keys": [("created_at", ASCENDING)], "expireAfterSeconds": 7 * 24 * 3600},
+    ],
+    # Cross-worker school write log and startup job leases (coordination.py)
+    "school_changes": [
+        {"name": "at_ttl", "keys": [("at", ASCENDING)], "expireAfterSeconds": 24 * 3600},
+    ],
+    "scholarships": [
+        # Matching runs on the in-memory index (scholarships.py); create_scholarship
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+    ],
+}
+
+
+def _normalize_keys(keys):
+    # Older servers report directions as 1.0 / -1.0
+    return [
+        (field, int(direction) if isinstance(direction, float) else direction)
+        for field, direction in keys
+    ]
+
+
+def _options(spec):
+    return {option: spec[option] for option in COMPARED_OPTIONS if spec.get(option) is not None}
+
+
+def _existing_options(info):
+    options = {option: info[option] for option in COMPARED_OPTIONS if info.get(option) is not None}
+    # MongoDB omits unique/sparse when false
+    return {option: value for option, value in options.items() if value is not False}
+
+
+def _declared_options(spec):
+    return {option: value for option, value in _options(spec).items() if value is not False}
+
+
+def _create_kwargs(spec):
+    kwargs = {"name": spec["name"]}
+    kwargs.update(_options(spec))
+    return kwargs
+
+
+async def reconcile_collection(collection, specs, apply=True, rebuild_drifted=False, drop_unmanaged=False):
+    report = {"ok": [], "created": [], "missing": [], "drifted": [], "unmanaged": [], "failed": []}
+    existing = await collection.index_information()
+    existing.pop("_id_", None)
+    by_keys = {tuple(_normalize_keys(info["key"])): name for name, info in existing.items()}
+    declared_names = set()
+
+    for spec in specs:
+        name = spec["name"]
+        keys = _normalize_keys(spec["keys"])
+        info = existing.get(name)
+        if info is None and tuple(keys) in by_keys:
+            # Same index created under another name; adopt it rather than
+            # failing with IndexOptionsConflict.
+            name = by_keys[tuple(keys)]
+            info = existing[name]
+        declared_names.add(name)
+
+        if info is not None:
+            if _normalize_keys(info["key"]) == keys and _existing_options(info) == _declared_options(spec):
+                report["ok"].append(name)
+                continue
+            report["drifted"].append({
+                "name": name,
+                "declared": {"keys": keys, **_declared_options(spec)},
+                "actual": {"keys": _normalize_keys(info["key"]), **_existing_options(info)},
+            })
+            if not (apply and rebuild_drifted):
+                continue
+            await collection.drop_index(name)
+
+        if not apply:
+            if info is None:
+                report["missing"].append(spec["name"])
+            continue
+        try:
+            await collection.create_index(keys, **_create_kwargs(spec))
+            report["created"].append(spec["name"])
+        except OperationFailure as e:
+            # e.g. duplicate emails already in users; keep serving and report it
+            report["failed"].append({"name": spec["name"], "error": str(e)})
+
+    for name in existing:
+        if name not in declared_names:
+            report["unmanaged"].append(name)
+            if apply and drop_unmanaged:
+                await collection.drop_index(name)
+    return report
+
+
+async def reconcile_indexes(db, apply=True, rebuild_drifted=False, drop_unmanaged=False):
+    """Bring every collection in INDEX_SPECS in line and return a drift report"""
+    report = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        report[collection_name] = await reconcile_collection(
+            db[collection_name],
+            specs,
+            apply=apply,
+            rebuild_drifted=rebuild_drifted,
+            drop_unmanaged=drop_unmanaged,
+        )
+    for collection_name, result in report.items():
+        if result["created"]:
+            logger.info("%s: created indexes %s", collection_name, result["created"])
+        for drift in result["drifted"]:
+            logger.warning("%s: index drift on %s: %s", collection_name, drift["name"], drift)
+        if result["unmanaged"]:
+            logger.warning("%s: unmanaged indexes %s", collection_name, result["unmanaged"])
+        for failure in result["failed"]:
+            logger.error("%s: index %s not built: %s", collection_name, failure["name"], failure["error"])
+    return report
@@ -0,0 +1,162 @@
+"""
+Request and MongoDB instrumentation exported through metrics.py.
+
+RequestMetricsMiddleware counts requests and records latency per route
+template (not raw path, so /api/schools/{school_id} is one series) and
+tracks requests in flight. CommandMetrics is a PyMongo command listener
+that times every data command per collection and operation and logs
+commands slower than a threshold with the shape of their filter: values
+are replaced by "?" so a log line identifies the query pattern, e.g.
+{"board": "?", "fees.annual_fee": {"$gte": "?"}}.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+import metrics
+
+logger = logging.getLogger("schooldekho.slow_queries")
+
+HTTP_REQUESTS = metrics.Counter(
+    "schooldekho_http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+)
+HTTP_LATENCY = metrics.Histogram(
+    "schooldekho_http_request_duration_seconds", "HTTP request latency by route", ["method", "route"]
+)
+HTTP_IN_FLIGHT = metrics.Gauge("schooldekho_http_requests_in_flight", "HTTP requests being served")
+
+MONGO_LATENCY = metrics.Histogram(
+    "schooldekho_mongo_command_duration_seconds", "MongoDB command latency", ["collection", "command"]
+)
+MONGO_FAILURES = metrics.Counter(
+    "schooldekho_mongo_command_failures_total", "MongoDB commands that returned an error", ["collection", "command"]
+)
+SLOW_QUERIES = metrics.Counter(
+    "schooldekho_mongo_slow_commands_total", "MongoDB commands over the slow query threshold", ["collection", "command"]
+)
+
+# Commands whose first field names the collection they act on
+DATA_COMMANDS = {
+    "find", "getMore", "aggregate", "count", "distinct", "insert", "update", "delete", "findAndModify",
+}
+
+
+def filter_shape(value):
+    """Replace every value in a filter with "?" but keep field names and operators"""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        # $and / $or / pipeline stages
+        return [filter_shape(item) for item in value]
+    return "?"
+
+
+def command_filter(command_name: str, command: dict):
+    if command_name in ("find", "count", "distinct", "findAndModify", "delete", "update"):
+        if command_name == "update":
+            return [update.get("q") for update in command.get("updates", [])[:1]]
+        if command_name == "delete":
+            return [delete.get("q") for delete in command.get("deletes", [])[:1]]
+        return command.get("filter", command.get("query"))
+    if command_name == "aggregate":
+        return command.get("pipeline", [])[:2]
+    return None
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Register with AsyncIOMotorClient(event_listeners=[...]); runs on PyMongo's threads"""
+
+    def __init__(self, slow_ms: float = 100.0):
+        self.slow_ms = slow_ms
+        self._started: Dict[Tuple, Tuple[str, str, object]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name not in DATA_COMMANDS:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = command.get("collection")
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                str(collection) if isinstance(collection, str) else "",
+                event.command_name,
+                command_filter(event.command_name, command),
+            )
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        collection, command_name, query = started
+        seconds = event.duration_micros / 1e6
+        MONGO_LATENCY.observe(seconds, collection=collection, command=command_name)
+        if failed:
+            MONGO_FAILURES.inc(collection=collection, command=command_name)
+        if seconds * 1000 >= self.slow_ms:
+            SLOW_QUERIES.inc(collection=collection, command=command_name)
+            logger.warning(
+                "Slow %s on %s took %.1f ms: %s",
+                command_name, collection, seconds * 1000,
+                json.dumps(filter_shape(query), sort_keys=True) if query is not None else "-",
+            )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._templates: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            # Unmatched paths share one series so 404 scans cannot explode cardinality
+            return "unmatched"
+        if not self._templates:
+            app = scope.get("app")
+            for candidate in getattr(getattr(app, "router", None), "routes", []):
+                self._templates.setdefault(getattr(candidate, "endpoint", None), candidate.path)
+        return self._templates.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", f"app;dur={elapsed:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router fills in the matched route on the shared scope
+            route = self._route(scope)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status)
+            HTTP_LATENCY.observe(time.perf_counter() - started, method=scope["method"], route=route)
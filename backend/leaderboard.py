@@ -0,0 +1,226 @@
+"""
+Materialized top-K leaderboards for the commonest landing query: the
+top-rated schools in a city, optionally narrowed to a board and/or type.
+
+One $group/$topN aggregation produces the best TOP_K schools and the total
+count for every (city_key, board, type) cell. Wildcard queries ("any
+board", "any type", city prefix) merge the matching cells in memory, which
+is exact because the top K of a union is always drawn from the top K of
+its parts. The snapshot is refreshed in the background.
+
+A school write marks stale only the cells it can change: the cells the
+school left or joined, cells where its rating or review count moved, and
+cells whose top list shows it. Queries touching a stale cell fall through
+to get_schools until the next poll re-aggregates just those cells.
+
+$topN needs MongoDB 5.2 or later. Older servers get a $sort + $group/$push
+pipeline that yields the same cells but holds every school of a cell in
+memory while grouping, so keep it for small catalogues or upgrade.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from normalize import matches_city
+
+logger = logging.getLogger("schooldekho.leaderboard")
+
+TOP_K = 50
+# Same order as sort=rating in get_schools
+RATING_SORT = [("rating", -1), ("reviews_count", -1), ("_id", 1)]
+RANK_FIELDS = ("rating", "reviews_count")
+# First release with the $topN accumulator
+TOP_N_VERSION = (5, 2)
+
+Cell = Tuple[str, str, str]
+
+_GROUP_KEY = {"city": "$location.city_key", "board": "$board", "type": "$type"}
+
+
+def cell_of(school: Optional[dict]) -> Optional[Cell]:
+    """The (city_key, board, type) cell a school document is grouped into"""
+    if school is None:
+        return None
+    location = school.get("location")
+    city = location.get("city_key") if isinstance(location, dict) else None
+    return (city or "", school.get("board") or "", school.get("type") or "")
+
+
+def cells_filter(cells: Iterable[Cell]) -> dict:
+    """$match for the schools grouped into `cells` ("" also matches a missing field)"""
+    def value(v):
+        return v if v else {"$in": [None, ""]}
+
+    clauses = [
+        {"location.city_key": value(city), "board": value(board), "type": value(school_type)}
+        for city, board, school_type in cells
+    ]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def leaderboard_pipeline(top_k: int = TOP_K, cells: Optional[Iterable[Cell]] = None):
+    match = [{"$match": cells_filter(cells)}] if cells is not None else []
+    return match + [
+        {
+            "$group": {
+                "_id": _GROUP_KEY,
+                "count": {"$sum": 1},
+                "top": {
+                    "$topN": {
+                        "n": top_k,
+                        "sortBy": dict(RATING_SORT),
+                        "output": "$$ROOT",
+                    }
+                },
+            }
+        }
+    ]
+
+
+def legacy_leaderboard_pipeline(top_k: int = TOP_K, cells: Optional[Iterable[Cell]] = None):
+    """leaderboard_pipeline() for servers without $topN"""
+    match = [{"$match": cells_filter(cells)}] if cells is not None else []
+    return match + [
+        {"$sort": dict(RATING_SORT)},
+        {"$group": {"_id": _GROUP_KEY, "count": {"$sum": 1}, "top": {"$push": "$$ROOT"}}},
+        {"$project": {"count": 1, "top": {"$slice": ["$top", top_k]}}},
+    ]
+
+
+def _rank(school: dict):
+    # heapq.nlargest key matching RATING_SORT (ties broken by _id ascending)
+    return (school.get("rating") or 0.0, school.get("reviews_count") or 0, _Reversed(school["_id"]))
+
+
+class _Reversed:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class Leaderboards:
+    def __init__(self, top_k: int = TOP_K, refresh_interval: float = 300.0):
+        self.top_k = top_k
+        self.refresh_interval = refresh_interval
+        self._cells: Dict[Cell, Tuple[int, List[dict]]] = {}
+        self._refreshed_at: Optional[float] = None
+        self._stale: Set[Cell] = set()
+        self._pipeline = None
+        self.hits = 0
+        self.misses = 0
+
+    async def _pick_pipeline(self, collection):
+        info = await collection.database.command("buildInfo")
+        if tuple(info.get("versionArray", ())[:2]) >= TOP_N_VERSION:
+            return leaderboard_pipeline
+        logger.warning("MongoDB %s has no $topN; leaderboards use $sort + $group", info.get("version"))
+        return legacy_leaderboard_pipeline
+
+    async def refresh(self, collection, serialize, cells: Optional[Set[Cell]] = None):
+        """Re-aggregate `cells`, or every cell when None"""
+        if self._pipeline is None:
+            self._pipeline = await self._pick_pipeline(collection)
+        # Claim the stale cells first so a write racing with the aggregation
+        # marks its cell stale again.
+        claimed = set(self._stale) if cells is None else cells
+        self._stale -= claimed
+        fresh = {}
+        try:
+            async for row in collection.aggregate(self._pipeline(self.top_k, cells), allowDiskUse=True):
+                key = row["_id"]
+                fresh[(key.get("city") or "", key.get("board") or "", key.get("type") or "")] = (
+                    row["count"],
+                    [serialize(school) for school in row["top"]],
+                )
+        except Exception:
+            self._stale |= claimed
+            raise
+        if cells is None:
+            self._cells = fresh
+            self._refreshed_at = time.monotonic()
+            return
+        # Cells left without schools are absent from the result
+        merged = {cell: entry for cell, entry in self._cells.items() if cell not in cells}
+        merged.update(fresh)
+        self._cells = merged
+
+    async def run(self, collection, serialize, poll_interval: float = 5.0):
+        """Background loop: refresh stale cells (debounced) or everything when the snapshot ages out"""
+        while True:
+            age = None if self._refreshed_at is None else time.monotonic() - self._refreshed_at
+            try:
+                if age is None or age >= self.refresh_interval:
+                    await self.refresh(collection, serialize)
+                elif self._stale:
+                    await self.refresh(collection, serialize, set(self._stale))
+            except Exception as e:
+                logger.error("Leaderboard refresh failed: %s", e)
+            await asyncio.sleep(poll_interval)
+
+    def mark_written(self, school: Optional[dict], previous: Optional[dict]):
+        """Mark stale the cells a write to one school can change"""
+        before, after = cell_of(previous), cell_of(school)
+        if before != after:
+            # Counts change on both sides
+            self._stale.update(cell for cell in (before, after) if cell is not None)
+            return
+        if after is None:
+            return
+        if any(school.get(field) != previous.get(field) for field in RANK_FIELDS):
+            self._stale.add(after)
+            return
+        # Same rank: only a top list showing the school is out of date
+        entry = self._cells.get(after)
+        if entry is not None and any(shown.get("id") == school.get("id") for shown in entry[1]):
+            self._stale.add(after)
+
+    def _is_stale(self, city: str, board: Optional[str], school_type: Optional[str], city_match: str) -> bool:
+        return any(
+            matches_city(cell_city, city, city_match)
+            and not (board and cell_board != board)
+            and not (school_type and cell_type != school_type)
+            for cell_city, cell_board, cell_type in self._stale
+        )
+
+    def lookup(self, city: str, board: Optional[str], school_type: Optional[str], city_match: str,
+               offset: int, limit: int) -> Optional[Tuple[List[dict], int]]:
+        """Return (page of schools, total) or None when the snapshot cannot answer"""
+        if (self._refreshed_at is None or offset + limit > self.top_k
+                or self._is_stale(city, board, school_type, city_match)):
+            self.misses += 1
+            return None
+        tops, total = [], 0
+        for (cell_city, cell_board, cell_type), (count, top) in self._cells.items():
+            if not matches_city(cell_city, city, city_match):
+                continue
+            if board and cell_board != board:
+                continue
+            if school_type and cell_type != school_type:
+                continue
+            total += count
+            tops.append(top)
+        self.hits += 1
+        if len(tops) == 1:
+            return tops[0][offset:offset + limit], total
+        merged = heapq.nlargest(offset + limit, (school for top in tops for school in top), key=_rank)
+        return merged[offset:], total
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cells),
+            "stale_cells": len(self._stale),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,148 @@
+"""
+Minimal Prometheus text-format metrics for the API.
+
+Metrics are module-level and rendered by GET /metrics. Caches register
+themselves with register_cache() and are exported from their stats().
+Request and MongoDB command instrumentation lives in instrumentation.py.
+"""
+
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: List["Metric"] = []
+_caches: Dict[str, object] = {}
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, self.labelnames, key, value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labelnames, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(labelnames, key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    # Seconds; covers cache hits through slow aggregations
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        bucket_labels = self.labelnames + ("le",)
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield self.name + "_bucket", bucket_labels, key + (repr(bound),), cumulative
+            yield self.name + "_bucket", bucket_labels, key + ("+Inf",), series[-1]
+            yield self.name + "_sum", self.labelnames, key, series[-2]
+            yield self.name + "_count", self.labelnames, key, series[-1]
+
+
+def register_cache(name: str, cache) -> None:
+    """Export a cache's stats() (hits, misses, evictions, size) under `name`"""
+    _caches[name] = cache
+
+
+def _render_caches() -> List[str]:
+    stats = {name: cache.stats() for name, cache in _caches.items()}
+    lines = []
+    families: List[Tuple[str, str, str, Callable[[dict], float]]] = [
+        ("schooldekho_cache_hits_total", "counter", "Cache lookups served from memory", lambda s: s["hits"]),
+        ("schooldekho_cache_misses_total", "counter", "Cache lookups that went to the database", lambda s: s["misses"]),
+        ("schooldekho_cache_evictions_total", "counter", "Entries evicted for size", lambda s: s.get("evictions", 0)),
+        ("schooldekho_cache_entries", "gauge", "Entries currently cached", lambda s: s["size"]),
+        ("schooldekho_cache_hit_ratio", "gauge", "Hits over lookups since start", lambda s: s["hit_ratio"]),
+    ]
+    for metric_name, kind, documentation, value in families:
+        lines.append(f"# HELP {metric_name} {documentation}")
+        lines.append(f"# TYPE {metric_name} {kind}")
+        for name, cache_stats in stats.items():
+            lines.append(f'{metric_name}{{cache="{name}"}} {value(cache_stats)}')
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_render_caches())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,176 @@
+"""
+Normalized lookup keys for place names.
+
+normalize_key() folds case, strips Latin diacritics, collapses punctuation
+and maps old/alternate and native-script spellings to one canonical form,
+so "Bengaluru", "BANGALORE" and "बेंगलुरु" all become "bangalore". Schools
+store the result as location.city_key / location.state_key, which are
+matched exactly or by anchored prefix and can therefore use an index.
+
+Aliases only map complete words, so a partly typed name is expanded with
+prefix_keys(): "beng" stands for both "beng..." and "bangalore", because
+it is the start of the alias "bengaluru".
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+# Alternate, historical and native-script spellings -> canonical key
+ALIASES = {
+    "new delhi": "delhi",
+    "bengaluru": "bangalore",
+    "bombay": "mumbai",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "poona": "pune",
+    "gurugram": "gurgaon",
+    "cochin": "kochi",
+    "ernakulam": "kochi",
+    "trivandrum": "thiruvananthapuram",
+    "mysuru": "mysore",
+    "vizag": "visakhapatnam",
+    "pondicherry": "puducherry",
+    "baroda": "vadodara",
+    "dilli": "delhi",
+    # Hindi
+    "दिल्ली": "delhi",
+    "नई दिल्ली": "delhi",
+    "मुंबई": "mumbai",
+    "बेंगलुरु": "bangalore",
+    "बैंगलोर": "bangalore",
+    "चेन्नई": "chennai",
+    "कोलकाता": "kolkata",
+    "हैदराबाद": "hyderabad",
+    "पुणे": "pune",
+    "जयपुर": "jaipur",
+    "लखनऊ": "lucknow",
+    # Tamil
+    "சென்னை": "chennai",
+    "கோயம்புத்தூர்": "coimbatore",
+    "மதுரை": "madurai",
+    # Telugu
+    "హైదరాబాద్": "hyderabad",
+    "విశాఖపట్నం": "visakhapatnam",
+    # Malayalam
+    "കൊച്ചി": "kochi",
+    "തിരുവനന്തപുരം": "thiruvananthapuram",
+}
+
+_APOSTROPHES = {ord("'"): None, ord("\u2019"): None}
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).casefold().translate(_APOSTROPHES)
+    # Punctuation, symbols and separators become spaces; letters, digits and
+    # combining marks (Indic vowel signs) are kept.
+    text = "".join(" " if unicodedata.category(ch)[0] in "PSZC" else ch for ch in text)
+    return " ".join(text.split())
+
+
+def _spelling(text: str) -> str:
+    folded = _fold(text)
+    # Strip diacritics only when that leaves plain ASCII; combining marks
+    # are load-bearing in Indic scripts.
+    stripped = "".join(
+        ch for ch in unicodedata.normalize("NFKD", folded) if not unicodedata.combining(ch)
+    )
+    return stripped if stripped.isascii() else folded
+
+
+@lru_cache(maxsize=65536)
+def normalize_key(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    folded = _spelling(text)
+    if folded in ALIASES:
+        return ALIASES[folded]
+    return " ".join(ALIASES.get(word, word) for word in folded.split())
+
+
+@lru_cache(maxsize=16384)
+def prefix_keys(text: Optional[str]) -> List[str]:
+    """Key prefixes that a partly typed place name can be the start of"""
+    if not text:
+        return []
+    folded = _spelling(text)
+    keys = [normalize_key(folded)]
+    words = folded.split()
+    head = normalize_key(" ".join(words[:-1]))
+    for alias, canonical in ALIASES.items():
+        if alias.startswith(folded):
+            keys.append(canonical)
+        elif len(words) > 1 and " " not in alias and alias.startswith(words[-1]):
+            # Complete words before the last one are mapped as usual
+            keys.append(head + " " + canonical)
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+def matches_city(key: str, city: str, match: str = "prefix") -> bool:
+    """In-memory equivalent of city_condition() for a stored city key"""
+    if match == "exact":
+        return key == normalize_key(city)
+    return key.startswith(tuple(prefix_keys(city)))
+
+
+def with_location_keys(school: dict) -> dict:
+    location = school.get("location")
+    if isinstance(location, dict):
+        location["city_key"] = normalize_key(location.get("city"))
+        location["state_key"] = normalize_key(location.get("state"))
+    return school
+
+
+def city_condition(city: str, match: str = "prefix"):
+    """Mongo condition on location.city_key; anchored so it can use the index"""
+    if match == "exact":
+        return normalize_key(city)
+    prefixes = prefix_keys(city)
+    if len(prefixes) == 1:
+        return {"$regex": "^" + re.escape(prefixes[0])}
+    return {"$in": [re.compile("^" + re.escape(prefix)) for prefix in prefixes]}
+
+
+def raw_city_condition(city: str, match: str = "prefix"):
+    """
+    Condition on location.city for schools the key backfill has not reached
+    yet: every alias spelling, case-insensitively. Cannot use an index and
+    does not fold diacritics or punctuation, so it is only a stopgap.
+    """
+    keys = [normalize_key(city)] if match == "exact" else prefix_keys(city)
+    spellings = set(keys)
+    for alias, canonical in ALIASES.items():
+        if any(canonical == key if match == "exact" else canonical.startswith(key) for key in keys):
+            spellings.add(alias)
+    pattern = "|".join(re.escape(spelling) for spelling in sorted(spellings))
+    return {"$regex": "^(?:%s)%s" % (pattern, "$" if match == "exact" else ""), "$options": "i"}
+
+
+async def backfill_location_keys(collection, batch_size: int = 1000) -> int:
+    """Add city_key/state_key to schools written before they existed"""
+    updated = 0
+    operations = []
+    cursor = collection.find(
+        {"location.city_key": {"$exists": False}},
+        {"_id": 1, "location.city": 1, "location.state": 1},
+    ).batch_size(batch_size)
+    async for school in cursor:
+        location = school.get("location") or {}
+        operations.append(UpdateOne(
+            {"_id": school["_id"]},
+            {"$set": {
+                "location.city_key": normalize_key(location.get("city")),
+                "location.state_key": normalize_key(location.get("state")),
+            }},
+        ))
+        if len(operations) >= batch_size:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+    if operations:
+        result = await collection.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+    return updated
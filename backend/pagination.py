@@ -0,0 +1,78 @@
+"""
+Opaque keyset cursors for list endpoints.
+
+A cursor is the sort-key values of the last document on a page, encoded as
+URL-safe base64 of extended JSON so ObjectIds and datetimes round-trip.
+The next page is everything strictly after that key in sort order, which
+an index on the sort fields serves without skipping.
+"""
+
+import base64
+from typing import Any, List, Sequence, Tuple
+
+from bson import json_util
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list):
+        raise InvalidCursor("Malformed cursor")
+    return values
+
+
+def decode_offset_cursor(token: str) -> int:
+    """The offset in a search cursor (`[offset]`; search ranks have no keyset)"""
+    values = decode_cursor(token)
+    if len(values) != 1 or type(values[0]) is not int or values[0] < 0:
+        raise InvalidCursor("Malformed cursor")
+    return values[0]
+
+
+def _field_value(doc: dict, field: str) -> Any:
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def cursor_for(doc: dict, sort: SortSpec) -> str:
+    return encode_cursor([_field_value(doc, field) for field, _ in sort])
+
+
+def keyset_filter(sort: SortSpec, values: List[Any]) -> dict:
+    """Match documents strictly after `values` in `sort` order"""
+    if len(values) != len(sort):
+        raise InvalidCursor("Cursor does not match the requested sort")
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def apply_cursor(filter_query: dict, sort: SortSpec, token: str) -> dict:
+    """Combine a list filter with the keyset condition encoded in `token`"""
+    if not token:
+        return filter_query
+    condition = keyset_filter(sort, decode_cursor(token))
+    if not filter_query:
+        return condition
+    return {"$and": [filter_query, condition]}
@@ -0,0 +1,284 @@
+"""
+In-memory scholarship catalogue and matcher for /api/scholarships.
+
+The catalogue is small (thousands of documents) and read far more often
+than written, so it is held in memory and rebuilt from MongoDB when it
+changes:
+
+- amount ranges [amount_min, amount_max] live in a static interval tree,
+  so "scholarships overlapping ₹20k-₹60k" is a tree walk, not a scan;
+- deadlines are kept sorted, so the open scholarships are a bisect away
+  and listings come out already in deadline order;
+- category and location facets are id sets; scholarships without
+  locations are national and match every location.
+
+ScholarshipCatalogue keeps the current index, reloads it every
+refresh_interval seconds (to see writes made by other workers and scripts)
+and swaps in a rebuilt index immediately after a local write.
+
+match() intersects the smallest candidate set with the other filters,
+applies the student's eligibility (income, marks, gender) and ranks what
+is left by how specifically it targets the student, then by amount, then
+by the nearest deadline.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from normalize import normalize_key
+
+logger = logging.getLogger("schooldekho.scholarships")
+
+CATEGORIES = ("academic", "need", "gender", "sports", "minority", "rural", "disability", "arts")
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored deadlines are naive; request dates may carry a timezone
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class IntervalTree:
+    """Static centered interval tree over closed intervals (lo, hi, key)"""
+
+    __slots__ = ("center", "by_lo", "by_hi", "left", "right")
+
+    def __init__(self, intervals: List[Tuple[float, float, str]]):
+        self.left = self.right = None
+        if not intervals:
+            self.center = None
+            self.by_lo = self.by_hi = []
+            return
+        endpoints = sorted(point for lo, hi, _ in intervals for point in (lo, hi))
+        self.center = endpoints[len(endpoints) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_lo = sorted(here, key=lambda interval: interval[0])
+        self.by_hi = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def overlapping(self, lo: float, hi: float, found: Optional[Set[str]] = None) -> Set[str]:
+        found = set() if found is None else found
+        if self.center is None:
+            return found
+        if hi < self.center:
+            # Intervals here end at or after center > hi; they overlap iff they start by hi
+            for start, _, key in self.by_lo:
+                if start > hi:
+                    break
+                found.add(key)
+            if self.left:
+                self.left.overlapping(lo, hi, found)
+        elif lo > self.center:
+            for _, end, key in self.by_hi:
+                if end < lo:
+                    break
+                found.add(key)
+            if self.right:
+                self.right.overlapping(lo, hi, found)
+        else:
+            # The query contains center, and so does every interval stored here
+            found.update(key for _, _, key in self.by_lo)
+            if self.left:
+                self.left.overlapping(lo, hi, found)
+            if self.right:
+                self.right.overlapping(lo, hi, found)
+        return found
+
+
+class ScholarshipIndex:
+    def __init__(self, scholarships: List[dict]):
+        self.docs: Dict[str, dict] = {}
+        self._text: Dict[str, str] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_location: Dict[str, Set[str]] = {}
+        self._national: Set[str] = set()
+        for scholarship in scholarships:
+            self._add(scholarship)
+        self._deadlines = sorted((doc["deadline"], doc["id"]) for doc in self.docs.values())
+        self._amounts = IntervalTree([
+            (doc.get("amount_min") or 0, doc.get("amount_max") or doc.get("amount_min") or 0, doc["id"])
+            for doc in self.docs.values()
+        ])
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _add(self, scholarship: dict):
+        doc = dict(scholarship)
+        doc.pop("_id", None)
+        doc["deadline"] = naive_utc(doc["deadline"])
+        doc["location_keys"] = [normalize_key(location) for location in doc.get("locations") or []]
+        key = doc["id"]
+        self.docs[key] = doc
+        self._text[key] = " ".join(
+            str(doc.get(field) or "") for field in ("title", "provider", "eligibility", "description", "type")
+        ).casefold()
+        self._by_category.setdefault(doc.get("category") or "", set()).add(key)
+        if doc["location_keys"]:
+            for location in doc["location_keys"]:
+                self._by_location.setdefault(location, set()).add(key)
+        else:
+            self._national.add(key)
+
+    @classmethod
+    async def build(cls, collection) -> "ScholarshipIndex":
+        return cls(await collection.find({}, {"_id": 0}).to_list(length=None))
+
+    def with_scholarship(self, scholarship: dict) -> "ScholarshipIndex":
+        """A new index including `scholarship`; the catalogue is small enough to rebuild"""
+        docs = {**self.docs, scholarship["id"]: scholarship}
+        return ScholarshipIndex(list(docs.values()))
+
+    def _open_ids(self, cutoff: datetime) -> List[str]:
+        start = bisect.bisect_left(self._deadlines, (cutoff, ""))
+        return [key for _, key in self._deadlines[start:]]
+
+    def listing(self, now: datetime, category: Optional[str], location: Optional[str],
+                offset: int, limit: int) -> Tuple[List[dict], int, Dict[str, int]]:
+        """Open scholarships in deadline order"""
+        location_key = normalize_key(location) if location else None
+        page, total, facets = [], 0, {}
+        for key in self._open_ids(naive_utc(now)):
+            doc = self.docs[key]
+            if location_key and doc["location_keys"] and location_key not in doc["location_keys"]:
+                continue
+            facets[doc.get("category")] = facets.get(doc.get("category"), 0) + 1
+            if category and doc.get("category") != category:
+                continue
+            if offset <= total < offset + limit:
+                page.append(self.public(doc))
+            total += 1
+        return page, total, facets
+
+    def match(self, now: datetime, criteria: str, amount_min: Optional[int], amount_max: Optional[int],
+              apply_by: Optional[datetime], location: Optional[str], family_income: Optional[int],
+              marks_percent: Optional[float], gender: Optional[str],
+              offset: int, limit: int) -> Tuple[List[dict], int, Dict[str, int]]:
+        cutoff = max(naive_utc(now), naive_utc(apply_by) or naive_utc(now))
+        criteria = (criteria or "").strip().casefold()
+        category = criteria if criteria in CATEGORIES else None
+        keywords = [] if category or criteria in ("", "all", "any") else criteria.split()
+        location_key = normalize_key(location) if location else None
+
+        # Start from the most selective index, then check everything per document
+        candidate_sets = []
+        if amount_min is not None or amount_max is not None:
+            low = amount_min if amount_min is not None else 0
+            high = amount_max if amount_max is not None else float("inf")
+            candidate_sets.append(self._amounts.overlapping(low, high))
+        if location_key:
+            candidate_sets.append(self._by_location.get(location_key, set()) | self._national)
+        if candidate_sets:
+            candidates = min(candidate_sets, key=len)
+            for other in candidate_sets:
+                if other is not candidates:
+                    candidates = candidates & other
+        else:
+            candidates = self.docs.keys()
+
+        ranked, facets = [], {}
+        for key in candidates:
+            doc = self.docs[key]
+            if doc["deadline"] < cutoff:
+                continue
+            if keywords and not all(word in self._text[key] for word in keywords):
+                continue
+            rules = doc.get("criteria") or {}
+            reasons = []
+            if rules.get("max_family_income") is not None and family_income is not None:
+                if family_income > rules["max_family_income"]:
+                    continue
+                reasons.append("family_income")
+            if rules.get("min_marks") is not None and marks_percent is not None:
+                if marks_percent < rules["min_marks"]:
+                    continue
+                reasons.append("marks")
+            if rules.get("gender"):
+                if gender and gender.casefold() != rules["gender"].casefold():
+                    continue
+                if gender:
+                    reasons.append("gender")
+            if location_key and doc["location_keys"]:
+                reasons.append("location")
+            # Facet counts ignore the category filter so clients can offer the others
+            facets[doc.get("category")] = facets.get(doc.get("category"), 0) + 1
+            if category and doc.get("category") != category:
+                continue
+            if category:
+                reasons.append("category")
+            ranked.append((-len(reasons), -(doc.get("amount_max") or 0), doc["deadline"], key, reasons))
+
+        ranked.sort()
+        page = []
+        for specificity, _, _, key, reasons in ranked[offset:offset + limit]:
+            result = self.public(self.docs[key])
+            result["match"] = {"score": -specificity, "reasons": reasons}
+            page.append(result)
+        return page, len(ranked), facets
+
+    @staticmethod
+    def public(doc: dict) -> dict:
+        result = dict(doc)
+        result.pop("location_keys", None)
+        return result
+
+
+class ScholarshipCatalogue:
+    def __init__(self, refresh_interval: float = 300.0):
+        self.refresh_interval = refresh_interval
+        self.index: Optional[ScholarshipIndex] = None
+        self._refreshed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def refresh(self, collection):
+        async with self._lock:
+            self.index = await ScholarshipIndex.build(collection)
+            self._refreshed_at = time.monotonic()
+
+    async def current(self, collection) -> ScholarshipIndex:
+        """The loaded index, loading it first if the background task has not yet"""
+        if self.index is None:
+            self.misses += 1
+            await self.refresh(collection)
+        else:
+            self.hits += 1
+        return self.index
+
+    def add(self, scholarship: dict):
+        if self.index is not None:
+            self.index = self.index.with_scholarship(scholarship)
+
+    async def run(self, collection, poll_interval: float = 5.0):
+        """Background loop: reload when the index ages out"""
+        while True:
+            age = None if self._refreshed_at is None else time.monotonic() - self._refreshed_at
+            if age is None or age >= self.refresh_interval:
+                try:
+                    await self.refresh(collection)
+                except Exception as e:
+                    logger.error("Scholarship index refresh failed: %s", e)
+            await asyncio.sleep(poll_interval)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.index) if self.index is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
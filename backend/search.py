@@ -0,0 +1,385 @@
+"""
+In-process inverted index behind GET /api/schools?search=...
+
+Indexes school name, city, address, board and facilities with per-field
+weights. Queries are tokenized the same way as documents; the last query
+token is prefix-expanded for type-ahead and every token of four or more
+characters tolerates one typo (symmetric-delete candidates, verified with
+an optimal-string-alignment distance check). Results are ranked by
+idf-weighted field matches, then rating.
+
+Posting lists are kept as sets for cheap maintenance and mirrored, on
+first use after a change, into sorted NumPy arrays of (document, field
+weight). A query intersects those arrays with dense boolean masks, starting
+from the most selective token, and applies the type/board/city/fee filters
+to per-document columns, so totals stay exact at vectorized cost. Ranking
+is capped at MAX_SCORED documents (or offset + limit, for deep pages) taken
+in impact order from the most selective token, so every page the total
+implies has results, and scoring is a searchsorted lookup per expanded
+term over that bounded set.
+
+The index is built once from the collection and then maintained
+incrementally through upsert()/remove() from the school write path.
+search() holds a lock and can run in a worker thread (server.py does);
+writes wait for it.
+"""
+
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from normalize import matches_city, normalize_key
+
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "city": 2.0,
+    "board": 1.5,
+    "address": 1.0,
+    "facilities": 1.0,
+}
+
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+FUZZY_MATCH = 0.5
+
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+MAX_PREFIX_EXPANSIONS = 64
+# Documents ranked per query when matching alone is too broad; the postings
+# of the most selective token are walked in impact order and cut off here.
+MAX_SCORED = 2000
+
+SEARCH_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "type": 1,
+    "board": 1,
+    "location": 1,
+    "facilities": 1,
+    "fees.annual_fee": 1,
+    "rating": 1,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _deletes(term: str) -> Set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insert, delete, substitution or transposition"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (
+            len(diffs) == 2
+            and diffs[1] == diffs[0] + 1
+            and a[diffs[0]] == b[diffs[1]]
+            and a[diffs[1]] == b[diffs[0]]
+        )
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def _document_fields(school: dict) -> Dict[str, str]:
+    location = school.get("location") or {}
+    return {
+        "name": school.get("name") or "",
+        "city": location.get("city") or "",
+        "board": school.get("board") or "",
+        "address": location.get("address") or "",
+        "facilities": " ".join(school.get("facilities") or []),
+    }
+
+
+class SchoolSearchIndex:
+    def __init__(self, capacity: int = 1024):
+        self._postings: Dict[str, Set[int]] = {}
+        # term -> (documents ascending, their field weights), rebuilt on first use after a change
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._impact_order: Dict[str, np.ndarray] = {}
+        self._vocabulary: List[str] = []
+        self._deletes: Dict[str, Set[str]] = {}
+        self._docs: Dict[int, dict] = {}
+        self._doc_ids: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._next_doc = 0
+        # Per-document filter and ranking columns; codes index the dicts below
+        self._types = np.full(capacity, -1, dtype=np.int32)
+        self._boards = np.full(capacity, -1, dtype=np.int32)
+        self._cities = np.full(capacity, -1, dtype=np.int32)
+        self._fees = np.full(capacity, np.nan)
+        self._ratings = np.zeros(capacity)
+        self._type_codes: Dict[str, int] = {}
+        self._board_codes: Dict[str, int] = {}
+        self._city_codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @classmethod
+    async def build(cls, collection, batch_size=5000):
+        index = cls()
+        async for school in collection.find({}, SEARCH_PROJECTION).batch_size(batch_size):
+            index.upsert(school)
+        return index
+
+    # Maintenance
+
+    def upsert(self, school: dict):
+        school_id = school.get("id")
+        if not school_id:
+            return
+        with self._lock:
+            self._remove(school_id)
+            doc = self._free.pop() if self._free else self._allocate()
+
+            weights: Dict[str, float] = {}
+            for field, text in _document_fields(school).items():
+                for term in tokenize(text):
+                    weights[term] = weights.get(term, 0.0) + FIELD_WEIGHTS[field]
+            for term in weights:
+                self._add_posting(term, doc)
+
+            location = school.get("location") or {}
+            fee = (school.get("fees") or {}).get("annual_fee")
+            self._docs[doc] = {"id": school_id, "terms": weights}
+            self._doc_ids[school_id] = doc
+            self._types[doc] = self._type_codes.setdefault(school.get("type"), len(self._type_codes))
+            self._boards[doc] = self._board_codes.setdefault(school.get("board"), len(self._board_codes))
+            self._cities[doc] = self._city_codes.setdefault(
+                normalize_key(location.get("city")), len(self._city_codes)
+            )
+            self._fees[doc] = fee if isinstance(fee, (int, float)) and not isinstance(fee, bool) else np.nan
+            self._ratings[doc] = school.get("rating") or 0.0
+
+    def remove(self, school_id: str):
+        with self._lock:
+            self._remove(school_id)
+
+    def _remove(self, school_id: str):
+        doc = self._doc_ids.pop(school_id, None)
+        if doc is None:
+            return
+        meta = self._docs.pop(doc)
+        for term in meta["terms"]:
+            self._remove_posting(term, doc)
+        self._types[doc] = self._boards[doc] = self._cities[doc] = -1
+        self._free.append(doc)
+
+    def _allocate(self):
+        doc = self._next_doc
+        self._next_doc += 1
+        if doc == len(self._ratings):
+            for name in ("_types", "_boards", "_cities", "_fees", "_ratings"):
+                old = getattr(self, name)
+                new = np.full(len(old) * 2, -1 if old.dtype == np.int32 else (np.nan if name == "_fees" else 0.0),
+                              dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+        return doc
+
+    def _changed(self, term):
+        self._arrays.pop(term, None)
+        self._impact_order.pop(term, None)
+
+    def _add_posting(self, term, doc):
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = set()
+            bisect.insort(self._vocabulary, term)
+            if len(term) >= MIN_FUZZY_LENGTH:
+                for key in _deletes(term) | {term}:
+                    self._deletes.setdefault(key, set()).add(term)
+        postings.add(doc)
+        self._changed(term)
+
+    def _remove_posting(self, term, doc):
+        postings = self._postings.get(term)
+        if postings is None:
+            return
+        postings.discard(doc)
+        self._changed(term)
+        if postings:
+            return
+        del self._postings[term]
+        position = bisect.bisect_left(self._vocabulary, term)
+        if position < len(self._vocabulary) and self._vocabulary[position] == term:
+            del self._vocabulary[position]
+        if len(term) >= MIN_FUZZY_LENGTH:
+            for key in _deletes(term) | {term}:
+                terms = self._deletes.get(key)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self._deletes[key]
+
+    # Querying
+
+    def _expand(self, token: str, prefix: bool) -> Dict[str, float]:
+        """Map every indexed term a query token can stand for to its match quality"""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT_MATCH
+        if prefix and len(token) >= MIN_PREFIX_LENGTH:
+            start = bisect.bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_MATCH)
+        if len(token) >= MIN_FUZZY_LENGTH:
+            candidates = set()
+            for key in _deletes(token) | {token}:
+                candidates |= self._deletes.get(key, set())
+            for term in candidates:
+                if term not in matches and _within_one_edit(token, term):
+                    matches[term] = FUZZY_MATCH
+        return matches
+
+    def _idf(self, term):
+        return math.log(1 + len(self._docs) / (1 + len(self._postings[term])))
+
+    def _array(self, term) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            docs = np.fromiter(self._postings[term], dtype=np.int64, count=len(self._postings[term]))
+            docs.sort()
+            weights = np.array([self._docs[doc]["terms"][term] for doc in docs.tolist()])
+            arrays = self._arrays[term] = (docs, weights)
+        return arrays
+
+    def _impact(self, term) -> np.ndarray:
+        """Documents of a term, best field weight first, then rating"""
+        order = self._impact_order.get(term)
+        if order is None:
+            docs, weights = self._array(term)
+            order = self._impact_order[term] = docs[np.lexsort((self._ratings[docs], weights))[::-1]]
+        return order
+
+    def _token_docs(self, matches: Dict[str, float]) -> np.ndarray:
+        arrays = [self._array(term)[0] for term in matches]
+        return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+    def _filter(self, docs, school_type, board, city, city_match, min_fee, max_fee) -> np.ndarray:
+        if school_type:
+            docs = docs[self._types[docs] == self._type_codes.get(school_type, -2)]
+        if board:
+            docs = docs[self._boards[docs] == self._board_codes.get(board, -2)]
+        if city:
+            codes = [code for key, code in self._city_codes.items() if matches_city(key, city, city_match)]
+            docs = docs[np.isin(self._cities[docs], codes)]
+        if min_fee or max_fee:
+            fees = self._fees[docs]
+            keep = ~np.isnan(fees)
+            if min_fee:
+                keep &= fees >= min_fee
+            if max_fee:
+                keep &= fees <= max_fee
+            docs = docs[keep]
+        return docs
+
+    def search(
+        self,
+        query: str,
+        offset: int = 0,
+        limit: int = 10,
+        school_type: Optional[str] = None,
+        board: Optional[str] = None,
+        city: Optional[str] = None,
+        min_fee: Optional[int] = None,
+        max_fee: Optional[int] = None,
+        city_match: str = "prefix",
+    ) -> Tuple[List[str], int]:
+        """Return (ranked school ids for the requested page, total matches)"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], 0
+        with self._lock:
+            return self._search(tokens, offset, limit, school_type, board, city, min_fee, max_fee, city_match)
+
+    def _search(self, tokens, offset, limit, school_type, board, city, min_fee, max_fee, city_match):
+        expansions = [
+            self._expand(token, prefix=(i == len(tokens) - 1))
+            for i, token in enumerate(tokens)
+        ]
+        if any(not matches for matches in expansions):
+            return [], 0
+
+        # Matching stays exact: start from the most selective token and
+        # narrow with a mask per other token, then the column filters.
+        sizes = [sum(len(self._postings[term]) for term in matches) for matches in expansions]
+        selective = min(range(len(tokens)), key=sizes.__getitem__)
+        matched = self._token_docs(expansions[selective])
+        for i in sorted(range(len(tokens)), key=sizes.__getitem__):
+            if i == selective or not len(matched):
+                continue
+            mask = np.zeros(self._next_doc, dtype=bool)
+            for term in expansions[i]:
+                mask[self._array(term)[0]] = True
+            matched = matched[mask[matched]]
+        matched = self._filter(matched, school_type, board, city, city_match, min_fee, max_fee)
+        total = len(matched)
+        if not total:
+            return [], 0
+
+        budget = max(MAX_SCORED, offset + limit)
+        if total <= budget:
+            scored = matched
+        else:
+            # Too many matches to score each one: walk the most selective
+            # token's postings in impact order and score the first hits.
+            in_matched = np.zeros(self._next_doc, dtype=bool)
+            in_matched[matched] = True
+            picked = []
+            remaining = budget
+            matches = expansions[selective]
+            for term in sorted(matches, key=matches.get, reverse=True):
+                order = self._impact(term)
+                hits = order[in_matched[order]][:remaining]
+                # A document is taken once, under its best term
+                in_matched[hits] = False
+                picked.append(hits)
+                remaining -= len(hits)
+                if not remaining:
+                    break
+            scored = np.concatenate(picked)
+
+        scores = np.zeros(len(scored))
+        for matches in expansions:
+            best = np.zeros(len(scored))
+            for term, quality in matches.items():
+                docs, weights = self._array(term)
+                positions = np.minimum(np.searchsorted(docs, scored), len(docs) - 1)
+                found = docs[positions] == scored
+                np.maximum(best, np.where(found, quality * self._idf(term) * weights[positions], 0.0), out=best)
+            scores += best
+
+        # Best score first, then rating, then the later document
+        ranking = np.lexsort((scored, self._ratings[scored], scores))[::-1][offset:offset + limit]
+        return [self._docs[int(doc)]["id"] for doc in scored[ranking]], total
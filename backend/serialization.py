@@ -0,0 +1,148 @@
+"""
+Lean JSON output for the school list endpoints.
+
+List cards only need a handful of fields, so listings fetch LIST_FIELDS by
+default (with the description cut to a card-sized preview by a $substrCP
+projection) and accept a `fields=` sparse fieldset; `fields=all` returns
+whole documents. mongomock cannot run $substrCP, so the --mock benchmark
+sets PREVIEW_IN_PYTHON and the preview is cut after reading. Responses
+are encoded with orjson directly, skipping FastAPI's jsonable_encoder pass.
+"""
+
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+
+from translations import DEFAULT_LANGUAGE, TRANSLATED_FIELDS
+
+LIST_FIELDS = (
+    "id",
+    "name",
+    "type",
+    "board",
+    "location.city",
+    "location.state",
+    "established_year",
+    "description",
+    "rating",
+    "reviews_count",
+    "fees.annual_fee",
+    "images",
+)
+
+# Top-level School fields a client may ask for
+SCHOOL_FIELDS = {
+    "id", "name", "type", "board", "location", "fees", "facilities", "rating", "reviews_count",
+    "images", "description", "established_year", "contact", "admission_info", "website", "updated_at",
+}
+
+DESCRIPTION_PREVIEW = 200
+
+# Cut previews after reading instead of in the projection (for mongomock)
+PREVIEW_IN_PYTHON = False
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered by orjson; return it directly from a route to skip jsonable_encoder"""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class FieldSet:
+    def __init__(self, paths: Optional[Iterable[str]], preview: bool = False):
+        # None means whole documents
+        self.paths: Optional[List[str]] = list(paths) if paths is not None else None
+        self.preview = preview
+
+    @classmethod
+    def parse(cls, fields: Optional[str]) -> "FieldSet":
+        """Default list fields, `all`, or a comma-separated list of (dotted) field names"""
+        if fields is None or not fields.strip():
+            return cls(LIST_FIELDS, preview=True)
+        if fields.strip() in ("all", "*"):
+            return cls(None)
+        paths = []
+        for path in (part.strip() for part in fields.split(",")):
+            if not path:
+                continue
+            if path.split(".", 1)[0] not in SCHOOL_FIELDS:
+                raise ValueError(f"Unknown field: {path}")
+            paths.append(path)
+        if "id" not in paths:
+            paths.insert(0, "id")
+        return cls(paths)
+
+    def projection(self, extra: Iterable[str] = (), lang: str = DEFAULT_LANGUAGE) -> Optional[dict]:
+        """Mongo projection; `extra` adds fields the server needs (sort keys, distance)
+
+        For another `lang`, the stored variants of the selected translated
+        fields are fetched too (see translations.localize).
+        """
+        if self.paths is None:
+            return None
+        projection = {path: 1 for path in self.paths}
+        for path in extra:
+            projection.setdefault(path, 1)
+        selected = {path.split(".", 1)[0] for path in self.paths}
+        descriptions = ["description"]
+        if lang != DEFAULT_LANGUAGE:
+            for field in TRANSLATED_FIELDS:
+                if field in selected:
+                    projection[f"translations.{lang}.{field}"] = 1
+            descriptions.append(f"translations.{lang}.description")
+        if self.preview and not PREVIEW_IN_PYTHON:
+            for path in descriptions:
+                if path in projection:
+                    projection[path] = {"$substrCP": [{"$ifNull": ["$" + path, ""]}, 0, DESCRIPTION_PREVIEW]}
+        return projection
+
+    def trim(self, doc: dict) -> dict:
+        """Cut the description of a fetched document to the card preview, in place
+
+        A no-op unless PREVIEW_IN_PYTHON; otherwise the projection already did it.
+        """
+        if PREVIEW_IN_PYTHON:
+            self._cut(doc)
+        return doc
+
+    def _cut(self, doc: dict) -> dict:
+        if self.preview and isinstance(doc.get("description"), str):
+            doc["description"] = doc["description"][:DESCRIPTION_PREVIEW]
+        return doc
+
+    def apply(self, doc: dict) -> dict:
+        """The same projection for documents already in memory; returns a new dict"""
+        if self.paths is None:
+            return dict(doc)
+        projected = {"_id": doc["_id"]} if "_id" in doc else {}
+        for path in self.paths:
+            source, target = doc, projected
+            *parents, leaf = path.split(".")
+            for part in parents:
+                source = source.get(part) if isinstance(source, dict) else None
+                if source is None:
+                    break
+                target = target.setdefault(part, {})
+            if isinstance(source, dict) and leaf in source:
+                target[leaf] = source[leaf]
+        return self._cut(projected)
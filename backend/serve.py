@@ -0,0 +1,65 @@
+"""
+Multi-process launcher for the API.
+
+Starts WEB_CONCURRENCY uvicorn workers (default: one per core). Each worker
+imports server.py and opens its own MongoDB pool in the lifespan hook, so
+nothing is shared across the fork. The total connection budget
+(--pool-budget / MONGO_POOL_BUDGET) is split evenly between the workers.
+
+Every worker also builds its own in-memory school state (search index,
+autocomplete, similar schools, catalogue, detail cache). School writes are
+logged to school_changes and replayed in the other workers within
+SCHOOL_SYNC_INTERVAL seconds, and the startup backfills run in whichever
+worker claims their lease first (see coordination.py). Scholarships and
+leaderboards are reloaded per worker every SCHOLARSHIP_REFRESH and
+LEADERBOARD_REFRESH seconds.
+
+    python serve.py --workers 4 --pool-budget 400
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+
+def per_worker_pool(budget: int, workers: int) -> int:
+    return max(10, budget // max(1, workers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    parser.add_argument("--pool-budget", type=int, default=int(os.getenv("MONGO_POOL_BUDGET", "400")),
+                        help="MongoDB connections across all workers")
+    parser.add_argument("--limit-concurrency", type=int,
+                        default=int(os.getenv("WORKER_LIMIT_CONCURRENCY", "0")) or None,
+                        help="per-worker cap on concurrent connections before uvicorn answers 503")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("BACKLOG", "2048")))
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE", "5")))
+    args = parser.parse_args()
+
+    # Read by server.py in each worker
+    os.environ["MONGO_MAX_POOL_SIZE"] = str(per_worker_pool(args.pool_budget, args.workers))
+    os.environ.setdefault("MONGO_MIN_POOL_SIZE", str(min(10, int(os.environ["MONGO_MAX_POOL_SIZE"]))))
+
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        limit_concurrency=args.limit_concurrency,
+        timeout_keep_alive=args.keep_alive,
+        # uvloop and httptools when installed
+        loop="auto",
+        http="auto",
+        proxy_headers=True,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,103 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Query
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from contextlib import asynccontextmanager
 from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel, Field
+from pymongo.errors import DuplicateKeyError
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import os
 import uuid
-from bson import ObjectId
+from bson import ObjectId, json_util
 import json
+import logging
+import asyncio
+import functools
+import inspect
+import re
+import secrets
 
-app = FastAPI(title="SchoolDekho API", version="1.0.0")
+from indexes import reconcile_indexes
+from search import SchoolSearchIndex
+from cache import LRUCache
+from pagination import InvalidCursor, apply_cursor, cursor_for, decode_offset_cursor, encode_cursor
+from facets import FacetCache
+from compare import COMPARE_PROJECTION, MAX_COMPARE, build_comparison, order_by_request
+from http_cache import conditional_response, render_entry
+from export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, accepts_gzip, export_stream
+from geo import MAX_RADIUS_KM, backfill_coordinates, nearby_pipeline, validate_coordinates, with_coordinates
+from normalize import backfill_location_keys, city_condition, normalize_key, raw_city_condition, with_location_keys
+from autocomplete import Autocomplete
+from leaderboard import RATING_SORT, Leaderboards
+from write_batcher import WriteBatcher
+from uploads import CHUNK_SIZE as UPLOAD_CHUNK_SIZE, UploadError, UploadStore
+from images import IMMUTABLE, MEDIA_TYPES as IMAGE_MEDIA_TYPES, ImageService
+from serialization import FastJSONResponse, FieldSet
+from compression import CompressionMiddleware
+from instrumentation import CommandMetrics, RequestMetricsMiddleware
+from singleflight import AdmissionGate, Overloaded, SingleFlight
+from translations import DEFAULT_LANGUAGE, LANGUAGES, localize, prune_stale
+from similar import SimilarSchools
+from loan_scoring import DEFAULT_TERMS as DEFAULT_LOAN_TERMS, assess as assess_loans, rescore as rescore_loans, schedule as loan_schedule
+from alumni import (
+    COUNTED, DIRECTORY_PROJECTION, DIRECTORY_SORT, REGISTRATION, adopt_legacy_counts, backfill_directory_keys,
+    count_alumni, directory_filter, is_alumnus, present_stats, record_alumnus, with_directory_keys
+)
+from catalogue import SchoolCatalogue
+from scholarships import CATEGORIES as SCHOLARSHIP_CATEGORIES, ScholarshipCatalogue
+from coordination import Lease, SchoolChangeFeed
+import metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The client is created here rather than at import so that every worker
+    # process opens its own connection pool after the fork.
+    owns_client = connect_database()
+    open_stores()
+    await ensure_indexes()
+    await warm_up()
+    # Writes served by other workers are replayed from here on, including
+    # those made while the indexes below are being built
+    await change_feed.start()
+    background = [
+        change_feed.run(),
+        # Under serve.py only one worker runs each backfill
+        leases.run_once("backfill_school_coordinates", backfill_school_coordinates),
+        track_location_keys(),
+        leaderboards.run(db.schools, serialize_doc),
+        sync_image_sources(),
+        sweep_uploads(),
+        scholarship_catalogue.run(db.scholarships),
+        leases.run_once("backfill_loan_assessments", backfill_loan_assessments),
+        leases.run_once("backfill_alumni_directory", backfill_alumni_directory),
+    ]
+    if school_catalogue is not None:
+        background.append(school_catalogue.run(db.schools, CATALOGUE_REFRESH, catalogue_sorts()))
+    # Until they are ready, search falls back to a name regex in Mongo and
+    # autocomplete answers from an empty index.
+    if WARM_INDEXES:
+        await asyncio.gather(rebuild_search_index(), rebuild_autocomplete())
+    else:
+        background += [rebuild_search_index(), rebuild_autocomplete()]
+    background.append(rebuild_similar_schools())
+    tasks = [asyncio.create_task(coroutine) for coroutine in background]
+    try:
+        yield
+    finally:
+        tasks += image_ingest_tasks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for batcher in write_batchers.values():
+            await batcher.close()
+        upload_store.close()
+        image_service.close()
+        if owns_client:
+            client.close()
+
+app = FastAPI(title="SchoolDekho API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -20,14 +107,75 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# Outermost, so request latency includes compression
+app.add_middleware(RequestMetricsMiddleware)
 
 # MongoDB connection
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/schooldekho")
-client = AsyncIOMotorClient(MONGO_URL)
-db = client.schooldekho
+# Per worker process; serve.py divides a total budget between workers
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+# Block startup until the search and autocomplete indexes are built
+WARM_INDEXES = os.getenv("WARM_INDEXES", "0") == "1"
+command_metrics = CommandMetrics(slow_ms=float(os.getenv("SLOW_QUERY_MS", "100")))
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+def mongo_client_options():
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": min(MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "300000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+        # Fail fast with a 500 instead of queueing forever when the pool is exhausted
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+        # primary keeps read-your-writes; secondaryPreferred offloads reads
+        "readPreference": os.getenv("MONGO_READ_PREFERENCE", "primary"),
+        "appname": os.getenv("MONGO_APP_NAME", "schooldekho-api"),
+        "event_listeners": [command_metrics],
+    }
+
+def connect_database() -> bool:
+    """Create the client unless one was injected (tests, benchmarks); returns whether we own it"""
+    global client, db
+    if client is not None:
+        db = db if db is not None else client.schooldekho
+        return False
+    client = AsyncIOMotorClient(MONGO_URL, **mongo_client_options())
+    db = client.schooldekho
+    return True
+
+async def warm_up():
+    try:
+        # Concurrent pings open up to the minimum pool before traffic arrives
+        await asyncio.gather(*(db.command("ping") for _ in range(max(1, MONGO_MIN_POOL_SIZE))))
+        await facet_cache.get(db.schools)
+    except Exception as e:
+        logger.error("Warm-up failed: %s", e)
 
 # Security
 security = HTTPBearer()
+# Bearer token for /api/admin; the admin API is disabled while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+async def require_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin API is disabled; set ADMIN_TOKEN")
+    if not secrets.compare_digest(credentials.credentials.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+logger = logging.getLogger("schooldekho")
+
+async def ensure_indexes():
+    try:
+        await reconcile_indexes(db, rebuild_drifted=os.getenv("REBUILD_DRIFTED_INDEXES") == "1")
+    except Exception as e:
+        # Never block startup on index maintenance; the drift report endpoint
+        # will show what is missing.
+        logger.error("Index reconciliation failed: %s", e)
 
 # Pydantic Models
 class School(BaseModel):
@@ -35,7 +183,7 @@ class School(BaseModel):
     name: str
     type: str  # Day School, Boarding School, Play School, PU College
     board: str  # CBSE, ICSE, IB, State Board
-    location: Dict[str, str]  # city, state, address
+    location: Dict[str, Any]  # city, state, address, optional lat/lng
     fees: Dict[str, int]  # annual_fee, admission_fee
     facilities: List[str]
     description: str
@@ -47,6 +195,12 @@ class School(BaseModel):
     established_year: int
     website: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    @field_validator("location")
+    @classmethod
+    def check_coordinates(cls, location):
+        return validate_coordinates(location)
 
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -55,6 +209,10 @@ class User(BaseModel):
     phone: str
     user_type: str  # parent, student, alumni, admin
     location: Dict[str, str]
+    # Alumni only
+    school_id: Optional[str] = None
+    graduation_year: Optional[int] = Field(None, ge=1900, le=2100)
+    profession: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
 
 class LoanApplication(BaseModel):
@@ -70,11 +228,48 @@ class LoanApplication(BaseModel):
     status: str = "pending"  # pending, approved, rejected
     created_at: datetime = Field(default_factory=datetime.now)
 
+class LoanTerms(BaseModel):
+    annual_rate: float = Field(ge=0, le=1)
+    tenure_months: int = Field(ge=1, le=360)
+    max_emi_ratio: float = Field(gt=0, le=1)
+    max_fee_multiple: float = Field(ge=1)
+    min_amount: int = Field(ge=0)
+
+class LoanDecision(BaseModel):
+    status: str = Field(pattern="^(approved|rejected|pending)$")
+    note: Optional[str] = None
+
+class UploadSessionRequest(BaseModel):
+    loan_id: str
+    filename: str
+    content_type: str
+    size: int
+
+class Scholarship(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    title: str
+    provider: str
+    category: str  # one of scholarships.CATEGORIES
+    type: str  # merit, need, merit-cum-need, ...
+    amount_min: int
+    amount_max: int
+    deadline: datetime
+    eligibility: str
+    criteria: Dict[str, Any] = {}  # max_family_income, min_marks, gender
+    locations: List[str] = []  # empty for national scholarships
+    description: Optional[str] = None
+    apply_url: Optional[str] = None
+    requirements: List[str] = []
+    created_at: datetime = Field(default_factory=datetime.now)
+
 class ScholarshipSearch(BaseModel):
-    eligibility_criteria: str
-    amount_range: Dict[str, int]
-    application_deadline: datetime
+    eligibility_criteria: str = ""  # a category, keywords, or empty for any
+    amount_range: Dict[str, int] = {}  # {"min": ..., "max": ...}; overlapping awards match
+    application_deadline: Optional[datetime] = None  # still open on this date
     location: Optional[str] = None
+    family_income: Optional[int] = None
+    marks_percent: Optional[float] = None
+    gender: Optional[str] = None
 
 # Helper functions
 def serialize_doc(doc):
@@ -82,6 +277,391 @@ def serialize_doc(doc):
         doc["_id"] = str(doc["_id"])
     return doc
 
+def serialize_school(doc):
+    doc = serialize_doc(doc)
+    if doc and doc.get("images") and image_service is not None:
+        doc["image_srcsets"] = [image_service.srcset(url) for url in doc["images"]]
+    return doc
+
+LANGUAGE_PATTERN = "^(" + "|".join(LANGUAGES) + ")$"
+
+def present_school(doc, lang=DEFAULT_LANGUAGE, field_set=None):
+    # localize() copies, so documents shared with in-memory caches stay untouched
+    doc = localize(doc, lang)
+    if field_set is not None:
+        field_set.trim(doc)
+    return serialize_school(doc)
+
+def build_school_filter(school_type=None, board=None, city=None, min_fee=None, max_fee=None, city_match="prefix"):
+    filter_query = {}
+    
+    if school_type:
+        filter_query["type"] = school_type
+    if board:
+        filter_query["board"] = board
+    if city and location_keys_ready:
+        filter_query["location.city_key"] = city_condition(city, city_match)
+    elif city:
+        filter_query["$or"] = [
+            {"location.city_key": city_condition(city, city_match)},
+            {"location.city_key": {"$exists": False}, "location.city": raw_city_condition(city, city_match)},
+        ]
+    if min_fee or max_fee:
+        fee_filter = {}
+        if min_fee:
+            fee_filter["$gte"] = min_fee
+        if max_fee:
+            fee_filter["$lte"] = max_fee
+        filter_query["fees.annual_fee"] = fee_filter
+    return filter_query
+
+# School write hooks: anything that keeps derived school state in memory
+# registers here and is told about every school write, with the document
+# before and after (None for insert/delete respectively). Writes are also
+# logged to school_changes and replayed in the other worker processes.
+school_write_hooks = []
+
+def on_school_write(hook):
+    school_write_hooks.append(hook)
+    return hook
+
+def origin_only(hook):
+    """Mark a hook with shared side effects, so replays in other workers skip it"""
+    hook.origin_only = True
+    return hook
+
+async def notify_school_write(school_id: str, school: Optional[dict] = None, previous: Optional[dict] = None,
+                              replayed: bool = False):
+    for hook in school_write_hooks:
+        if replayed and getattr(hook, "origin_only", False):
+            continue
+        try:
+            result = hook(school_id, school, previous)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error("School write hook %s failed for %s: %s", hook.__name__, school_id, e)
+    if not replayed:
+        try:
+            await change_feed.record(school_id, school, previous)
+        except Exception as e:
+            logger.error("Could not log school write %s for other workers: %s", school_id, e)
+
+async def replay_school_write(school_id, school, previous):
+    await notify_school_write(school_id, school, previous, replayed=True)
+
+# Cross-worker coordination, bound to the database in open_stores()
+change_feed: Optional[SchoolChangeFeed] = None
+leases: Optional[Lease] = None
+SCHOOL_SYNC_INTERVAL = float(os.getenv("SCHOOL_SYNC_INTERVAL", "1"))
+
+# Disk-backed stores, opened once the database is connected
+upload_store: Optional[UploadStore] = None
+image_service: Optional[ImageService] = None
+
+async def sweep_uploads():
+    """Remove partial uploads whose resumable session expired or was abandoned"""
+    while True:
+        try:
+            removed = await upload_store.sweep()
+            if removed:
+                logger.info("Removed %d orphaned partial uploads", removed)
+        except Exception as e:
+            logger.error("Upload sweep failed: %s", e)
+        await asyncio.sleep(UPLOAD_SWEEP_INTERVAL)
+
+UPLOAD_SWEEP_INTERVAL = float(os.getenv("UPLOAD_SWEEP_INTERVAL", "3600"))
+
+def open_stores():
+    global upload_store, image_service, change_feed, leases
+    change_feed = SchoolChangeFeed(db.school_changes, replay_school_write, interval=SCHOOL_SYNC_INTERVAL)
+    leases = Lease(db.leases)
+    upload_store = UploadStore(
+        os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")),
+        db.upload_sessions,
+        db.loan_documents,
+        workers=int(os.getenv("UPLOAD_IMAGE_WORKERS", "2"))
+    )
+    image_service = ImageService(
+        os.getenv("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_cache")),
+        db.image_sources,
+        max_bytes=int(os.getenv("IMAGE_CACHE_MAX_MB", "2048")) * 1024 * 1024,
+        base_url=os.getenv("IMAGE_BASE_URL", "/api/images"),
+        workers=int(os.getenv("IMAGE_WORKERS", "2"))
+    )
+    metrics.register_cache("images", image_service)
+
+# Responsive image derivatives
+image_ingest_limit = asyncio.Semaphore(int(os.getenv("IMAGE_INGEST_CONCURRENCY", "4")))
+image_ingest_tasks: set = set()
+IMAGE_SOURCES_REFRESH = float(os.getenv("IMAGE_SOURCES_REFRESH", "30"))
+
+async def ingest_school_images(school_id: str, urls):
+    async def ingest(url):
+        async with image_ingest_limit:
+            return await image_service.ingest(url)
+    results = await asyncio.gather(*(ingest(url) for url in urls))
+    if school_id and any(results):
+        forget_school_detail(school_id)
+
+async def backfill_school_images():
+    try:
+        urls = [url for url in await db.schools.distinct("images") if image_service.srcset(url) is None]
+        if urls:
+            await ingest_school_images(None, urls)
+            logger.info("Ingested %d school images", len(urls))
+    except Exception as e:
+        logger.error("Image backfill failed: %s", e)
+
+async def sync_image_sources():
+    """Load the ingested sources, backfill in one worker, then pick up other workers' ingests"""
+    try:
+        await image_service.load()
+    except Exception as e:
+        logger.error("Loading image sources failed: %s", e)
+    await leases.run_once("backfill_school_images", backfill_school_images)
+    while True:
+        await asyncio.sleep(IMAGE_SOURCES_REFRESH)
+        try:
+            await image_service.refresh()
+        except Exception as e:
+            logger.error("Image source refresh failed: %s", e)
+
+@on_school_write
+@origin_only
+def ingest_written_images(school_id, school, previous):
+    if image_service is None:
+        return
+    urls = [url for url in (school or {}).get("images", []) if image_service.srcset(url) is None]
+    if urls:
+        # The loop only keeps weak references to tasks
+        task = asyncio.create_task(ingest_school_images(school_id, urls))
+        image_ingest_tasks.add(task)
+        task.add_done_callback(image_ingest_tasks.discard)
+
+# School writes that arrive while an in-memory index is being built from the
+# collection, replayed onto it before it replaces the live one. The replay
+# runs without awaiting, so no write falls between it and the swap.
+pending_builds: Dict[str, list] = {}
+
+@on_school_write
+def buffer_pending_builds(school_id, school, previous):
+    for writes in pending_builds.values():
+        writes.append((school_id, school, previous))
+
+async def build_with_replay(name: str, build, apply):
+    writes = pending_builds[name] = []
+    try:
+        index = await build()
+        for school_id, school, previous in writes:
+            apply(index, school_id, school, previous)
+        return index
+    finally:
+        pending_builds.pop(name, None)
+
+# Search index
+search_index: Optional[SchoolSearchIndex] = None
+SEARCH_THREAD_MIN = int(os.getenv("SEARCH_THREAD_MIN", "50000"))
+
+def apply_search_write(index, school_id, school, previous):
+    if school is None:
+        index.remove(school_id)
+    else:
+        index.upsert(school)
+
+async def rebuild_search_index():
+    global search_index
+    try:
+        search_index = await build_with_replay(
+            "search", lambda: SchoolSearchIndex.build(db.schools), apply_search_write
+        )
+        logger.info("Search index built with %d schools", len(search_index))
+    except Exception as e:
+        logger.error("Search index build failed: %s", e)
+
+async def backfill_school_coordinates():
+    try:
+        updated = await backfill_coordinates(db.schools)
+        if updated:
+            logger.info("Backfilled city-centroid coordinates for %d schools", updated)
+    except Exception as e:
+        logger.error("Coordinate backfill failed: %s", e)
+
+async def backfill_school_location_keys():
+    try:
+        updated = await backfill_location_keys(db.schools)
+        if updated:
+            logger.info("Backfilled normalized city/state keys for %d schools", updated)
+    except Exception as e:
+        logger.error("Location key backfill failed: %s", e)
+
+# Until every school has location.city_key, city filters also match the raw
+# city of the schools that lack it (build_school_filter)
+location_keys_ready = False
+LOCATION_KEYS_POLL = float(os.getenv("LOCATION_KEYS_POLL", "30"))
+
+async def track_location_keys():
+    """Backfill in one worker, then let every worker drop the raw-city fallback once nothing is left"""
+    global location_keys_ready
+    await leases.run_once("backfill_school_location_keys", backfill_school_location_keys)
+    while True:
+        try:
+            if await db.schools.find_one({"location.city_key": {"$exists": False}}, {"_id": 1}) is None:
+                location_keys_ready = True
+                return
+        except Exception as e:
+            logger.error("Location key check failed: %s", e)
+        await asyncio.sleep(LOCATION_KEYS_POLL)
+
+# City and school-name type-ahead
+autocomplete: Optional[Autocomplete] = None
+
+async def rebuild_autocomplete():
+    global autocomplete
+    try:
+        autocomplete = await build_with_replay(
+            "autocomplete",
+            lambda: Autocomplete.build(db.schools),
+            lambda index, school_id, school, previous: index.apply_write(school, previous)
+        )
+        logger.info("Autocomplete built with %d schools", len(autocomplete.schools))
+    except Exception as e:
+        logger.error("Autocomplete build failed: %s", e)
+
+@on_school_write
+def update_autocomplete(school_id, school, previous):
+    if autocomplete is not None:
+        autocomplete.apply_write(school, previous)
+
+@on_school_write
+def update_search_index(school_id, school, previous):
+    if search_index is not None:
+        apply_search_write(search_index, school_id, school, previous)
+
+# "Similar schools" feature matrix
+similar_schools: Optional[SimilarSchools] = None
+
+async def rebuild_similar_schools():
+    global similar_schools
+    try:
+        similar_schools = await build_with_replay(
+            "similar", lambda: SimilarSchools.build(db.schools), apply_similar_write
+        )
+        logger.info("Similar-schools index built with %d schools", len(similar_schools))
+    except Exception as e:
+        logger.error("Similar-schools index build failed: %s", e)
+
+def apply_similar_write(index, school_id, school, previous):
+    if school is None:
+        index.remove(school_id)
+    else:
+        index.upsert(school)
+
+@on_school_write
+def update_similar_schools(school_id, school, previous):
+    if similar_schools is not None:
+        apply_similar_write(similar_schools, school_id, school, previous)
+
+# Optional columnar snapshot answering page-mode listings and counts in memory
+SCHOOL_CATALOGUE = os.getenv("SCHOOL_CATALOGUE", "0") == "1"
+CATALOGUE_REFRESH = float(os.getenv("CATALOGUE_REFRESH", "2"))
+school_catalogue: Optional[SchoolCatalogue] = SchoolCatalogue() if SCHOOL_CATALOGUE else None
+if school_catalogue is not None:
+    metrics.register_cache("school_catalogue", school_catalogue)
+
+@on_school_write
+def update_school_catalogue(school_id, school, previous):
+    if school_catalogue is None:
+        return
+    if school is None:
+        school_catalogue.remove(school_id)
+    else:
+        school_catalogue.upsert(school)
+
+def catalogue_ready() -> bool:
+    return school_catalogue is not None and school_catalogue.ready
+
+def catalogue_miss():
+    """Count a query the catalogue could have answered but Mongo served"""
+    if school_catalogue is not None:
+        school_catalogue.misses += 1
+
+# Listing state
+# Stable keyset order for cursor pagination
+SCHOOL_LIST_SORT = [("_id", 1)]
+# sort= options; a leading "-" reverses the order. Every spec ends in _id
+# so keyset cursors stay unambiguous.
+SORT_OPTIONS = {
+    "rating": RATING_SORT,
+    "fee": [("fees.annual_fee", 1), ("_id", 1)],
+    "reviews": [("reviews_count", -1), ("_id", 1)],
+    "established_year": [("established_year", 1), ("_id", 1)]
+}
+
+def catalogue_sorts():
+    """Every sort spec a listing can ask for, both directions"""
+    specs = [SCHOOL_LIST_SORT]
+    for name in SORT_OPTIONS:
+        specs += [resolve_sort(name), resolve_sort("-" + name)]
+    return specs
+
+def resolve_sort(sort):
+    if not sort:
+        return SCHOOL_LIST_SORT
+    spec = SORT_OPTIONS[sort.lstrip("-")]
+    if sort.startswith("-"):
+        spec = [(field, -direction) for field, direction in spec]
+    return spec
+# Per-filter totals for count=cached
+count_cache = LRUCache(maxsize=1024, ttl=float(os.getenv("COUNT_CACHE_TTL", "30")))
+
+@on_school_write
+def invalidate_counts(school_id, school, previous):
+    count_cache.clear()
+
+# Filter options, patched in place on school writes
+facet_cache = FacetCache(ttl=float(os.getenv("FACET_CACHE_TTL", "300")))
+metrics.register_cache("facets", facet_cache)
+metrics.register_cache("school_counts", count_cache)
+
+@on_school_write
+def update_facets(school_id, school, previous):
+    facet_cache.apply_write(school, previous)
+
+# Rendered school detail responses with their ETag/Last-Modified validators
+school_cache = LRUCache(
+    maxsize=int(os.getenv("SCHOOL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SCHOOL_CACHE_TTL", "3600"))
+)
+metrics.register_cache("school_detail", school_cache)
+
+# Bumped by every invalidation; a load that overlapped one may have read the
+# old document and does not fill the cache
+school_cache_generation = 0
+
+# Keyed by (school_id, lang)
+def forget_school_detail(school_id: str):
+    global school_cache_generation
+    school_cache_generation += 1
+    for lang in LANGUAGES:
+        school_cache.pop((school_id, lang))
+
+@on_school_write
+def invalidate_school_detail(school_id, school, previous):
+    forget_school_detail(school_id)
+
+# Top-rated schools per (city, board, type), refreshed in the background
+leaderboards = Leaderboards(refresh_interval=float(os.getenv("LEADERBOARD_REFRESH", "300")))
+metrics.register_cache("leaderboards", leaderboards)
+
+@on_school_write
+def invalidate_leaderboards(school_id, school, previous):
+    leaderboards.mark_written(school, previous)
+
+# Scholarships are matched in memory; reloaded in the background
+scholarship_catalogue = ScholarshipCatalogue(refresh_interval=float(os.getenv("SCHOLARSHIP_REFRESH", "300")))
+metrics.register_cache("scholarships", scholarship_catalogue)
+
 # API Routes
 
 @app.get("/")
@@ -93,12 +673,52 @@ async def root():
 async def health_check():
     try:
         # Test database connection
-        await db.schools.find_one()
+        await db.command("ping")
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+        logger.error("Health check failed: %s", e)
+        return FastJSONResponse({"status": "unhealthy", "error": str(e)}, status_code=503)
+
+# Concurrent identical reads share one database call, and at most
+# READ_CONCURRENCY of those run at once; the rest queue briefly or get a 503.
+read_flights = SingleFlight()
+metrics.register_cache("read_coalescing", read_flights)
+read_gate = AdmissionGate(
+    limit=int(os.getenv("READ_CONCURRENCY", str(MONGO_MAX_POOL_SIZE))),
+    max_queue=int(os.getenv("READ_QUEUE_SIZE", "500")),
+    queue_timeout=float(os.getenv("READ_QUEUE_TIMEOUT", "2"))
+)
+
+async def coalesced_read(key, load):
+    async def admitted():
+        async with read_gate:
+            return await load()
+    try:
+        return await read_flights.do(key, admitted)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": str(e.retry_after)})
+
+@on_school_write
+def forget_inflight_reads(school_id, school, previous):
+    # Reads that start after a write must not join a flight that began before it
+    read_flights.forget()
 
 # School Routes
+async def count_schools(filter_query, mode):
+    if mode == "none":
+        return None
+    if mode == "exact":
+        return await db.schools.count_documents(filter_query)
+    if mode == "estimated" and not filter_query:
+        return await db.schools.estimated_document_count()
+    # "cached", and "estimated" with a filter: exact count reused per filter
+    key = json_util.dumps(filter_query, sort_keys=True)
+    total = count_cache.get(key)
+    if total is None:
+        total = await db.schools.count_documents(filter_query)
+        count_cache.set(key, total)
+    return total
+
 @app.get("/api/schools")
 async def get_schools(
     page: int = Query(1, ge=1),
@@ -107,81 +727,479 @@ async def get_schools(
     board: Optional[str] = None,
     city: Optional[str] = None,
     min_fee: Optional[int] = None,
-    max_fee: Optional[int] = None
+    max_fee: Optional[int] = None,
+    search: Optional[str] = None,
+    city_match: str = Query("prefix", regex="^(exact|prefix)$"),
+    sort: Optional[str] = Query(None, regex="^-?(rating|fee|reviews|established_year)$", description="Ignored with search, which ranks by relevance"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination; pass an empty value for the first page, then the returned `next`"),
+    count: Optional[str] = Query(None, regex="^(exact|estimated|cached|none)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, or `all`; defaults to the list-card fields"),
+    lang: str = Query(DEFAULT_LANGUAGE, regex=LANGUAGE_PATTERN, description="Serve stored translations for this locale")
 ):
+    # Page mode keeps its exact total for old clients; cursor mode skips it unless asked
+    count_mode = count or ("none" if cursor is not None else "exact")
+    try:
+        field_set = FieldSet.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Requests that differ only in city spelling or search case give the same page
+    key = (
+        "schools", page, limit, school_type, board, normalize_key(city), min_fee, max_fee,
+        search.lower() if search else None, city_match, sort, cursor, count_mode, fields, lang
+    )
+    body = await coalesced_read(key, lambda: list_schools(
+        page, limit, school_type, board, city, min_fee, max_fee, search, city_match, sort, cursor, count_mode,
+        field_set, lang
+    ))
+    return FastJSONResponse(body)
+
+async def list_schools(page, limit, school_type, board, city, min_fee, max_fee, search, city_match, sort, cursor,
+                       count_mode, field_set, lang):
     skip = (page - 1) * limit
-    filter_query = {}
-    
-    if school_type:
-        filter_query["type"] = school_type
-    if board:
-        filter_query["board"] = board
-    if city:
-        filter_query["location.city"] = {"$regex": city, "$options": "i"}
-    if min_fee or max_fee:
-        fee_filter = {}
-        if min_fee:
-            fee_filter["$gte"] = min_fee
-        if max_fee:
-            fee_filter["$lte"] = max_fee
-        filter_query["fees.annual_fee"] = fee_filter
-    
+    filter_query = build_school_filter(school_type, board, city, min_fee, max_fee, city_match)
     try:
-        cursor = db.schools.find(filter_query).skip(skip).limit(limit)
-        schools = await cursor.to_list(length=limit)
-        total = await db.schools.count_documents(filter_query)
+        if search and search_index is not None:
+            if cursor is not None:
+                skip = decode_offset_cursor(cursor) if cursor else 0
+            run_search = functools.partial(
+                search_index.search,
+                search,
+                offset=skip,
+                limit=limit,
+                school_type=school_type,
+                board=board,
+                city=city,
+                min_fee=min_fee,
+                max_fee=max_fee,
+                city_match=city_match,
+            )
+            # Large indexes search off the event loop, like similar(); on
+            # small ones the thread hop costs more than the search
+            if len(search_index) >= SEARCH_THREAD_MIN:
+                school_ids, total = await asyncio.to_thread(run_search)
+            else:
+                school_ids, total = run_search()
+            found = await db.schools.find({"id": {"$in": school_ids}}, field_set.projection(lang=lang)).to_list(length=limit)
+            by_id = {school["id"]: school for school in found}
+            schools = [by_id[school_id] for school_id in school_ids if school_id in by_id]
+            if cursor is not None:
+                return {
+                    "schools": [present_school(school, lang, field_set) for school in schools],
+                    "next": encode_cursor([skip + limit]) if skip + limit < total else None,
+                    "total": total
+                }
+            return {
+                "schools": [present_school(school, lang, field_set) for school in schools],
+                "total": total,
+                "page": page,
+                "pages": (total + limit - 1) // limit
+            }
+        if search:
+            filter_query["name"] = {"$regex": re.escape(search), "$options": "i"}
+        
+        sort_spec = resolve_sort(sort)
+        # Sort keys stay in the projection so next cursors can be built
+        projection = field_set.projection(extra=[field for field, _ in sort_spec], lang=lang)
+        if cursor is not None:
+            query = apply_cursor(filter_query, sort_spec, cursor)
+            schools = await db.schools.find(query, projection).sort(sort_spec).limit(limit + 1).to_list(length=limit + 1)
+            next_cursor = cursor_for(schools[limit - 1], sort_spec) if len(schools) > limit else None
+            response = {
+                "schools": [present_school(school, lang, field_set) for school in schools[:limit]],
+                "next": next_cursor
+            }
+            # The page comes from the city_key filter; the catalogue falls
+            # back to location.city for schools without one, so it only
+            # counts city filters once the key backfill is done
+            countable = count_mode != "none" and not search
+            if countable and catalogue_ready() and (not city or location_keys_ready):
+                total = school_catalogue.count(school_type, board, city, city_match, min_fee, max_fee)
+            else:
+                if countable:
+                    catalogue_miss()
+                total = await count_schools(filter_query, count_mode)
+            if total is not None:
+                response["total"] = total
+            return response
+        
+        if not search and not catalogue_ready():
+            catalogue_miss()
+        elif not search and school_catalogue.supports(sort_spec):
+            # Filter, sort and count in memory; only the page is read from Mongo
+            school_ids, total = school_catalogue.query(
+                sort_spec, skip, limit, school_type, board, city, city_match, min_fee, max_fee
+            )
+            found = await db.schools.find({"id": {"$in": school_ids}}, projection).to_list(length=limit)
+            total = total if count_mode != "none" else None
+            return {
+                "schools": [present_school(school, lang, field_set) for school in order_by_request(school_ids, found)],
+                "total": total,
+                "page": page,
+                "pages": (total + limit - 1) // limit if total is not None else None
+            }
+        
+        # The snapshot groups by city_key, so it misses schools not yet backfilled
+        if sort == "rating" and city and location_keys_ready and not (search or min_fee or max_fee):
+            # "Top-rated <board> <type> schools in <city>" landing pages
+            cached = leaderboards.lookup(city, board, school_type, city_match, skip, limit)
+            if cached is not None:
+                schools, total = cached
+                return {
+                    "schools": [serialize_school(field_set.apply(localize(school, lang))) for school in schools],
+                    "total": total,
+                    "page": page,
+                    "pages": (total + limit - 1) // limit
+                }
+        
+        cursor = db.schools.find(filter_query, projection)
+        if sort:
+            cursor = cursor.sort(sort_spec)
+        schools = await cursor.skip(skip).limit(limit).to_list(length=limit)
+        total = await count_schools(filter_query, count_mode)
         
         return {
-            "schools": [serialize_doc(school) for school in schools],
+            "schools": [present_school(school, lang, field_set) for school in schools],
             "total": total,
             "page": page,
-            "pages": (total + limit - 1) // limit
+            "pages": (total + limit - 1) // limit if total is not None else None
         }
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/schools/export")
+async def export_schools(
+    request: Request,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    school_type: Optional[str] = None,
+    board: Optional[str] = None,
+    city: Optional[str] = None,
+    min_fee: Optional[int] = None,
+    max_fee: Optional[int] = None,
+    city_match: str = Query("prefix", regex="^(exact|prefix)$")
+):
+    filter_query = build_school_filter(school_type, board, city, min_fee, max_fee, city_match)
+    gzip = accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": f'attachment; filename="schools.{format}"',
+        "Vary": "Accept-Encoding"
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_stream(db.schools, filter_query, format, gzip),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers
+    )
+
+@app.get("/api/schools/nearby")
+async def get_nearby_schools(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(10, gt=0, le=MAX_RADIUS_KM, description="Search radius in km"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=50),
+    school_type: Optional[str] = None,
+    board: Optional[str] = None,
+    min_fee: Optional[int] = None,
+    max_fee: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields, or `all`; defaults to the list-card fields")
+):
+    filter_query = build_school_filter(school_type, board, None, min_fee, max_fee)
+    try:
+        field_set = FieldSet.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        pipeline = nearby_pipeline(
+            lat, lng, radius, filter_query, limit, skip=(page - 1) * limit,
+            projection=field_set.projection(extra=["distance_km", "location.geo_source"])
+        )
+        schools = await db.schools.aggregate(pipeline).to_list(length=limit)
+        return FastJSONResponse({
+            "schools": [present_school(school, field_set=field_set) for school in schools],
+            "page": page,
+            "radius_km": radius
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_school_entry(school_id: str, lang: str):
+    generation = school_cache_generation
+    school = await db.schools.find_one({"id": school_id})
+    if not school:
+        raise HTTPException(status_code=404, detail="School not found")
+    entry = render_entry(present_school(school, lang))
+    if generation == school_cache_generation:
+        school_cache.set((school_id, lang), entry)
+    return entry
+
 @app.get("/api/schools/{school_id}")
-async def get_school(school_id: str):
+async def get_school(
+    school_id: str,
+    request: Request,
+    lang: str = Query(DEFAULT_LANGUAGE, regex=LANGUAGE_PATTERN, description="Serve stored translations for this locale")
+):
+    try:
+        entry = school_cache.get((school_id, lang))
+        if entry is None:
+            entry = await coalesced_read(("school", school_id, lang), lambda: load_school_entry(school_id, lang))
+        return conditional_response(request, entry)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/schools/{school_id}/similar")
+async def get_similar_schools(
+    school_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, or `all`; defaults to the list-card fields"),
+    lang: str = Query(DEFAULT_LANGUAGE, regex=LANGUAGE_PATTERN, description="Serve stored translations for this locale")
+):
+    try:
+        field_set = FieldSet.parse(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if similar_schools is None:
+        raise HTTPException(status_code=503, detail="Similar schools are not available yet", headers={"Retry-After": "5"})
+    try:
+        # Scoring a large catalogue takes milliseconds of CPU; keep it off the event loop
+        ranked = await asyncio.to_thread(similar_schools.similar, school_id, limit)
+        if ranked is None:
+            raise HTTPException(status_code=404, detail="School not found")
+        ids = [similar_id for similar_id, _ in ranked]
+        found = await db.schools.find({"id": {"$in": ids}}, field_set.projection(lang=lang)).to_list(length=len(ids))
+        scores = dict(ranked)
+        schools = []
+        for school in order_by_request(ids, found):
+            school = present_school(school, lang, field_set)
+            school["similarity"] = scores[school["id"]]
+            schools.append(school)
+        return FastJSONResponse({"school_id": school_id, "schools": schools})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/schools", dependencies=[Depends(require_admin)])
+async def create_school(school: School):
+    try:
+        school_dict = with_location_keys(with_coordinates(school.dict()))
+        await db.schools.insert_one(school_dict)
+        await notify_school_write(school.id, school_dict)
+        return {"message": "School created successfully", "school_id": school.id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.put("/api/schools/{school_id}", dependencies=[Depends(require_admin)])
+async def update_school(school_id: str, school: School):
     try:
-        school = await db.schools.find_one({"id": school_id})
-        if not school:
+        school_dict = with_location_keys(with_coordinates(school.dict()))
+        school_dict["id"] = school_id
+        school_dict["updated_at"] = datetime.now()
+        existing = await db.schools.find_one({"id": school_id}, {"_id": 0})
+        if not existing:
             raise HTTPException(status_code=404, detail="School not found")
-        return serialize_doc(school)
+        school_dict["created_at"] = existing.get("created_at", school_dict["created_at"])
+        # Keep the translations whose English source did not change
+        school_dict["translations"] = prune_stale(existing.get("translations"), school_dict)
+        await db.schools.replace_one({"id": school_id}, school_dict)
+        await notify_school_write(school_id, school_dict, existing)
+        return {"message": "School updated successfully", "school_id": school_id}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/schools/compare")
 async def compare_schools(school_ids: List[str]):
     try:
-        schools = []
-        for school_id in school_ids:
-            school = await db.schools.find_one({"id": school_id})
-            if school:
-                schools.append(serialize_doc(school))
+        school_ids = list(dict.fromkeys(school_ids))
+        if len(school_ids) > MAX_COMPARE:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_COMPARE} schools can be compared")
+        
+        found = await db.schools.find(
+            {"id": {"$in": school_ids}}, COMPARE_PROJECTION
+        ).to_list(length=len(school_ids))
+        schools = order_by_request(school_ids, found)
         
         if len(schools) < 2:
             raise HTTPException(status_code=400, detail="At least 2 schools required for comparison")
         
-        return {"schools": schools}
+        return {"schools": schools, "comparison": build_comparison(schools)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Write path for loan applications and registrations. With WRITE_BATCHING=1
+# concurrent inserts are group-committed (see write_batcher.py) and
+# acknowledged once journaled on a majority, which amortizes that wait over
+# the batch; otherwise it is a plain insert_one with the collection's default
+# write concern.
+WRITE_BATCHING = os.getenv("WRITE_BATCHING", "0") == "1"
+write_batchers: Dict[str, WriteBatcher] = {}
+
+async def insert_document(collection_name: str, document: dict):
+    if not WRITE_BATCHING:
+        await db[collection_name].insert_one(document)
+        return
+    batcher = write_batchers.get(collection_name)
+    if batcher is None:
+        batcher = write_batchers[collection_name] = WriteBatcher(
+            db[collection_name],
+            max_batch=int(os.getenv("WRITE_BATCH_SIZE", "500")),
+            max_delay=float(os.getenv("WRITE_BATCH_DELAY_MS", "5")) / 1000
+        )
+    await batcher.insert(document)
+
+# Loan scoring: terms live in the settings collection so every worker and
+# re-score run agrees on them (see loan_scoring.py)
+LOAN_QUEUE_SORT = [("assessment.score", -1), ("created_at", 1), ("id", 1)]
+LOAN_LIST_SORT = [("created_at", -1), ("id", 1)]
+
+async def current_loan_terms() -> dict:
+    stored = await db.settings.find_one({"_id": "loan_terms"}, {"_id": 0})
+    return {**DEFAULT_LOAN_TERMS, **(stored or {})}
+
+async def backfill_loan_assessments():
+    try:
+        report = await rescore_loans(
+            db.loan_applications, db.schools, await current_loan_terms(), {"assessment": {"$exists": False}}
+        )
+        if report["scored"]:
+            logger.info("Scored %d unassessed loan applications in %.0f ms", report["scored"], report["elapsed_ms"])
+    except Exception as e:
+        logger.error("Loan assessment backfill failed: %s", e)
+
 # Loan Application Routes
 @app.post("/api/loans/apply")
 async def apply_loan(loan: LoanApplication):
     try:
         loan_dict = loan.dict()
-        result = await db.loan_applications.insert_one(loan_dict)
+        # Scored on arrival so the application enters the review queue in order
+        loan_dict["assessment"] = (await assess_loans([loan_dict], db.schools, await current_loan_terms()))[0]
+        await insert_document("loan_applications", loan_dict)
         return {"message": "Loan application submitted successfully", "application_id": loan.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/loans/{user_id}")
-async def get_user_loans(user_id: str):
+async def get_user_loans(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Keyset pagination; pass an empty value for the first page, then the returned `next`")
+):
+    try:
+        # Newest first; without a cursor the plain list is capped at `limit`
+        query = apply_cursor({"user_id": user_id}, LOAN_LIST_SORT, cursor or "")
+        loans = await db.loan_applications.find(query).sort(LOAN_LIST_SORT).limit(limit + 1).to_list(length=limit + 1)
+        page = [serialize_doc(loan) for loan in loans[:limit]]
+        if cursor is None:
+            return page
+        return {"loans": page, "next": cursor_for(loans[limit - 1], LOAN_LIST_SORT) if len(loans) > limit else None}
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Loan Document Routes
+async def attach_document(document: dict):
+    await db.loan_applications.update_one(
+        {"id": document["loan_id"]},
+        {"$push": {"documents": document["id"]}}
+    )
+    document.pop("_id", None)
+    return document
+
+async def require_loan(loan_id: str):
+    if not await db.loan_applications.find_one({"id": loan_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Loan application not found")
+
+@app.post("/api/loans/{loan_id}/documents")
+async def upload_loan_document(loan_id: str, file: UploadFile = File(...)):
     try:
-        cursor = db.loan_applications.find({"user_id": user_id})
-        loans = await cursor.to_list(length=None)
-        return [serialize_doc(loan) for loan in loans]
+        await require_loan(loan_id)
+
+        async def chunks():
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+        document = await upload_store.save_stream(loan_id, file.filename, file.content_type, chunks())
+        return await attach_document(document)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Resumable uploads: POST opens a session, HEAD reports the committed offset,
+# PATCH appends the raw request body at the Upload-Offset it names.
+@app.post("/api/uploads", status_code=201)
+async def create_upload(upload: UploadSessionRequest, response: Response):
+    try:
+        await require_loan(upload.loan_id)
+        session = await upload_store.create_session(upload.loan_id, upload.filename, upload.content_type, upload.size)
+        response.headers["Location"] = f"/api/uploads/{session['id']}"
+        return {"upload_id": session["id"], "offset": 0, "size": session["size"]}
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.head("/api/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str):
+    try:
+        session = await upload_store.get_session(upload_id)
+        return Response(headers={
+            "Upload-Offset": str(session["offset"]),
+            "Upload-Length": str(session["size"]),
+            "Cache-Control": "no-store"
+        })
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.patch("/api/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request):
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+    try:
+        session = await upload_store.append(upload_id, offset, request.stream())
+        body = {"upload_id": upload_id, "offset": session["offset"], "size": session["size"]}
+        if "document" in session:
+            body["document"] = await attach_document(session["document"])
+        return body
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/documents/{document_id}")
+async def get_loan_document(document_id: str):
+    try:
+        document = await db.loan_documents.find_one({"id": document_id}, {"_id": 0})
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        return FileResponse(
+            upload_store.absolute_path(document),
+            media_type=document["content_type"],
+            filename=document["filename"],
+            headers={"ETag": f'"{document["sha256"]}"', "Cache-Control": "private, max-age=86400"}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -189,14 +1207,66 @@ async def get_user_loans(user_id: str):
 @app.post("/api/users/register")
 async def register_user(user: User):
     try:
-        # Check if user already exists
-        existing_user = await db.users.find_one({"email": user.email})
-        if existing_user:
-            raise HTTPException(status_code=400, detail="User already exists")
-        
+        # Duplicate emails are rejected by the users.email_unique index
         user_dict = user.dict()
-        result = await db.users.insert_one(user_dict)
+        if is_alumnus(user_dict):
+            with_directory_keys(user_dict)
+            # Counted below, so count_alumni() leaves it alone
+            user_dict[COUNTED] = REGISTRATION
+        await insert_document("users", user_dict)
+        await record_alumnus(db.alumni_stats, user_dict)
         return {"message": "User registered successfully", "user_id": user.id}
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="User already exists")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Scholarship Routes
+@app.get("/api/scholarships")
+async def get_scholarships(
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    try:
+        index = await scholarship_catalogue.current(db.scholarships)
+        scholarships, total, categories = index.listing(datetime.now(), category, location, offset, limit)
+        return FastJSONResponse({"scholarships": scholarships, "total": total, "facets": {"category": categories}})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/scholarships/match")
+async def match_scholarships(
+    search: ScholarshipSearch,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    amount_min = search.amount_range.get("min")
+    amount_max = search.amount_range.get("max")
+    if amount_min is not None and amount_max is not None and amount_min > amount_max:
+        raise HTTPException(status_code=400, detail="amount_range.min is greater than amount_range.max")
+    try:
+        index = await scholarship_catalogue.current(db.scholarships)
+        scholarships, total, categories = index.match(
+            datetime.now(), search.eligibility_criteria, amount_min, amount_max, search.application_deadline,
+            search.location, search.family_income, search.marks_percent, search.gender, offset, limit
+        )
+        return FastJSONResponse({"scholarships": scholarships, "total": total, "facets": {"category": categories}})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/scholarships")
+async def create_scholarship(scholarship: Scholarship):
+    if scholarship.category not in SCHOLARSHIP_CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"Unknown category: {scholarship.category}")
+    if scholarship.amount_min > scholarship.amount_max:
+        raise HTTPException(status_code=400, detail="amount_min is greater than amount_max")
+    try:
+        scholarship_dict = scholarship.dict()
+        await db.scholarships.insert_one(scholarship_dict)
+        scholarship_catalogue.add(scholarship_dict)
+        return {"message": "Scholarship created successfully", "scholarship_id": scholarship.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -204,32 +1274,180 @@ async def register_user(user: User):
 @app.get("/api/filters/options")
 async def get_filter_options():
     try:
-        school_types = await db.schools.distinct("type")
-        boards = await db.schools.distinct("board")
-        cities = await db.schools.distinct("location.city")
-        
-        return {
-            "school_types": school_types,
-            "boards": boards,
-            "cities": cities
-        }
+        return await facet_cache.get(db.schools)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Autocomplete
+@app.get("/api/autocomplete")
+async def get_autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    kind: str = Query("all", regex="^(all|city|school)$"),
+    limit: int = Query(8, ge=1, le=16)
+):
+    if autocomplete is None:
+        # Still building; an empty answer beats a slow one for type-ahead
+        return Autocomplete().complete(q, kind, limit)
+    return autocomplete.complete(q, kind, limit)
+
 # Alumni Routes
+async def backfill_alumni_directory():
+    try:
+        updated = await backfill_directory_keys(db.users)
+        if updated:
+            logger.info("Backfilled directory keys for %d alumni", updated)
+        if await adopt_legacy_counts(db.users, db.alumni_stats):
+            logger.info("Marked alumni already in the aggregates as counted")
+        # Registrations keep alumni_stats current from then on
+        counted = await count_alumni(db.users, db.alumni_stats)
+        if counted:
+            logger.info("Added %d alumni to the aggregates", counted)
+    except Exception as e:
+        logger.error("Alumni directory backfill failed: %s", e)
+
 @app.get("/api/alumni/{school_id}")
-async def get_school_alumni(school_id: str):
+async def get_school_alumni(
+    school_id: str,
+    q: Optional[str] = Query(None, description="Name; each word matches the start of a name part"),
+    graduation_year: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    profession: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Keyset pagination; pass an empty value for the first page, then the returned `next`")
+):
     try:
-        # For now, return mock alumni data
-        alumni = await db.users.find({
-            "user_type": "alumni",
-            "school_id": school_id
-        }).to_list(length=None)
-        
-        return [serialize_doc(alumnus) for alumnus in alumni]
+        filter_query = directory_filter(school_id, q, graduation_year, year_from, year_to, profession)
+        query = apply_cursor(filter_query, DIRECTORY_SORT, cursor or "")
+        alumni = await db.users.find(query, DIRECTORY_PROJECTION).sort(DIRECTORY_SORT).limit(limit + 1).to_list(length=limit + 1)
+        page = alumni[:limit]
+        next_cursor = cursor_for(alumni[limit - 1], DIRECTORY_SORT) if len(alumni) > limit else None
+        for alumnus in page:
+            alumnus.pop("name_key", None)
+            alumnus.pop("directory_year", None)
+        # Without a cursor the plain list is kept, capped at `limit`
+        if cursor is None:
+            return page
+        return {"alumni": page, "next": next_cursor}
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/alumni/{school_id}/stats")
+async def get_school_alumni_stats(school_id: str, top: int = Query(10, ge=1, le=50)):
+    try:
+        return present_stats(school_id, await db.alumni_stats.find_one({"_id": school_id}), top)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Image Routes
+@app.get("/api/images/{digest}/{filename}")
+async def get_image(digest: str, filename: str):
+    width, _, fmt = filename.partition(".")
+    if not re.fullmatch(r"[0-9a-f]{64}", digest) or not width.isdigit():
+        raise HTTPException(status_code=404, detail="Image not found")
+    try:
+        path = await image_service.derivative(digest, int(width), fmt)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    # The URL names the content hash, so the response never changes
+    return FileResponse(
+        path,
+        media_type=IMAGE_MEDIA_TYPES[fmt],
+        headers={"Cache-Control": IMMUTABLE, "ETag": f'"{digest}-{width}-{fmt}"'}
+    )
+
+# Metrics
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# Admin Routes
+@app.get("/api/admin/loans/queue", dependencies=[Depends(require_admin)])
+async def get_loan_review_queue(
+    status: str = Query("pending", regex="^(pending|approved|rejected)$"),
+    eligible: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    try:
+        filter_query = {"status": status}
+        if eligible is not None:
+            filter_query["assessment.eligible"] = eligible
+        query = apply_cursor(filter_query, LOAN_QUEUE_SORT, cursor or "")
+        loans = await db.loan_applications.find(query).sort(LOAN_QUEUE_SORT).limit(limit + 1).to_list(length=limit + 1)
+        return {
+            "loans": [serialize_doc(loan) for loan in loans[:limit]],
+            "next": cursor_for(loans[limit - 1], LOAN_QUEUE_SORT) if len(loans) > limit else None
+        }
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/loans/terms", dependencies=[Depends(require_admin)])
+async def get_loan_terms():
+    try:
+        return await current_loan_terms()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.put("/api/admin/loans/terms", dependencies=[Depends(require_admin)])
+async def update_loan_terms(terms: LoanTerms):
+    try:
+        terms_dict = terms.dict()
+        await db.settings.replace_one({"_id": "loan_terms"}, terms_dict, upsert=True)
+        # Pending applications are re-ranked under the new terms straight away
+        report = await rescore_loans(db.loan_applications, db.schools, terms_dict, {"status": "pending"})
+        return {"terms": terms_dict, **report}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/admin/loans/rescore", dependencies=[Depends(require_admin)])
+async def rescore_loan_applications(status: str = Query("pending", regex="^(pending|approved|rejected)$")):
+    try:
+        return await rescore_loans(db.loan_applications, db.schools, await current_loan_terms(), {"status": status})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/loans/{loan_id}", dependencies=[Depends(require_admin)])
+async def get_loan_review(loan_id: str):
+    try:
+        loan = await db.loan_applications.find_one({"id": loan_id})
+        if not loan:
+            raise HTTPException(status_code=404, detail="Loan application not found")
+        terms = (loan.get("assessment") or {}).get("terms") or await current_loan_terms()
+        return {"loan": serialize_doc(loan), "schedule": loan_schedule(loan["loan_amount"], terms)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/admin/loans/{loan_id}/decision", dependencies=[Depends(require_admin)])
+async def decide_loan(loan_id: str, decision: LoanDecision):
+    try:
+        result = await db.loan_applications.update_one(
+            {"id": loan_id},
+            {"$set": {"status": decision.status, "decision_note": decision.note, "decided_at": datetime.now()}}
+        )
+        if not result.matched_count:
+            raise HTTPException(status_code=404, detail="Loan application not found")
+        return {"message": "Decision recorded", "application_id": loan_id, "status": decision.status}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/indexes", dependencies=[Depends(require_admin)])
+async def get_index_report():
+    try:
+        return await reconcile_indexes(db, apply=False)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    from serve import main
+    main()
\ No newline at end of file
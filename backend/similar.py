@@ -0,0 +1,235 @@
+"""
+"Schools like this one" for GET /api/schools/{school_id}/similar.
+
+Every school is encoded once into a slot of fixed-width NumPy columns
+(one contiguous array per feature):
+
+- the profile vector: board and type one-hot plus standardized log annual
+  fee and rating. The one-hot parts are stored as small integer codes and
+  each row's inverse norm is kept, so a cosine is
+  inv_norm * inv_norm_q * ([board =] + [type =] + fee * fee_q + rating * rating_q)
+  without materializing the one-hot columns;
+- a facility bitset, one bit per facility in a vocabulary of the (up to
+  MAX_FACILITY_WORDS x 64) most common facilities;
+- an integer city code.
+
+A query scores every live school in chunks of CHUNK_ROWS: profile cosine,
+Jaccard similarity of the facility bitsets (popcount of AND over the
+precomputed per-row counts) and a same-city bonus, blended with WEIGHTS.
+Each chunk keeps its top K with argpartition and the chunk winners are
+merged, so temporaries stay bounded at any catalogue size.
+
+The facility vocabulary and fee/rating statistics are fixed when the index
+is built; upsert()/remove() then overwrite, append or retire single rows
+from the school write path. Facilities outside the vocabulary are ignored
+until the next rebuild.
+"""
+
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from normalize import normalize_key
+
+SIMILAR_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "type": 1,
+    "board": 1,
+    "location.city": 1,
+    "location.city_key": 1,
+    "facilities": 1,
+    "fees.annual_fee": 1,
+    "rating": 1,
+}
+
+MAX_FACILITY_WORDS = 2
+CHUNK_ROWS = 1 << 17
+WEIGHTS = {"profile": 0.5, "facilities": 0.35, "city": 0.15}
+# Relative weight of the numeric profile columns against the one-hot ones
+FEE_SCALE = 0.75
+RATING_SCALE = 0.5
+
+COLUMNS = ("boards", "types", "fees", "ratings", "inv_norms", "bits", "bit_counts", "city_codes", "alive")
+
+
+def _popcount64(words: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # SWAR fallback for NumPy < 2.0
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per column of a (words, n) uint64 array"""
+    counts = _popcount64(words[0]).astype(np.int32)
+    for word in words[1:]:
+        counts += _popcount64(word).astype(np.int32)
+    return counts
+
+
+def _fee(school: dict) -> float:
+    fee = (school.get("fees") or {}).get("annual_fee")
+    return math.log1p(fee) if isinstance(fee, (int, float)) and fee > 0 else math.nan
+
+
+def _city(school: dict) -> str:
+    location = school.get("location") or {}
+    return location.get("city_key") or normalize_key(location.get("city"))
+
+
+def _facilities(school: dict) -> List[str]:
+    return [normalize_key(facility) for facility in school.get("facilities") or [] if facility]
+
+
+class SimilarSchools:
+    def __init__(self, schools: List[dict]):
+        facilities = Counter(facility for school in schools for facility in set(_facilities(school)))
+        self.facility_bits = {
+            facility: bit for bit, (facility, _) in enumerate(facilities.most_common(MAX_FACILITY_WORDS * 64))
+        }
+        self.facility_words = max(1, (len(self.facility_bits) + 63) // 64)
+        self.board_codes: Dict[str, int] = {}
+        self.type_codes: Dict[str, int] = {}
+        self.city_codes_by_key: Dict[str, int] = {}
+
+        fees = np.array([_fee(school) for school in schools], dtype=np.float64)
+        ratings = np.array([school.get("rating") or 0.0 for school in schools], dtype=np.float64)
+        known_fees = fees[~np.isnan(fees)]
+        self.fee_mean = float(known_fees.mean()) if known_fees.size else 0.0
+        self.fee_std = float(known_fees.std()) if known_fees.size and known_fees.std() > 0 else 1.0
+        self.rating_mean = float(ratings.mean()) if ratings.size else 0.0
+        self.rating_std = float(ratings.std()) if ratings.size and ratings.std() > 0 else 1.0
+
+        capacity = max(len(schools), 1024)
+        self.boards = np.zeros(capacity, dtype=np.int16)
+        self.types = np.zeros(capacity, dtype=np.int16)
+        self.fees = np.zeros(capacity, dtype=np.float32)
+        self.ratings = np.zeros(capacity, dtype=np.float32)
+        self.inv_norms = np.zeros(capacity, dtype=np.float32)
+        self.bits = np.zeros((self.facility_words, capacity), dtype=np.uint64)
+        self.bit_counts = np.zeros(capacity, dtype=np.int32)
+        self.city_codes = np.full(capacity, -1, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        for school in schools:
+            self.upsert(school)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    async def build(cls, collection, batch_size=5000) -> "SimilarSchools":
+        schools = [school async for school in collection.find({}, SIMILAR_PROJECTION).batch_size(batch_size)]
+        return cls(schools)
+
+    def encode(self, school: dict) -> dict:
+        fee = _fee(school)
+        fee = 0.0 if math.isnan(fee) else FEE_SCALE * (fee - self.fee_mean) / self.fee_std
+        rating = RATING_SCALE * ((school.get("rating") or 0.0) - self.rating_mean) / self.rating_std
+        bits = np.zeros(self.facility_words, dtype=np.uint64)
+        for facility in _facilities(school):
+            bit = self.facility_bits.get(facility)
+            if bit is not None:
+                bits[bit // 64] |= np.uint64(1 << (bit % 64))
+        city = _city(school)
+        return {
+            "boards": self.board_codes.setdefault(school.get("board") or "", len(self.board_codes)),
+            "types": self.type_codes.setdefault(school.get("type") or "", len(self.type_codes)),
+            "fees": fee,
+            "ratings": rating,
+            # Two one-hot ones plus the numeric columns
+            "inv_norms": 1.0 / math.sqrt(2.0 + fee * fee + rating * rating),
+            "bits": bits,
+            "bit_counts": int(popcount(bits[:, np.newaxis])[0]),
+            "city_codes": self.city_codes_by_key.setdefault(city, len(self.city_codes_by_key)) if city else -1,
+            "alive": True,
+        }
+
+    def _grow(self):
+        capacity = len(self.alive) * 2
+        for name in COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros(old.shape[:-1] + (capacity,), dtype=old.dtype)
+            if name == "city_codes":
+                new.fill(-1)
+            new[..., :old.shape[-1]] = old
+            # Queries running in a thread keep their reference to the old array
+            setattr(self, name, new)
+
+    def upsert(self, school: dict):
+        row = self.rows.get(school["id"])
+        if row is None:
+            row = len(self.ids)
+            if row == len(self.alive):
+                self._grow()
+            self.ids.append(school["id"])
+            self.rows[school["id"]] = row
+        for name, value in self.encode(school).items():
+            getattr(self, name)[..., row] = value
+
+    def remove(self, school_id: str):
+        row = self.rows.pop(school_id, None)
+        if row is not None:
+            # Retired rows are never reused; a rebuild compacts them away
+            self.alive[row] = False
+            self.ids[row] = None
+
+    def similar(self, school_id: str, limit: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """Top `limit` (school id, score) pairs, best first; None for an unknown school"""
+        row = self.rows.get(school_id)
+        if row is None:
+            return None
+        used = len(self.ids)
+        columns = {name: getattr(self, name) for name in COLUMNS}
+        query = {name: column[..., row].copy() for name, column in columns.items()}
+        query_bits = query["bits"][:, np.newaxis]
+        profile_weight = np.float32(WEIGHTS["profile"] * query["inv_norms"])
+        query_count = np.int32(query["bit_counts"])
+
+        best_scores, best_rows = [], []
+        for start in range(0, used, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, used)
+            chunk = {name: column[..., start:end] for name, column in columns.items()}
+            scores = (chunk["boards"] == query["boards"]).astype(np.float32)
+            scores += chunk["types"] == query["types"]
+            scores += chunk["fees"] * query["fees"]
+            scores += chunk["ratings"] * query["ratings"]
+            scores *= chunk["inv_norms"]
+            scores *= profile_weight
+            shared = popcount(chunk["bits"] & query_bits)
+            union = np.maximum(chunk["bit_counts"] + (query_count - shared), 1)
+            scores += np.float32(WEIGHTS["facilities"]) * shared.astype(np.float32) / union.astype(np.float32)
+            if query["city_codes"] >= 0:
+                scores += np.float32(WEIGHTS["city"]) * (chunk["city_codes"] == query["city_codes"])
+            scores[~chunk["alive"]] = -np.inf
+            if start <= row < end:
+                scores[row - start] = -np.inf
+            if limit < len(scores):
+                top = np.argpartition(scores, len(scores) - limit)[-limit:]
+            else:
+                top = np.arange(len(scores))
+            best_scores.append(scores[top])
+            best_rows.append(top + start)
+        if not best_scores:
+            return []
+        scores, rows = np.concatenate(best_scores), np.concatenate(best_rows)
+        order = np.lexsort((rows, -scores))[:limit]
+        return [
+            (self.ids[rows[i]], round(float(scores[i]), 4))
+            for i in order
+            if np.isfinite(scores[i]) and self.ids[rows[i]] is not None
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "schools": len(self.rows),
+            "rows": len(self.ids),
+            "bytes": sum(getattr(self, name).nbytes for name in COLUMNS),
+        }
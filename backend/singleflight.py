@@ -0,0 +1,101 @@
+"""
+Request coalescing and load shedding for the hot read paths.
+
+SingleFlight lets concurrent identical reads share one in-flight call: the
+first caller for a key runs it, later callers with the same key await the
+same result (or exception). Results are shared, so callers must treat them
+as read-only.
+
+AdmissionGate bounds how many of those calls may hit MongoDB at once
+(roughly the pool size). Beyond that callers queue, up to max_queue and for
+at most queue_timeout seconds; anything past either limit is rejected with
+Overloaded so the route can answer 503 + Retry-After instead of piling up
+requests until they time out.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+import metrics
+
+SHED = metrics.Counter("schooldekho_requests_shed_total", "Reads rejected because the database was saturated", ["reason"])
+QUEUED = metrics.Gauge("schooldekho_admission_queue_depth", "Reads waiting for a database slot")
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int = 1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            self.leaders += 1
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.shared += 1
+        # A caller that disconnects must not cancel the call for everyone else
+        return await asyncio.shield(call)
+
+    def _done(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # Mark the exception retrieved when every waiter has gone away
+            call.exception()
+
+    def forget(self, key: Hashable = None):
+        """Later callers start a fresh call instead of joining one already running"""
+        if key is None:
+            self._calls.clear()
+        else:
+            self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.shared
+        return {
+            "size": len(self._calls),
+            "hits": self.shared,
+            "misses": self.leaders,
+            "hit_ratio": round(self.shared / calls, 4) if calls else 0.0,
+        }
+
+
+class AdmissionGate:
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    async def __aenter__(self):
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                SHED.inc(reason="queue_full")
+                raise Overloaded("queue_full")
+            self._waiting += 1
+            QUEUED.inc()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                SHED.inc(reason="queue_timeout")
+                raise Overloaded("queue_timeout")
+            finally:
+                self._waiting -= 1
+                QUEUED.dec()
+        else:
+            await self._semaphore.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
@@ -0,0 +1,156 @@
+"""
+Per-locale school content, translated offline and stored on the school.
+
+scripts/translate_schools.py fills school.translations:
+
+    {"hi": {"name": ..., "facilities": [...], "_source": {"name": <hash>, ...}}, ...}
+
+_source records a hash of the English text each field was translated from,
+so a batch run only re-translates fields whose source changed, and a school
+update drops the variants it made stale (prune_stale) rather than serving an
+old translation. Requests only overlay the stored variant (localize); no
+translation ever happens on the request path. Fields without a variant fall
+back to English.
+
+Translators are pluggable: "dictionary" looks texts up in glossary.json,
+"stub" tags the English text (for exercising the pipeline), and "google"
+uses googletrans when it is installed. googletrans pins an old httpx that
+conflicts with the backend's, so it is not in requirements.txt; install
+it (pip install googletrans==3.1.0a0) in a separate environment for
+scripts/translate_schools.py.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+LANGUAGES = ("en", "hi", "ta", "te", "ml")
+DEFAULT_LANGUAGE = "en"
+TRANSLATED_FIELDS = ("name", "description", "facilities")
+GLOSSARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "glossary.json")
+
+
+def field_hash(value) -> str:
+    return hashlib.sha1(json.dumps(value, ensure_ascii=False, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def localize(school: dict, lang: str) -> dict:
+    """Copy of `school` with its `lang` variant overlaid and the stored translations removed"""
+    localized = dict(school)
+    translations = localized.pop("translations", None)
+    if lang != DEFAULT_LANGUAGE and translations:
+        variant = translations.get(lang) or {}
+        for field in TRANSLATED_FIELDS:
+            # Missing and empty variants (e.g. a projected preview of nothing) fall back to English
+            if variant.get(field):
+                localized[field] = variant[field]
+    return localized
+
+
+def prune_stale(translations: Optional[dict], school: dict) -> dict:
+    """Keep only the variants whose English source is unchanged in `school`"""
+    pruned = {}
+    for lang, variant in (translations or {}).items():
+        sources = variant.get("_source", {})
+        kept = {"_source": {}}
+        for field in TRANSLATED_FIELDS:
+            if field in sources and sources[field] == field_hash(school.get(field)):
+                kept["_source"][field] = sources[field]
+                if field in variant:
+                    kept[field] = variant[field]
+        if kept["_source"]:
+            pruned[lang] = kept
+    return pruned
+
+
+class Translator:
+    name = "base"
+
+    def translate(self, texts: List[str], lang: str) -> List[Optional[str]]:
+        """Translate English texts; None where no translation is available"""
+        raise NotImplementedError
+
+
+class StubTranslator(Translator):
+    name = "stub"
+
+    def translate(self, texts, lang):
+        return [f"[{lang}] {text}" for text in texts]
+
+
+class DictionaryTranslator(Translator):
+    """Exact (case-insensitive) lookups in a {lang: {english: translation}} glossary"""
+
+    name = "dictionary"
+
+    def __init__(self, path: str = GLOSSARY_PATH):
+        with open(path, encoding="utf-8") as f:
+            glossary = json.load(f)
+        self.glossary = {
+            lang: {source.casefold(): target for source, target in entries.items()}
+            for lang, entries in glossary.items()
+        }
+
+    def translate(self, texts, lang):
+        entries = self.glossary.get(lang, {})
+        return [entries.get(text.strip().casefold()) for text in texts]
+
+
+class GoogleTranslator(Translator):
+    name = "google"
+
+    def __init__(self):
+        from googletrans import Translator as Client
+
+        self.client = Client()
+
+    def translate(self, texts, lang):
+        if not texts:
+            return []
+        return [result.text for result in self.client.translate(texts, src="en", dest=lang)]
+
+
+TRANSLATORS = {
+    "dictionary": DictionaryTranslator,
+    "stub": StubTranslator,
+    "google": GoogleTranslator,
+}
+
+
+def pending_update(school: dict, translator: Translator, languages=LANGUAGES) -> Dict[str, dict]:
+    """Mongo $set/$unset for the fields whose English source changed since they were translated"""
+    updates = {"$set": {}, "$unset": {}}
+    translations = school.get("translations") or {}
+    for lang in languages:
+        if lang == DEFAULT_LANGUAGE:
+            continue
+        sources = (translations.get(lang) or {}).get("_source", {})
+        changed = [
+            field for field in TRANSLATED_FIELDS
+            if school.get(field) and sources.get(field) != field_hash(school.get(field))
+        ]
+        if not changed:
+            continue
+        # One translator call per school and language
+        texts = []
+        for field in changed:
+            value = school[field]
+            texts.extend(value if isinstance(value, list) else [value])
+        translated = iter(translator.translate(texts, lang))
+        for field in changed:
+            value = school[field]
+            if isinstance(value, list):
+                # Untranslatable list items stay in English
+                result = [next(translated) or item for item in value]
+                found = result != value
+            else:
+                result = next(translated)
+                found = result is not None and result != value
+            prefix = f"translations.{lang}"
+            updates["$set"][f"{prefix}._source.{field}"] = field_hash(value)
+            if found:
+                updates["$set"][f"{prefix}.{field}"] = result
+            else:
+                updates["$unset"][f"{prefix}.{field}"] = ""
+    return {op: fields for op, fields in updates.items() if fields}
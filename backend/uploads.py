@@ -0,0 +1,291 @@
+"""
+Streaming storage for loan application documents.
+
+Uploads are written to disk chunk by chunk with aiofiles while a SHA-256
+is computed on the fly, so memory use does not depend on file size. Large
+scans from slow mobile links can use resumable sessions: the client opens
+a session with the expected size, then PATCHes byte ranges starting at the
+offset the server reports (HEAD) until the file is complete.
+
+An append first claims the session at its offset with one atomic
+find_one_and_update, so appends are serialized across worker processes,
+and a cached running hash is only reused when it covers exactly the
+committed offset; otherwise it is rebuilt from the partial file. sweep()
+deletes partial files whose session has expired.
+
+Finished files are stored content-addressed under UPLOAD_DIR/documents.
+Images are downscaled and recompressed in a process pool so Pillow never
+runs on the event loop. The checksum recorded is always that of the bytes
+the client sent.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+
+logger = logging.getLogger("schooldekho.uploads")
+
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Longest image side kept; roughly A4 at 300 dpi
+MAX_IMAGE_DIM = 2480
+IMAGE_QUALITY = 85
+
+EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+# An append's claim on its session lapses after this, e.g. if its worker died
+CLAIM_TTL = timedelta(minutes=30)
+# Partial files without a live session are removed once they are this old
+ORPHAN_AGE = timedelta(days=1)
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def optimize_image(source: str, destination: str) -> Optional[int]:
+    """Downscale and recompress an image as JPEG; runs in a worker process.
+
+    Returns the new size, or None when the original is already smaller.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_IMAGE_DIM, MAX_IMAGE_DIM))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(destination, "JPEG", quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    size = os.path.getsize(destination)
+    if size >= os.path.getsize(source):
+        os.remove(destination)
+        return None
+    return size
+
+
+class UploadStore:
+    def __init__(self, root: str, sessions, documents, workers: int = 2):
+        self.root = root
+        self.sessions = sessions
+        self.documents = documents
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Running hashes of open sessions with the byte count they cover;
+        # rebuilt from the partial file when another worker has appended since
+        self._hashers: Dict[str, Tuple["hashlib._Hash", int]] = {}
+        os.makedirs(os.path.join(root, "partial"), exist_ok=True)
+        os.makedirs(os.path.join(root, "documents"), exist_ok=True)
+
+    def _partial_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, "partial", upload_id)
+
+    def _document_path(self, sha256: str, extension: str) -> str:
+        return os.path.join(self.root, "documents", sha256[:2], sha256 + extension)
+
+    @staticmethod
+    def _check_type(content_type: str):
+        if content_type not in EXTENSIONS:
+            raise UploadError(415, f"Unsupported document type {content_type}")
+
+    async def create_session(self, loan_id: str, filename: str, content_type: str, size: int) -> dict:
+        self._check_type(content_type)
+        if size <= 0 or size > MAX_UPLOAD_BYTES:
+            raise UploadError(413, f"Documents must be between 1 byte and {MAX_UPLOAD_BYTES} bytes")
+        session = {
+            "id": str(uuid.uuid4()),
+            "loan_id": loan_id,
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "offset": 0,
+            "created_at": datetime.now(),
+        }
+        async with aiofiles.open(self._partial_path(session["id"]), "wb"):
+            pass
+        await self.sessions.insert_one(dict(session))
+        self._hashers[session["id"]] = (hashlib.sha256(), 0)
+        return session
+
+    async def get_session(self, upload_id: str) -> dict:
+        session = await self.sessions.find_one({"id": upload_id}, {"_id": 0, "claim": 0, "claim_expires": 0})
+        if not session:
+            raise UploadError(404, "Upload not found")
+        return session
+
+    async def _claim(self, upload_id: str, offset: int) -> Tuple[dict, str]:
+        """Atomically take the session at `offset`; returns it with the claim token"""
+        now = datetime.now()
+        claim = uuid.uuid4().hex
+        session = await self.sessions.find_one_and_update(
+            {"id": upload_id, "offset": offset, "$or": [{"claim": None}, {"claim_expires": {"$lt": now}}]},
+            {"$set": {"claim": claim, "claim_expires": now + CLAIM_TTL}},
+            projection={"_id": 0, "claim": 0, "claim_expires": 0},
+        )
+        if session is None:
+            current = await self.get_session(upload_id)
+            if current["offset"] != offset:
+                raise UploadError(409, f"Upload is at offset {current['offset']}")
+            raise UploadError(409, "Another append to this upload is in progress")
+        return session, claim
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> dict:
+        """Write chunks at `offset`; returns the session, with "document" set once complete"""
+        session, claim = await self._claim(upload_id, offset)
+        hasher, hashed = self._hashers.pop(upload_id, (None, -1))
+        written = offset
+        try:
+            if hashed != offset:
+                hasher = await self._rehash(upload_id, offset)
+            async with aiofiles.open(self._partial_path(upload_id), "r+b") as f:
+                await f.seek(offset)
+                async for chunk in chunks:
+                    if written + len(chunk) > session["size"]:
+                        raise UploadError(413, "Upload exceeds its declared size")
+                    await f.write(chunk)
+                    hasher.update(chunk)
+                    written += len(chunk)
+        finally:
+            # Keep whatever arrived before a dropped connection so the
+            # client can resume from there, and release the claim
+            await self.sessions.update_one(
+                {"id": upload_id, "claim": claim},
+                {"$set": {"offset": written}, "$unset": {"claim": "", "claim_expires": ""}},
+            )
+            if hasher is not None:
+                self._hashers[upload_id] = (hasher, written)
+        session["offset"] = written
+        if written == session["size"]:
+            session["document"] = await self._finish(session, hasher.hexdigest())
+        return session
+
+    async def _rehash(self, upload_id: str, offset: int):
+        hasher = hashlib.sha256()
+        async with aiofiles.open(self._partial_path(upload_id), "rb") as f:
+            remaining = offset
+            while remaining:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        return hasher
+
+    async def save_stream(self, loan_id: str, filename: str, content_type: str,
+                          chunks: AsyncIterator[bytes]) -> dict:
+        """One-shot upload: stream to a partial file, then store it like a finished session"""
+        self._check_type(content_type)
+        upload_id = str(uuid.uuid4())
+        hasher = hashlib.sha256()
+        size = 0
+        path = self._partial_path(upload_id)
+        try:
+            async with aiofiles.open(path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        raise UploadError(413, f"Documents must be at most {MAX_UPLOAD_BYTES} bytes")
+                    await f.write(chunk)
+                    hasher.update(chunk)
+        except BaseException:
+            # Includes dropped connections; a one-shot upload cannot be resumed
+            await aiofiles.os.remove(path)
+            raise
+        if not size:
+            await aiofiles.os.remove(path)
+            raise UploadError(400, "Empty upload")
+        session = {"id": upload_id, "loan_id": loan_id, "filename": filename,
+                   "content_type": content_type, "size": size}
+        return await self._finish(session, hasher.hexdigest())
+
+    async def _finish(self, session: dict, sha256: str) -> dict:
+        upload_id = session["id"]
+        partial = self._partial_path(upload_id)
+        content_type = session["content_type"]
+        stored_type, stored_size = content_type, session["size"]
+        if content_type in IMAGE_TYPES:
+            optimized = partial + ".jpg"
+            try:
+                loop = asyncio.get_running_loop()
+                new_size = await loop.run_in_executor(self._executor(), optimize_image, partial, optimized)
+            except Exception as e:
+                # Keep the original if Pillow cannot read it
+                logger.warning("Image optimization failed for upload %s: %s", upload_id, e)
+                new_size = None
+            if new_size is not None:
+                await aiofiles.os.replace(optimized, partial)
+                stored_type, stored_size = "image/jpeg", new_size
+
+        path = self._document_path(sha256, EXTENSIONS[stored_type])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Content-addressed: a re-upload of the same file reuses the stored copy
+        await aiofiles.os.replace(partial, path)
+
+        document = {
+            "id": str(uuid.uuid4()),
+            "loan_id": session["loan_id"],
+            "filename": session["filename"],
+            "content_type": stored_type,
+            "original_content_type": content_type,
+            "size": session["size"],
+            "stored_size": stored_size,
+            "sha256": sha256,
+            "path": os.path.relpath(path, self.root),
+            "uploaded_at": datetime.now(),
+        }
+        await self.documents.insert_one(dict(document))
+        await self.sessions.delete_one({"id": upload_id})
+        self._hashers.pop(upload_id, None)
+        return document
+
+    async def sweep(self) -> int:
+        """Delete partial files older than ORPHAN_AGE with no session (expired or one-shot leftovers)"""
+        directory = os.path.join(self.root, "partial")
+        cutoff = (datetime.now() - ORPHAN_AGE).timestamp()
+        candidates = []
+        for entry in await asyncio.get_running_loop().run_in_executor(None, lambda: list(os.scandir(directory))):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                # <upload id> or <upload id>.jpg while an image is optimized
+                candidates.append((entry.name.split(".", 1)[0], entry.path))
+        if not candidates:
+            return 0
+        ids = list({upload_id for upload_id, _ in candidates})
+        live = {session["id"] async for session in self.sessions.find({"id": {"$in": ids}}, {"_id": 0, "id": 1})}
+        removed = 0
+        for upload_id, path in candidates:
+            if upload_id not in live:
+                try:
+                    await aiofiles.os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                self._hashers.pop(upload_id, None)
+        return removed
+
+    def absolute_path(self, document: dict) -> str:
+        return os.path.join(self.root, document["path"])
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
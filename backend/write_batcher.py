@@ -0,0 +1,102 @@
+"""
+Group commit for the hot insert paths (loan applications, registrations).
+
+Concurrent callers hand their document to WriteBatcher.insert(), which
+parks them on a future. The first document of a batch arms a short timer
+(max_delay); when it fires, or as soon as max_batch documents are waiting,
+everything pending goes to the server in one unordered insert_many with a
+journaled majority write concern. Each caller is then resolved on its own:
+documents that failed (e.g. a duplicate email rejected by the unique index)
+raise for that caller only, the rest return once the batch is durable.
+"""
+
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+import metrics
+
+logger = logging.getLogger("schooldekho.write_batcher")
+
+# Acknowledged only once a majority of the replica set has journaled the write
+DURABLE = WriteConcern(w="majority", j=True)
+
+BATCHES = metrics.Counter(
+    "schooldekho_write_batches_total", "insert_many batches flushed by the write batcher", ["collection"]
+)
+BATCHED_DOCUMENTS = metrics.Counter(
+    "schooldekho_write_batched_documents_total", "Documents written through the write batcher", ["collection", "outcome"]
+)
+
+
+def _write_error(error: dict) -> Exception:
+    if error.get("code") == 11000:
+        return DuplicateKeyError(error.get("errmsg", "duplicate key"), 11000, error)
+    return OperationFailure(error.get("errmsg", "write failed"), error.get("code"), error)
+
+
+class WriteBatcher:
+    def __init__(self, collection, max_batch: int = 500, max_delay: float = 0.005):
+        self.collection = collection.with_options(write_concern=DURABLE)
+        self.name = collection.name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+
+    async def insert(self, document: dict) -> None:
+        """Queue one document; returns once it is durable, raises if it was rejected"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_now)
+        await future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._write(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]):
+        documents = [document for document, _ in batch]
+        failed = {}
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = _write_error(error)
+            if e.details.get("writeConcernErrors"):
+                # Inserted but not confirmed durable: nobody gets an ack
+                logger.error("Write concern not satisfied for %s batch: %s", self.name, e.details["writeConcernErrors"])
+                failed = {index: e for index in range(len(batch))}
+        except Exception as e:
+            failed = {index: e for index in range(len(batch))}
+        BATCHES.inc(collection=self.name)
+        BATCHED_DOCUMENTS.inc(len(batch) - len(failed), collection=self.name, outcome="inserted")
+        if failed:
+            BATCHED_DOCUMENTS.inc(len(failed), collection=self.name, outcome="failed")
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failed:
+                future.set_exception(failed[index])
+            else:
+                future.set_result(None)
+
+    async def close(self):
+        """Flush whatever is still queued and wait for in-flight batches"""
+        self._flush_now()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
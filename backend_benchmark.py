@@ -0,0 +1,291 @@
+"""
+Concurrent load test for the SchoolDekho API.
+
+Replays a weighted mix of the endpoints exercised by backend_test.py at a
+fixed concurrency and reports throughput and p50/p95/p99 latency per route.
+Runs against a live server (--base-url) or in-process through the ASGI
+transport (--in-process), optionally on an in-memory mongomock database
+seeded by scripts/populate_mock_data.py (--mock, needs mongomock-motor).
+User routes draw their ids from the seeded loans, so against a live server
+pass the --seed and --schools the database was populated with as
+--data-seed and --data-schools.
+
+    python backend_benchmark.py --in-process --mock --concurrency 32 --duration 20 --output run.json
+    python backend_benchmark.py --base-url http://localhost:8001 --compare run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (weight, method, path, params/body factory)
+ENDPOINT_MIX = {
+    "health": (1, "GET", lambda ctx: "/api/health", None),
+    "list_schools": (30, "GET", lambda ctx: "/api/schools", lambda ctx: {"limit": 10}),
+    "filter_schools": (20, "GET", lambda ctx: "/api/schools", lambda ctx: {
+        "limit": 10,
+        "school_type": ctx.rng.choice(["Day School", "Boarding School", "Play School", "PU College"]),
+        "board": ctx.rng.choice(["CBSE", "ICSE", "IB", "State Board"]),
+    }),
+    "search_schools": (10, "GET", lambda ctx: "/api/schools", lambda ctx: {
+        "search": ctx.rng.choice(["public", "delhi", "internat", "vidyalaya", "montesori"]),
+        "limit": 5,
+    }),
+    "school_detail": (20, "GET", lambda ctx: f"/api/schools/{ctx.school_id()}", None),
+    "filter_options": (10, "GET", lambda ctx: "/api/filters/options", None),
+    "compare": (5, "POST", lambda ctx: "/api/schools/compare", lambda ctx: ctx.school_ids(3)),
+    "user_loans": (4, "GET", lambda ctx: f"/api/loans/{ctx.user_id()}", None),
+    "match_scholarships": (5, "POST", lambda ctx: "/api/scholarships/match", lambda ctx: {
+        "eligibility_criteria": ctx.rng.choice(["", "academic", "need", "gender", "sports"]),
+        "amount_range": {"min": ctx.rng.choice([0, 20000, 50000]), "max": 150000},
+        "location": ctx.rng.choice([None, "Karnataka", "Maharashtra", "Tamil Nadu"]),
+        "family_income": ctx.rng.choice([None, 300000, 700000]),
+        "marks_percent": ctx.rng.choice([None, 65, 85]),
+    }),
+}
+
+
+class Context:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.schools = []
+        self.users = []
+
+    def school_id(self):
+        return self.rng.choice(self.schools) if self.schools else "missing"
+
+    def school_ids(self, count):
+        if len(self.schools) < count:
+            return self.schools
+        return self.rng.sample(self.schools, count)
+
+    def user_id(self):
+        return self.rng.choice(self.users) if self.users else "missing"
+
+
+def percentile(sorted_samples, q):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, int(round(q * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples, errors, elapsed):
+    routes = {}
+    for name in sorted(set(samples) | set(errors)):
+        latencies = sorted(samples.get(name, []))
+        routes[name] = {
+            "requests": len(latencies),
+            "errors": errors.get(name, 0),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1] if latencies else None,
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "total_requests": total,
+        "total_errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "routes": routes,
+    }
+
+
+async def worker(client, ctx, mix, deadline, remaining, samples, errors):
+    names = list(mix)
+    weights = [mix[name][0] for name in names]
+    while time.perf_counter() < deadline:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+        name = ctx.rng.choices(names, weights=weights)[0]
+        _, method, path, payload = mix[name]
+        data = payload(ctx) if payload else None
+        started = time.perf_counter()
+        try:
+            if method == "GET":
+                response = await client.get(path(ctx), params=data)
+            else:
+                response = await client.post(path(ctx), json=data)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        latency = round((time.perf_counter() - started) * 1000, 3)
+        if ok:
+            samples.setdefault(name, []).append(latency)
+        else:
+            errors[name] = errors.get(name, 0) + 1
+
+
+async def discover(client, ctx):
+    response = await client.get("/api/schools", params={"limit": 50})
+    if response.status_code == 200:
+        ctx.schools = [school["id"] for school in response.json().get("schools", [])]
+
+
+def seeded_user_ids(seed, schools, limit=1000):
+    """Applicants of the first seeded loans; records depend only on (seed, kind, index)"""
+    sys.path.append(os.path.join(ROOT, "scripts"))
+    from populate_mock_data import dataset_counts, generate_batch
+
+    counts = dataset_counts(schools)
+    counts["loan_applications"] = min(counts["loan_applications"], limit)
+    return sorted({loan["user_id"] for loan in generate_batch("loan_applications", seed, 0, limit, counts)})
+
+
+async def run_load(client, args):
+    ctx = Context(args.seed)
+    await discover(client, ctx)
+    ctx.users = seeded_user_ids(args.data_seed, args.mock_schools if args.mock else args.data_schools)
+    mix = {name: spec for name, spec in ENDPOINT_MIX.items() if not args.routes or name in args.routes}
+
+    # Warm caches and connection pools before measuring
+    warm_deadline = time.perf_counter() + args.warmup
+    await asyncio.gather(*(
+        worker(client, ctx, mix, warm_deadline, None, {}, {}) for _ in range(args.concurrency)
+    ))
+
+    samples, errors = {}, {}
+    remaining = [args.requests] if args.requests else None
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(client, ctx, mix, started + args.duration, remaining, samples, errors)
+        for _ in range(args.concurrency)
+    ))
+    return summarize(samples, errors, time.perf_counter() - started)
+
+
+async def seed_mock_database(server, schools, seed):
+    from mongomock_motor import AsyncMongoMockClient
+
+    sys.path.append(os.path.join(ROOT, "scripts"))
+    from populate_mock_data import GENERATORS, dataset_counts, generate_batch
+    import serialization
+
+    # mongomock has no $substrCP, so list previews are cut after reading
+    serialization.PREVIEW_IN_PYTHON = True
+    server.client = AsyncMongoMockClient()
+    server.db = server.client.schooldekho
+    counts = dataset_counts(schools)
+    for kind in GENERATORS:
+        for batch in range(0, (counts[kind] + 999) // 1000):
+            documents = generate_batch(kind, seed, batch, 1000, counts)
+            if documents:
+                await server.db[kind].insert_many(documents)
+
+
+async def run(args):
+    if args.in_process:
+        sys.path.insert(0, os.path.join(ROOT, "backend"))
+        import server
+
+        if args.mock:
+            await seed_mock_database(server, args.mock_schools, args.data_seed)
+        # The ASGI transport does not send lifespan events, so run them here
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout) as client:
+                return await run_load(client, args)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        return await run_load(client, args)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline=None):
+    print(f"\n{'route':<18}{'reqs':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, route in report["routes"].items():
+        line = (
+            f"{name:<18}{route['requests']:>8}{route['errors']:>6}{route['throughput_rps']:>9.1f}"
+            f"{route['p50_ms'] or 0:>9.2f}{route['p95_ms'] or 0:>9.2f}{route['p99_ms'] or 0:>9.2f}"
+        )
+        previous = (baseline or {}).get("routes", {}).get(name)
+        if previous and previous.get("p99_ms") and route["p99_ms"]:
+            change = (route["p99_ms"] - previous["p99_ms"]) / previous["p99_ms"] * 100
+            line += f"   p99 {change:+.1f}%"
+        print(line)
+    print(f"\nTotal: {report['total_requests']} requests, {report['total_errors']} errors, {report['throughput_rps']} req/s")
+
+
+def regressions(report, baseline, threshold):
+    found = []
+    for name, route in report["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous or not previous.get("p99_ms") or not route["p99_ms"]:
+            continue
+        if route["p99_ms"] > previous["p99_ms"] * (1 + threshold / 100):
+            found.append(name)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--in-process", action="store_true", help="drive backend/server.py through the ASGI transport")
+    parser.add_argument("--mock", action="store_true", help="with --in-process, use an in-memory mongomock database")
+    parser.add_argument("--mock-schools", type=int, default=2000)
+    parser.add_argument("--data-seed", type=int, default=42, help="--seed the database was populated with")
+    parser.add_argument("--data-schools", type=int, default=1000, help="--schools the database was populated with")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to measure")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--routes", nargs="+", choices=sorted(ENDPOINT_MIX), help="limit the mix to these routes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to diff against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="p99 regression threshold in percent")
+    args = parser.parse_args()
+    if args.mock and not args.in_process:
+        parser.error("--mock requires --in-process")
+
+    print(f"🚀 Load testing with {args.concurrency} concurrent clients for {args.duration}s...")
+    report = asyncio.run(run(args))
+    report["meta"] = {
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "target": "in-process" + (" (mock)" if args.mock else "") if args.in_process else args.base_url,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if baseline:
+        slower = regressions(report, baseline, args.threshold)
+        if slower:
+            print(f"\n❌ p99 regressed by more than {args.threshold}% on: {', '.join(slower)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
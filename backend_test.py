@@ -64,6 +64,13 @@ class SchoolDekhoAPITester:
         }
         return self.run_test("Get Schools with Filters", "GET", "api/schools", 200, params=params)
 
+    def test_get_schools_cursor(self):
+        """Test keyset pagination - first page then follow the next cursor"""
+        success, page_data = self.run_test("Get Schools (Cursor)", "GET", "api/schools", 200, params={"cursor": "", "limit": 2})
+        if success and page_data.get('next'):
+            return self.run_test("Get Schools (Next Cursor)", "GET", "api/schools", 200, params={"cursor": page_data['next'], "limit": 2})
+        return success, page_data
+
     def test_get_filter_options(self):
         """Test getting filter options"""
         return self.run_test("Get Filter Options", "GET", "api/filters/options", 200)
@@ -138,6 +145,7 @@ def main():
         tester.test_health_check,
         tester.test_get_schools,
         tester.test_get_schools_with_filters,
+        tester.test_get_schools_cursor,
         tester.test_get_filter_options,
         tester.test_get_school_by_id,
         tester.test_compare_schools,
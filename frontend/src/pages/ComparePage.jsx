@@ -16,7 +16,8 @@ const ComparePage = () => {
     setLoading(true);
     try {
       const backendUrl = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
-      const response = await fetch(`${backendUrl}/api/schools?search=${encodeURIComponent(searchTerm)}&limit=5`);
+      const fields = 'id,name,type,board,location,fees,facilities,rating,reviews_count,established_year,website';
+      const response = await fetch(`${backendUrl}/api/schools?search=${encodeURIComponent(searchTerm)}&limit=5&fields=${fields}`);
       const data = await response.json();
       setSearchResults(data.schools || []);
     } catch (error) {
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark the server.py query patterns with and without the managed indexes.
+
+Loads N synthetic schools (plus users and loan applications, generated by
+populate_mock_data.py) into a scratch database, times every query pattern with only the _id index, then reconciles
+INDEX_SPECS and times them again.
+
+    python scripts/benchmark_indexes.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alumni import DIRECTORY_PROJECTION, DIRECTORY_SORT, directory_filter  # noqa: E402
+from indexes import INDEX_SPECS, reconcile_indexes  # noqa: E402
+from populate_mock_data import (  # noqa: E402
+    BOARDS,
+    GENERATORS,
+    SCHOOL_TYPES,
+    dataset_counts,
+    generate_batch,
+    load_collection,
+    record_id,
+)
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/schooldekho")
+
+TYPES = [row[0] for row in SCHOOL_TYPES]
+BOARD_NAMES = [row[0] for row in BOARDS]
+BATCH_SIZE = 10000
+
+
+async def load(db, size, seed):
+    for name in INDEX_SPECS:
+        await db[name].drop()
+    counts = dataset_counts(size, users=max(size // 10, 2), loans=max(size // 10, 1))
+    for kind in GENERATORS:
+        await load_collection(db, kind, seed, counts, BATCH_SIZE, concurrency=4)
+    rng = random.Random(seed)
+    school_ids = [record_id(seed, "school", rng.randrange(size)) for _ in range(1000)]
+    # The first batch holds every user kind (alumni come first)
+    users = generate_batch("users", seed, 0, min(BATCH_SIZE, counts["users"]), counts)
+    return rng, school_ids, users
+
+
+def query_patterns(rng, school_ids, users):
+    """One callable per query shape used by server.py"""
+    alumni = [user for user in users if user["user_type"] == "alumni"] or users
+    return {
+        # also the per-id lookup in compare_schools
+        "get_school": lambda db: db.schools.find_one({"id": rng.choice(school_ids)}),
+        "get_schools_filter": lambda db: db.schools.find({
+            "type": rng.choice(TYPES),
+            "board": rng.choice(BOARD_NAMES),
+            "fees.annual_fee": {"$gte": 50000, "$lte": 300000},
+        }).limit(10).to_list(length=10),
+        "get_schools_count": lambda db: db.schools.count_documents({
+            "type": rng.choice(TYPES),
+            "board": rng.choice(BOARD_NAMES),
+        }),
+        "register_user_email": lambda db: db.users.find_one({"email": rng.choice(users)["email"]}),
+        "get_user_loans": lambda db: db.loan_applications.find(
+            {"user_id": rng.choice(users)["id"]}
+        ).sort([("created_at", -1), ("id", 1)]).limit(51).to_list(length=51),
+        "get_school_alumni": lambda db: db.users.find(
+            directory_filter(rng.choice(alumni)["school_id"]), DIRECTORY_PROJECTION
+        ).sort(DIRECTORY_SORT).limit(21).to_list(length=21),
+        "get_school_alumni_search": lambda db: db.users.find(
+            directory_filter(rng.choice(alumni)["school_id"], name=rng.choice(alumni)["name"].split()[-1][:3]),
+            DIRECTORY_PROJECTION,
+        ).sort(DIRECTORY_SORT).limit(21).to_list(length=21),
+        "get_loan_review_queue": lambda db: db.loan_applications.find(
+            {"status": "pending"}
+        ).sort([("assessment.score", -1), ("created_at", 1), ("id", 1)]).limit(21).to_list(length=21),
+    }
+
+
+async def time_patterns(db, patterns, repeat):
+    results = {}
+    for name, run in patterns.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await run(db)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        results[name] = {
+            "p50_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+            "mean_ms": round(statistics.fmean(samples), 3),
+        }
+    return results
+
+
+async def benchmark(sizes, repeat, seed, database):
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[database]
+    report = {}
+    try:
+        for size in sizes:
+            print(f"Loading {size} schools into {database}...")
+            rng, school_ids, users = await load(db, size, seed)
+            patterns = query_patterns(rng, school_ids, users)
+            without = await time_patterns(db, patterns, repeat)
+            await reconcile_indexes(db)
+            with_indexes = await time_patterns(db, patterns, repeat)
+            report[size] = {"without_indexes": without, "with_indexes": with_indexes}
+
+            print(f"\n{size} schools (p50 / p95 ms)")
+            print(f"{'pattern':<22}{'no index':>20}{'indexed':>20}")
+            for name in patterns:
+                before, after = without[name], with_indexes[name]
+                print(
+                    f"{name:<22}"
+                    f"{before['p50_ms']:>10.2f} /{before['p95_ms']:>8.2f}"
+                    f"{after['p50_ms']:>10.2f} /{after['p95_ms']:>8.2f}"
+                )
+    finally:
+        await client.drop_database(database)
+        client.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", default="schooldekho_index_bench")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(benchmark(args.sizes, args.repeat, args.seed, args.database))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
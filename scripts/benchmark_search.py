@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process search index (backend/search.py).
+
+Builds SchoolSearchIndex from N synthetic schools (generated by
+populate_mock_data.py, no database needed) and times a fixed set of
+queries: common words, multi-word queries, prefixes, typos and filtered
+searches, plus a deep page.
+
+    python scripts/benchmark_search.py --sizes 10000 100000 500000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from populate_mock_data import dataset_counts, generate_batch  # noqa: E402
+from search import SchoolSearchIndex  # noqa: E402
+
+BATCH_SIZE = 10000
+
+QUERIES = {
+    "common_word": ("school", {}),
+    "two_common_words": ("library sports", {}),
+    "locality": ("mg road", {}),
+    "name": ("delhi public", {}),
+    "short_prefix": ("sch", {}),
+    "typo": ("internatonal", {}),
+    "board_filter": ("school", {"board": "CBSE"}),
+    "city_prefix": ("public", {"city": "beng"}),
+    "fee_range": ("swimming pool", {"min_fee": 50000, "max_fee": 150000}),
+    "deep_page": ("school", {"offset": 5000}),
+}
+
+
+def build(size, seed):
+    counts = dataset_counts(size)
+    index = SchoolSearchIndex()
+    for batch in range((size + BATCH_SIZE - 1) // BATCH_SIZE):
+        for school in generate_batch("schools", seed, batch, BATCH_SIZE, counts):
+            index.upsert(school)
+    return index
+
+
+def time_queries(index, repeat):
+    results = {}
+    for name, (query, options) in QUERIES.items():
+        # First run fills the per-term array caches
+        _, total = index.search(query, **options)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            index.search(query, **options)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        results[name] = {
+            "total": total,
+            "p50_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+            "mean_ms": round(statistics.fmean(samples), 3),
+        }
+    return results
+
+
+def benchmark(sizes, repeat, seed):
+    report = {}
+    for size in sizes:
+        print(f"Indexing {size} schools...")
+        started = time.perf_counter()
+        index = build(size, seed)
+        built = time.perf_counter() - started
+        results = time_queries(index, repeat)
+        report[size] = {"build_s": round(built, 1), "queries": results}
+
+        print(f"\n{size} schools, built in {built:.1f}s (p50 / p95 ms)")
+        print(f"{'query':<20}{'matches':>10}{'p50':>10}{'p95':>10}")
+        for name, result in results.items():
+            print(f"{name:<20}{result['total']:>10}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    report = benchmark(args.sizes, args.repeat, args.seed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compare response size and encoding CPU for a GET /api/schools page.
+
+"before" is the old path: whole documents through serialize_doc,
+jsonable_encoder and json.dumps (what FastAPI's JSONResponse does).
+"after" applies the default list fieldset and renders with orjson, as
+get_schools does now. Every variant is also measured gzip- and
+brotli-compressed at the middleware's settings. Documents come from
+populate_mock_data.py, so no database is needed.
+
+    python scripts/benchmark_serialization.py --limits 10 50 --repeat 2000
+"""
+
+import argparse
+import copy
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from compression import BROTLI_QUALITY, GZIP_LEVEL, brotli  # noqa: E402
+from populate_mock_data import make_school  # noqa: E402
+from serialization import FieldSet, dumps  # noqa: E402
+
+
+def serialize_doc(doc):
+    if doc and "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+
+def before(schools):
+    page = {"schools": [serialize_doc(dict(school)) for school in schools], "total": 1000, "page": 1, "pages": 100}
+    return json.dumps(jsonable_encoder(page), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def after(field_set):
+    def render(schools):
+        page = {"schools": [field_set.apply(school) for school in schools], "total": 1000, "page": 1, "pages": 100}
+        return dumps(page)
+    return render
+
+
+VARIANTS = {
+    "before (full, json)": before,
+    "fields=all (orjson)": after(FieldSet.parse("all")),
+    "default list (orjson)": after(FieldSet.parse(None)),
+    "fields=id,name,rating": after(FieldSet.parse("id,name,rating")),
+}
+
+
+def cpu_per_call(fn, schools, repeat):
+    # Fresh copies so in-place _id conversion does not flatter later runs
+    batches = [copy.deepcopy(schools) for _ in range(min(repeat, 50))]
+    started = time.process_time()
+    for i in range(repeat):
+        fn(batches[i % len(batches)])
+    return (time.process_time() - started) / repeat * 1e6
+
+
+def benchmark(limits, repeat, seed):
+    rng = random.Random(seed)
+    report = {}
+    for limit in limits:
+        schools = []
+        for index in range(limit):
+            school = make_school(rng, seed, index)
+            school["_id"] = ObjectId()
+            schools.append(school)
+        rows = {}
+        for name, fn in VARIANTS.items():
+            body = fn(copy.deepcopy(schools))
+            compress_started = time.process_time()
+            gzipped = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            gzip_us = (time.process_time() - compress_started) * 1e6
+            rows[name] = {
+                "bytes": len(body),
+                "gzip_bytes": len(gzipped),
+                "gzip_cpu_us": round(gzip_us, 1),
+                "br_bytes": len(brotli.compress(body, quality=BROTLI_QUALITY)) if brotli else None,
+                "encode_cpu_us": round(cpu_per_call(fn, schools, repeat), 1),
+            }
+        report[limit] = rows
+
+        print(f"\nlimit={limit}")
+        print(f"{'variant':<26}{'bytes':>9}{'gzip':>9}{'br':>9}{'encode us':>12}{'gzip us':>10}")
+        for name, row in rows.items():
+            print(
+                f"{name:<26}{row['bytes']:>9}{row['gzip_bytes']:>9}{row['br_bytes'] or '-':>9}"
+                f"{row['encode_cpu_us']:>12.1f}{row['gzip_cpu_us']:>10.1f}"
+            )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    report = benchmark(args.limits, args.repeat, args.seed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Latency of the "similar schools" recommender (backend/similar.py).
+
+Builds the feature matrix from populate_mock_data.py schools, so no
+database is needed, then reports build time, memory, per-query latency
+percentiles for top-K lookups and the cost of an incremental row update.
+
+    python scripts/benchmark_similar.py --sizes 100000 1000000 --queries 200
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from populate_mock_data import make_school  # noqa: E402
+from similar import SimilarSchools  # noqa: E402
+
+
+def project(school):
+    return {
+        "id": school["id"],
+        "type": school["type"],
+        "board": school["board"],
+        "location": {"city": school["location"]["city"], "city_key": school["location"]["city_key"]},
+        "facilities": school["facilities"],
+        "fees": {"annual_fee": school["fees"]["annual_fee"]},
+        "rating": school["rating"],
+    }
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(round(q * len(samples))) - 1)]
+
+
+def benchmark(size, queries, limit, seed):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    schools = [project(make_school(rng, seed, index)) for index in range(size)]
+    generate_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = SimilarSchools(schools)
+    build_s = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(queries):
+        school_id = rng.choice(schools)["id"]
+        started = time.perf_counter()
+        index.similar(school_id, limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    updates = []
+    for _ in range(min(queries, 1000)):
+        school = dict(rng.choice(schools))
+        school["rating"] = round(rng.uniform(1, 5), 1)
+        started = time.perf_counter()
+        index.upsert(school)
+        updates.append((time.perf_counter() - started) * 1e6)
+    updates.sort()
+
+    return {
+        "schools": size,
+        "generate_s": round(generate_s, 2),
+        "build_s": round(build_s, 2),
+        "matrix_mb": round(index.stats()["bytes"] / 2**20, 1),
+        "query_p50_ms": round(percentile(latencies, 0.50), 2),
+        "query_p95_ms": round(percentile(latencies, 0.95), 2),
+        "query_p99_ms": round(percentile(latencies, 0.99), 2),
+        "upsert_p50_us": round(percentile(updates, 0.50), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    report = []
+    print(f"{'schools':>10}{'build s':>9}{'MB':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'upsert us':>11}")
+    for size in args.sizes:
+        row = benchmark(size, args.queries, args.limit, args.seed)
+        report.append(row)
+        print(
+            f"{row['schools']:>10}{row['build_s']:>9}{row['matrix_mb']:>8}{row['query_p50_ms']:>9}"
+            f"{row['query_p95_ms']:>9}{row['query_p99_ms']:>9}{row['upsert_p50_us']:>11}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,331 +1,464 @@
 #!/usr/bin/env python3
 """
-Script to populate MongoDB with mock school data for development
+Generate and bulk-load synthetic SchoolDekho data for development and load tests.
+
+Every record is derived from (seed, kind, index), so the same seed always
+produces the same dataset and batches can be generated independently.
+Batches are written with unordered insert_many calls, several in flight at
+once, and indexes are reconciled after the load.
+
+    python scripts/populate_mock_data.py --schools 1000000 --seed 7
 """
 
+import argparse
 import asyncio
+import math
 import os
+import random
 import sys
-from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorClient
+import time
 import uuid
+from datetime import datetime, timedelta
 
-# Add backend to path to import models
-sys.path.append('/app/backend')
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from alumni import rebuild_stats, with_directory_keys  # noqa: E402
+from geo import CITY_COORDINATES, point  # noqa: E402
+from indexes import reconcile_indexes  # noqa: E402
+from normalize import normalize_key  # noqa: E402
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/schooldekho")
 
-async def populate_schools():
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client.schooldekho
-    
-    # Clear existing data
-    await db.schools.delete_many({})
-    await db.users.delete_many({})
-    
-    schools_data = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Delhi Public School, R.K. Puram",
-            "type": "Day School",
-            "board": "CBSE",
-            "location": {
-                "city": "Delhi",
-                "state": "Delhi",
-                "address": "Sector 12, R.K. Puram, New Delhi - 110022"
-            },
-            "fees": {
-                "annual_fee": 150000,
-                "admission_fee": 25000
-            },
-            "facilities": [
-                "Smart Classrooms",
-                "Computer Lab",
-                "Science Labs",
-                "Library",
-                "Sports Complex",
-                "Swimming Pool",
-                "Auditorium",
-                "Cafeteria"
-            ],
-            "description": "One of India's premier educational institutions, DPS R.K. Puram has been providing quality education since 1972.",
-            "images": [
-                "https://images.unsplash.com/photo-1580582932707-520aed937b7b?w=800",
-                "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?w=800"
-            ],
-            "contact": {
-                "phone": "+91-11-26174941",
-                "email": "info@dpsrkp.net",
-                "website": "https://www.dpsrkp.net"
-            },
-            "admission_info": {
-                "admission_start": "December 2024",
-                "admission_end": "February 2025",
-                "age_criteria": "As per Delhi Government norms",
-                "documents_required": ["Birth Certificate", "Address Proof", "Photos"]
-            },
-            "rating": 4.5,
-            "reviews_count": 324,
-            "established_year": 1972,
-            "website": "https://www.dpsrkp.net",
-            "created_at": datetime.now()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Kendriya Vidyalaya No. 1, Mumbai",
-            "type": "Day School",
-            "board": "CBSE",
-            "location": {
-                "city": "Mumbai",
-                "state": "Maharashtra",
-                "address": "Colaba, Mumbai - 400005"
-            },
-            "fees": {
-                "annual_fee": 25000,
-                "admission_fee": 2000
-            },
-            "facilities": [
-                "Computer Lab",
-                "Science Labs",
-                "Library",
-                "Playground",
-                "Music Room",
-                "Art Room"
-            ],
-            "description": "A central government school providing quality education with nominal fees.",
-            "images": [
-                "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?w=800",
-                "https://images.unsplash.com/photo-1562774053-701939374585?w=800"
-            ],
-            "contact": {
-                "phone": "+91-22-22161234",
-                "email": "kv1mumbai@kvs.gov.in",
-                "website": "https://no1mumbai.kvs.ac.in"
-            },
-            "admission_info": {
-                "admission_start": "March 2025",
-                "admission_end": "April 2025",
-                "age_criteria": "6 years for Class I",
-                "documents_required": ["Birth Certificate", "Transfer Certificate", "Photos"]
-            },
-            "rating": 4.2,
-            "reviews_count": 156,
-            "established_year": 1963,
-            "website": "https://no1mumbai.kvs.ac.in",
-            "created_at": datetime.now()
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "The Doon School",
-            "type": "Boarding School",
-            "board": "CBSE",
-            "location": {
-                "city": "Dehradun",
-                "state": "Uttarakhand",
-                "address": "The Mall, Dehradun - 248001"
-            },
-            "fees": {
-                "annual_fee": 800000,
-                "admission_fee": 100000
-            },
-            "facilities": [
-                "Boarding Facilities",
-                "Sports Complex",
-                "Swimming Pool",
-                "Library",
-                "Labs",
-                "Music Room",
-                "Art Studio",
-                "Infirmary",
-                "Dining Hall"
-            ],
-            "description": "India's most prestigious all-boys boarding school, established in 1935.",
-            "images": [
-                "https://images.unsplash.com/photo-1562774053-701939374585?w=800",
-                "https://images.unsplash.com/photo-1580582932707-520aed937b7b?w=800"
-            ],
-            "contact": {
-                "phone": "+91-135-2526406",
-                "email": "admissions@doonschool.com",
-                "website": "https://www.doonschool.com"
-            },
-            "admission_info": {
-                "admission_start": "August 2024",
-                "admission_end": "December 2024",
-                "age_criteria": "11-13 years for entry",
-                "documents_required": ["Birth Certificate", "Medical Certificate", "Previous School Records"]
-            },
-            "rating": 4.8,
-            "reviews_count": 89,
-            "established_year": 1935,
-            "website": "https://www.doonschool.com",
-            "created_at": datetime.now()
+# (city, state, relative weight)
+CITIES = [
+    ("Delhi", "Delhi", 16),
+    ("Mumbai", "Maharashtra", 15),
+    ("Bangalore", "Karnataka", 12),
+    ("Hyderabad", "Telangana", 9),
+    ("Chennai", "Tamil Nadu", 9),
+    ("Kolkata", "West Bengal", 9),
+    ("Pune", "Maharashtra", 7),
+    ("Ahmedabad", "Gujarat", 6),
+    ("Jaipur", "Rajasthan", 4),
+    ("Lucknow", "Uttar Pradesh", 4),
+    ("Kochi", "Kerala", 3),
+    ("Chandigarh", "Chandigarh", 2),
+    ("Bhopal", "Madhya Pradesh", 2),
+    ("Dehradun", "Uttarakhand", 1),
+    ("Coimbatore", "Tamil Nadu", 1),
+]
+
+# (type, relative weight, fee multiplier)
+SCHOOL_TYPES = [
+    ("Day School", 70, 1.0),
+    ("Play School", 15, 0.5),
+    ("PU College", 8, 1.2),
+    ("Boarding School", 7, 3.5),
+]
+
+# (board, relative weight, fee multiplier)
+BOARDS = [
+    ("CBSE", 45, 1.0),
+    ("State Board", 30, 0.5),
+    ("ICSE", 18, 1.3),
+    ("IB", 7, 4.0),
+]
+
+NAME_PREFIXES = [
+    "Delhi Public", "Kendriya Vidyalaya", "DAV", "St. Mary's", "St. Joseph's", "Ryan International",
+    "National Public", "Sri Chaitanya", "Narayana", "Modern", "Little Flower", "Holy Cross",
+    "Green Valley", "Sunrise", "Vidya Mandir", "Bharatiya Vidya Bhavan", "Army Public", "Podar",
+    "Amity", "Mount Carmel", "Bishop Cotton", "Don Bosco", "Presidency", "Heritage",
+]
+NAME_SUFFIXES = {
+    "Day School": ["School", "Public School", "High School", "Vidyalaya", "Convent School"],
+    "Play School": ["Preschool", "Kids", "Play School", "Montessori"],
+    "PU College": ["PU College", "Junior College", "Pre-University College"],
+    "Boarding School": ["Residential School", "Boarding School", "International School"],
+}
+# Localities per city, so addresses stay inside the school's city
+LOCALITIES = {
+    "Delhi": ["Dwarka", "Malviya Nagar", "Rohini", "Vasant Kunj", "Mayur Vihar", "Saket"],
+    "Mumbai": ["Andheri West", "Powai", "Bandra", "Borivali", "Chembur", "Malad"],
+    "Bangalore": ["Koramangala", "Whitefield", "Indiranagar", "Jayanagar", "HSR Layout", "MG Road"],
+    "Hyderabad": ["Banjara Hills", "Jubilee Hills", "Gachibowli", "Kukatpally", "Madhapur"],
+    "Chennai": ["Anna Nagar", "Velachery", "Adyar", "T. Nagar", "Tambaram"],
+    "Kolkata": ["Salt Lake", "Ballygunge", "New Town", "Behala", "Park Street"],
+    "Pune": ["Kothrud", "Hinjewadi", "Aundh", "Viman Nagar", "MG Road"],
+    "Ahmedabad": ["Navrangpura", "Satellite", "Bopal", "Maninagar"],
+    "Jaipur": ["Malviya Nagar", "Vaishali Nagar", "Mansarovar", "C-Scheme"],
+    "Lucknow": ["Gomti Nagar", "Hazratganj", "Aliganj", "Indira Nagar"],
+    "Kochi": ["Kakkanad", "Edappally", "Vyttila", "MG Road"],
+    "Chandigarh": ["Sector 12", "Sector 35", "Sector 22", "Manimajra"],
+    "Bhopal": ["Arera Colony", "Kolar Road", "MP Nagar"],
+    "Dehradun": ["Rajpur Road", "Vasant Vihar", "Prem Nagar"],
+    "Coimbatore": ["RS Puram", "Peelamedu", "Saibaba Colony"],
+}
+FACILITIES = {
+    "Day School": [
+        "Smart Classrooms", "Computer Lab", "Science Labs", "Library", "Sports Complex",
+        "Swimming Pool", "Auditorium", "Cafeteria", "Music Room", "Art Room", "Transport",
+    ],
+    "Play School": [
+        "Play Area", "Activity Rooms", "Toy Library", "Sand Pit", "Music Room", "Art Corner",
+        "Safe Transport", "CCTV", "Day Care",
+    ],
+    "PU College": [
+        "Well-equipped Labs", "Library", "Sports Facilities", "Auditorium", "Computer Center",
+        "Cafeteria", "Hostel", "Career Counselling",
+    ],
+    "Boarding School": [
+        "Boarding Facilities", "Sports Complex", "Swimming Pool", "Library", "Labs", "Music Room",
+        "Art Studio", "Infirmary", "Dining Hall", "Horse Riding",
+    ],
+}
+IMAGES = [
+    "https://images.unsplash.com/photo-1580582932707-520aed937b7b?w=800",
+    "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?w=800",
+    "https://images.unsplash.com/photo-1562774053-701939374585?w=800",
+    "https://images.unsplash.com/photo-1587654780291-39c9404d746b?w=800",
+    "https://images.unsplash.com/photo-1503676260728-1c00da094a0b?w=800",
+]
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Rohan", "Ishaan", "Kabir", "Rajesh", "Vikram",
+    "Ananya", "Diya", "Priya", "Saanvi", "Aadhya", "Kavya", "Meera", "Lakshmi", "Neha", "Pooja",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Kumar", "Singh", "Patel", "Reddy", "Nair", "Iyer", "Gupta", "Mehta",
+    "Rao", "Menon", "Das", "Joshi", "Chatterjee", "Pillai", "Kulkarni", "Banerjee",
+]
+PROFESSIONS = [
+    "Software Engineer", "Doctor", "Teacher", "Chartered Accountant", "Civil Servant", "Lawyer",
+    "Entrepreneur", "Architect", "Scientist", "Designer", "Journalist", "Banker",
+]
+# (category, type, title stem, amount range, relative weight)
+SCHOLARSHIP_KINDS = [
+    ("academic", "merit", "Merit Scholarship", (20000, 150000), 30),
+    ("need", "need", "Education Support Grant", (10000, 80000), 25),
+    ("gender", "merit-cum-need", "Girl Child Education Scholarship", (25000, 100000), 12),
+    ("sports", "talent", "Sports Excellence Scholarship", (30000, 120000), 8),
+    ("minority", "need", "Minority Pre-Matric Scholarship", (10000, 60000), 10),
+    ("rural", "need", "Rural Talent Scholarship", (15000, 70000), 8),
+    ("disability", "need", "Inclusive Education Scholarship", (20000, 90000), 4),
+    ("arts", "talent", "Young Artists Scholarship", (15000, 75000), 3),
+]
+SCHOLARSHIP_PROVIDERS = [
+    "Ministry of Education", "State Education Department", "Tata Trusts", "Reliance Foundation",
+    "Aditya Birla Group", "Infosys Foundation", "Sports Authority of India", "HDFC Bank Parivartan",
+    "Kotak Education Foundation", "Azim Premji Foundation",
+]
+CLASSES = ["Nursery", "LKG", "UKG"] + [f"Class {n}" for n in range(1, 13)]
+
+BASE_DATE = datetime(2024, 1, 1)
+# Scholarship deadlines fall in the current and next year so that matches are open
+DEADLINE_BASE = datetime(datetime.now().year, 1, 1)
+ID_NAMESPACE = uuid.UUID("6f1c1e9a-2b57-4b8e-9d1f-3c5e7a9b0d42")
+
+
+def record_id(seed, kind, index):
+    return str(uuid.uuid5(ID_NAMESPACE, f"{seed}:{kind}:{index}"))
+
+
+def _choice_weighted(rng, table, weight_index):
+    return rng.choices(table, weights=[row[weight_index] for row in table])[0]
+
+
+def _batch_rng(seed, kind, batch):
+    return random.Random(f"{seed}:{kind}:{batch}")
+
+
+def _timestamp(rng):
+    return BASE_DATE + timedelta(seconds=rng.randrange(0, 365 * 24 * 3600))
+
+
+def school_name(rng, school_type):
+    prefix = rng.choice(NAME_PREFIXES)
+    # No "Delhi Public Public School": skip suffixes repeating a word of the prefix
+    words = set(prefix.split())
+    return f"{prefix} {rng.choice([s for s in NAME_SUFFIXES[school_type] if words.isdisjoint(s.split())])}"
+
+
+def make_school(rng, seed, index):
+    city, state, _ = _choice_weighted(rng, CITIES, 2)
+    lat, lng = CITY_COORDINATES[city]
+    school_type, _, type_multiplier = _choice_weighted(rng, SCHOOL_TYPES, 1)
+    board, _, board_multiplier = _choice_weighted(rng, BOARDS, 1)
+    if school_type == "Play School":
+        board = "Play Way Method"
+        board_multiplier = 1.0
+    elif school_type == "PU College" and rng.random() < 0.6:
+        board = f"{state} PUC"
+
+    # Log-normal fees around ~60k/yr, scaled by type and board
+    annual_fee = int(round(rng.lognormvariate(math.log(60000), 0.6) * type_multiplier * board_multiplier, -3))
+    annual_fee = max(annual_fee, 5000)
+    facilities = FACILITIES[school_type]
+    created_at = _timestamp(rng)
+    name = school_name(rng, school_type)
+    locality = rng.choice(LOCALITIES[city])
+    slug = f"school{index}"
+
+    return {
+        "id": record_id(seed, "school", index),
+        "name": f"{name}, {locality}",
+        "type": school_type,
+        "board": board,
+        "location": {
+            "city": city,
+            "state": state,
+            "address": f"{rng.randrange(1, 400)}, {locality}, {city}",
+            # Scattered ~5 km around the city centre
+            "geo": point(lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.05)),
+            "geo_source": "exact",
+            "city_key": normalize_key(city),
+            "state_key": normalize_key(state),
         },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Little Angels Preschool",
-            "type": "Play School",
-            "board": "Play Way Method",
-            "location": {
-                "city": "Bangalore",
-                "state": "Karnataka",
-                "address": "Koramangala, Bangalore - 560034"
-            },
-            "fees": {
-                "annual_fee": 45000,
-                "admission_fee": 5000
-            },
-            "facilities": [
-                "Play Area",
-                "Activity Rooms",
-                "Toy Library",
-                "Sand Pit",
-                "Music Room",
-                "Art Corner",
-                "Safe Transport"
-            ],
-            "description": "A nurturing environment for early childhood education with play-based learning.",
-            "images": [
-                "https://images.unsplash.com/photo-1587654780291-39c9404d746b?w=800",
-                "https://images.unsplash.com/photo-1503676260728-1c00da094a0b?w=800"
-            ],
-            "contact": {
-                "phone": "+91-80-25551234",
-                "email": "info@littleangels.edu.in",
-                "website": "https://www.littleangels.edu.in"
-            },
-            "admission_info": {
-                "admission_start": "January 2025",
-                "admission_end": "March 2025",
-                "age_criteria": "2-5 years",
-                "documents_required": ["Birth Certificate", "Photos", "Medical Certificate"]
-            },
-            "rating": 4.4,
-            "reviews_count": 78,
-            "established_year": 2010,
-            "website": "https://www.littleangels.edu.in",
-            "created_at": datetime.now()
+        "fees": {
+            "annual_fee": annual_fee,
+            "admission_fee": int(round(annual_fee * rng.uniform(0.05, 0.2), -2)),
         },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Christ Junior College",
-            "type": "PU College",
-            "board": "Karnataka PUC",
-            "location": {
-                "city": "Bangalore",
-                "state": "Karnataka",
-                "address": "Hosur Road, Bangalore - 560029"
-            },
-            "fees": {
-                "annual_fee": 85000,
-                "admission_fee": 15000
-            },
-            "facilities": [
-                "Well-equipped Labs",
-                "Library",
-                "Sports Facilities",
-                "Auditorium",
-                "Computer Center",
-                "Cafeteria"
-            ],
-            "description": "Premier pre-university college offering Science, Commerce, and Arts streams.",
-            "images": [
-                "https://images.unsplash.com/photo-1562774053-701939374585?w=800",
-                "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?w=800"
-            ],
-            "contact": {
-                "phone": "+91-80-40129200",
-                "email": "admissions@christjuniorcollege.in",
-                "website": "https://www.christjuniorcollege.in"
-            },
-            "admission_info": {
-                "admission_start": "May 2025",
-                "admission_end": "July 2025",
-                "age_criteria": "Completed 10th standard",
-                "documents_required": ["10th Marks Card", "Transfer Certificate", "Caste Certificate"]
-            },
-            "rating": 4.3,
-            "reviews_count": 134,
-            "established_year": 1969,
-            "website": "https://www.christjuniorcollege.in",
-            "created_at": datetime.now()
+        "facilities": rng.sample(facilities, rng.randrange(3, len(facilities) + 1)),
+        "description": f"{name} in {locality}, {city} offers {board} education.",
+        "images": rng.sample(IMAGES, rng.randrange(1, 3)),
+        "contact": {
+            "phone": f"+91-{rng.randrange(11, 99)}-{rng.randrange(20000000, 99999999)}",
+            "email": f"info@{slug}.edu.in",
+            "website": f"https://www.{slug}.edu.in",
         },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "DAV Public School",
-            "type": "Day School",
-            "board": "CBSE",
-            "location": {
-                "city": "Chennai",
-                "state": "Tamil Nadu",
-                "address": "Mogappair, Chennai - 600037"
-            },
-            "fees": {
-                "annual_fee": 65000,
-                "admission_fee": 10000
-            },
-            "facilities": [
-                "Smart Classrooms",
-                "Science Labs",
-                "Computer Lab",
-                "Library",
-                "Sports Ground",
-                "Music Room"
-            ],
-            "description": "Part of the DAV network providing value-based quality education.",
-            "images": [
-                "https://images.unsplash.com/photo-1580582932707-520aed937b7b?w=800"
-            ],
-            "contact": {
-                "phone": "+91-44-26561234",
-                "email": "davchennai@davschools.edu.in",
-                "website": "https://www.davchennai.edu.in"
-            },
-            "admission_info": {
-                "admission_start": "December 2024",
-                "admission_end": "February 2025",
-                "age_criteria": "As per CBSE norms",
-                "documents_required": ["Birth Certificate", "Transfer Certificate", "Photos"]
-            },
-            "rating": 4.1,
-            "reviews_count": 67,
-            "established_year": 1995,
-            "website": "https://www.davchennai.edu.in",
-            "created_at": datetime.now()
-        }
-    ]
-    
-    # Insert schools
-    result = await db.schools.insert_many(schools_data)
-    print(f"Inserted {len(result.inserted_ids)} schools")
-    
-    # Create some sample users
-    users_data = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Rajesh Kumar",
-            "email": "rajesh@example.com",
-            "phone": "+91-9876543210",
-            "user_type": "parent",
-            "location": {"city": "Delhi", "state": "Delhi"},
-            "created_at": datetime.now()
+        "admission_info": {
+            "admission_start": "December 2024",
+            "admission_end": "March 2025",
+            "age_criteria": "As per board norms",
+            "documents_required": ["Birth Certificate", "Address Proof", "Photos"],
         },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Priya Sharma",
-            "email": "priya@example.com",
-            "phone": "+91-9876543211",
-            "user_type": "parent",
-            "location": {"city": "Mumbai", "state": "Maharashtra"},
-            "created_at": datetime.now()
-        }
-    ]
-    
-    user_result = await db.users.insert_many(users_data)
-    print(f"Inserted {len(user_result.inserted_ids)} users")
-    
+        # Ratings cluster around 4 with a long lower tail
+        "rating": round(min(5.0, max(1.0, 5.0 - rng.gammavariate(2.0, 0.45))), 1),
+        "reviews_count": int(rng.paretovariate(1.3) * 10) - 10,
+        "established_year": rng.randrange(1900, 2021),
+        "website": f"https://www.{slug}.edu.in",
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def make_user(rng, seed, index, counts):
+    alumni = index < counts["alumni"]
+    city, state, _ = _choice_weighted(rng, CITIES, 2)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    user = {
+        "id": record_id(seed, "user", index),
+        "name": f"{first} {last}",
+        "email": f"{first.lower()}.{last.lower()}.{index}@example.com",
+        "phone": f"+91-9{rng.randrange(100000000, 999999999)}",
+        "user_type": "alumni" if alumni else rng.choices(["parent", "student"], weights=[3, 1])[0],
+        "location": {"city": city, "state": state},
+        "created_at": _timestamp(rng),
+    }
+    if alumni:
+        user["school_id"] = record_id(seed, "school", rng.randrange(counts["schools"]))
+        user["graduation_year"] = rng.randrange(1980, 2024)
+        user["profession"] = rng.choice(PROFESSIONS)
+        with_directory_keys(user)
+    return user
+
+
+def make_loan(rng, seed, index, counts):
+    # Parents and students come after the alumni block; when every user is
+    # an alumnus, any user applies
+    first = counts["alumni"] if counts["alumni"] < counts["users"] else 0
+    user_index = rng.randrange(first, counts["users"])
+    annual_fee = int(round(rng.lognormvariate(math.log(80000), 0.6), -3))
+    return {
+        "id": record_id(seed, "loan", index),
+        "user_id": record_id(seed, "user", user_index),
+        "school_id": record_id(seed, "school", rng.randrange(counts["schools"])),
+        "student_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "student_age": rng.randrange(3, 18),
+        "class_applying_for": rng.choice(CLASSES),
+        "loan_amount": int(round(annual_fee * rng.uniform(0.3, 1.5), -3)),
+        "family_income": int(round(rng.lognormvariate(math.log(600000), 0.7), -3)),
+        "documents": [],
+        "status": "pending",
+        "created_at": _timestamp(rng),
+    }
+
+
+def make_scholarship(rng, seed, index, counts):
+    category, award_type, stem, (low, high), _ = _choice_weighted(rng, SCHOLARSHIP_KINDS, 4)
+    provider = rng.choice(SCHOLARSHIP_PROVIDERS)
+    amount_min = int(round(rng.uniform(low, (low + high) / 2), -3))
+    amount_max = int(round(rng.uniform(amount_min, high), -3))
+    criteria = {}
+    if award_type in ("need", "merit-cum-need"):
+        criteria["max_family_income"] = rng.choice([250000, 400000, 600000, 800000])
+    if award_type in ("merit", "merit-cum-need"):
+        criteria["min_marks"] = rng.choice([60, 70, 75, 80, 85, 90])
+    if category == "gender":
+        criteria["gender"] = "female"
+    # Two in five are state-specific; the rest are national
+    locations = []
+    if rng.random() < 0.4:
+        locations = [rng.choice(CITIES)[1]]
+    conditions = []
+    if "max_family_income" in criteria:
+        conditions.append(f"family income below ₹{criteria['max_family_income']:,}")
+    if "min_marks" in criteria:
+        conditions.append(f"at least {criteria['min_marks']}% marks")
+    if "gender" in criteria:
+        conditions.append("girl students")
+    if locations:
+        conditions.append(f"residents of {locations[0]}")
+    eligibility = ", ".join(conditions) or "open to all school students"
+    return {
+        "id": record_id(seed, "scholarship", index),
+        "title": f"{provider} {stem}",
+        "provider": provider,
+        "category": category,
+        "type": award_type,
+        "amount_min": amount_min,
+        "amount_max": amount_max,
+        "deadline": DEADLINE_BASE + timedelta(days=rng.randrange(0, 730)),
+        "eligibility": eligibility[0].upper() + eligibility[1:],
+        "criteria": criteria,
+        "locations": locations,
+        "description": f"{stem} by {provider} for {category} applicants.",
+        "apply_url": f"https://scholarships.example.com/{index}",
+        "requirements": rng.sample(["Mark sheets", "Income certificate", "Aadhaar card", "Bank details",
+                                    "School bonafide certificate", "Caste certificate", "Photograph"], 3),
+        "created_at": _timestamp(rng),
+    }
+
+
+GENERATORS = {
+    "schools": lambda rng, seed, index, counts: make_school(rng, seed, index),
+    "users": make_user,
+    "loan_applications": make_loan,
+    "scholarships": make_scholarship,
+}
+
+
+def generate_batch(kind, seed, batch, batch_size, counts):
+    rng = _batch_rng(seed, kind, batch)
+    start = batch * batch_size
+    end = min(start + batch_size, counts[kind])
+    make = GENERATORS[kind]
+    return [make(rng, seed, index, counts) for index in range(start, end)]
+
+
+class Progress:
+    def __init__(self, kind, total):
+        self.kind = kind
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def advance(self, count):
+        self.done += count
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        print(
+            f"\r{self.kind:<18}{self.done:>10}/{self.total:<10}"
+            f"{100 * self.done / self.total:6.1f}%{rate:>10.0f} docs/s  eta {eta:6.1f}s",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"\n{self.kind}: {self.done} documents in {elapsed:.1f}s", file=sys.stderr)
+
+
+async def load_collection(db, kind, seed, counts, batch_size, concurrency):
+    total = counts[kind]
+    if total <= 0:
+        return
+    progress = Progress(kind, total)
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = (total + batch_size - 1) // batch_size
+
+    async def write(documents):
+        try:
+            await db[kind].insert_many(documents, ordered=False)
+        finally:
+            semaphore.release()
+        progress.advance(len(documents))
+
+    tasks = []
+    for batch in range(batches):
+        # Acquire before generating so at most `concurrency` batches are in
+        # memory; generation runs in a thread so the inserts keep flowing
+        await semaphore.acquire()
+        documents = await asyncio.to_thread(generate_batch, kind, seed, batch, batch_size, counts)
+        tasks.append(asyncio.create_task(write(documents)))
+    await asyncio.gather(*tasks)
+    progress.finish()
+
+
+def dataset_counts(schools, users=None, alumni=None, loans=None, scholarships=None):
+    users = users if users is not None else max(schools // 2, 2)
+    alumni = alumni if alumni is not None else users // 5
+    return {
+        "schools": schools,
+        "users": users,
+        "alumni": min(alumni, users),
+        "loan_applications": loans if loans is not None else users // 4,
+        "scholarships": scholarships if scholarships is not None else min(max(schools // 100, 50), 5000),
+    }
+
+
+async def populate(counts, seed, batch_size=5000, concurrency=4, database=None, drop=True, indexes=True):
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[database] if database else client.schooldekho
+    try:
+        if drop:
+            for kind in GENERATORS:
+                await db[kind].drop()
+        for kind in GENERATORS:
+            await load_collection(db, kind, seed, counts, batch_size, concurrency)
+        started = time.perf_counter()
+        if drop:
+            await db.alumni_stats.drop()
+        schools = await rebuild_stats(db.users, db.alumni_stats)
+        print(f"alumni aggregates for {schools} schools in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        if indexes:
+            started = time.perf_counter()
+            await reconcile_indexes(db)
+            print(f"indexes reconciled in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schools", type=int, default=1000)
+    parser.add_argument("--users", type=int, help="default: half the number of schools")
+    parser.add_argument("--alumni", type=int, help="how many of the users are alumni (default: a fifth)")
+    parser.add_argument("--loans", type=int, help="default: a quarter of the number of users")
+    parser.add_argument("--scholarships", type=int, help="default: one per hundred schools, 50 to 5000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--database", help="database name (default: schooldekho)")
+    parser.add_argument("--append", action="store_true", help="keep existing documents")
+    parser.add_argument("--no-indexes", action="store_true", help="skip index reconciliation")
+    args = parser.parse_args()
+
+    counts = dataset_counts(args.schools, args.users, args.alumni, args.loans, args.scholarships)
+    asyncio.run(populate(
+        counts,
+        args.seed,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        database=args.database,
+        drop=not args.append,
+        indexes=not args.no_indexes,
+    ))
     print("Mock data population completed successfully!")
-    client.close()
+
 
 if __name__ == "__main__":
-    asyncio.run(populate_schools())
\ No newline at end of file
+    main()
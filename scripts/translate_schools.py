@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Batch-translate school names, descriptions and facilities.
+
+Stores the variants in school.translations (see backend/translations.py).
+Only fields whose English text changed since their last translation are
+sent to the translator, so re-running after edits is cheap. Running API
+processes pick the new text up as their detail cache (SCHOOL_CACHE_TTL)
+and leaderboards (LEADERBOARD_REFRESH) expire.
+
+    python scripts/translate_schools.py --translator dictionary
+    python scripts/translate_schools.py --translator google --languages hi ta --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from translations import DEFAULT_LANGUAGE, LANGUAGES, TRANSLATED_FIELDS, TRANSLATORS, pending_update  # noqa: E402
+
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/schooldekho")
+
+
+async def translate(db, translator, languages, batch_size, concurrency, dry_run):
+    projection = {"_id": 0, "id": 1, "translations": 1, **{field: 1 for field in TRANSLATED_FIELDS}}
+    semaphore = asyncio.Semaphore(concurrency)
+    scanned = changed = 0
+    operations = []
+    started = time.perf_counter()
+
+    async def plan(school):
+        async with semaphore:
+            # Translators may block on the network
+            return school["id"], await asyncio.to_thread(pending_update, school, translator, languages)
+
+    async def flush():
+        nonlocal operations
+        if operations and not dry_run:
+            await db.schools.bulk_write(operations, ordered=False)
+        operations = []
+
+    pending = []
+    async for school in db.schools.find({}, projection).batch_size(batch_size):
+        scanned += 1
+        pending.append(asyncio.create_task(plan(school)))
+        if len(pending) >= batch_size:
+            for school_id, update in await asyncio.gather(*pending):
+                if update:
+                    changed += 1
+                    operations.append(UpdateOne({"id": school_id}, update))
+            pending = []
+            await flush()
+            print(f"\r{scanned} schools scanned, {changed} updated", end="", file=sys.stderr)
+    for school_id, update in await asyncio.gather(*pending):
+        if update:
+            changed += 1
+            operations.append(UpdateOne({"id": school_id}, update))
+    await flush()
+    elapsed = time.perf_counter() - started
+    action = "would update" if dry_run else "updated"
+    print(f"\r{scanned} schools scanned, {changed} {action} in {elapsed:.1f}s", file=sys.stderr)
+
+
+async def run(args, translator):
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[args.database] if args.database else client.schooldekho
+    try:
+        await translate(db, translator, args.languages, args.batch_size, args.concurrency, args.dry_run)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--translator", choices=sorted(TRANSLATORS), default="dictionary")
+    parser.add_argument("--glossary", help="glossary JSON for the dictionary translator")
+    parser.add_argument("--languages", nargs="+", choices=[lang for lang in LANGUAGES if lang != DEFAULT_LANGUAGE],
+                        default=[lang for lang in LANGUAGES if lang != DEFAULT_LANGUAGE])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8, help="schools translated at once")
+    parser.add_argument("--database", help="database name (default: schooldekho)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    if args.glossary and args.translator == "dictionary":
+        translator = TRANSLATORS["dictionary"](args.glossary)
+    else:
+        try:
+            translator = TRANSLATORS[args.translator]()
+        except ImportError as e:
+            parser.error(f"--translator {args.translator} needs {e.name}; pip install googletrans==3.1.0a0")
+
+    asyncio.run(run(args, translator))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules import each other as top-level modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+from bson import ObjectId
+
+from catalogue import SchoolCatalogue
+
+RATING = [("rating", -1), ("reviews_count", -1), ("_id", 1)]
+FEE = [("fees.annual_fee", 1), ("_id", 1)]
+
+
+def make_school(school_id, oid, board="CBSE", city="Pune", fee=None, rating=None, reviews=0, **extra):
+    school = {
+        "_id": oid,
+        "id": school_id,
+        "type": "Day School",
+        "board": board,
+        "location": {"city": city},
+        "rating": rating,
+        "reviews_count": reviews,
+        "fees": {"annual_fee": fee} if fee is not None else {},
+    }
+    school.update(extra)
+    return school
+
+
+@pytest.fixture
+def catalogue():
+    oids = sorted(ObjectId() for _ in range(6))
+    catalogue = SchoolCatalogue(capacity=2)
+    for school in [
+        make_school("a", oids[0], fee=50000, rating=4.5, reviews=10),
+        make_school("b", oids[1], fee=90000, rating=4.5, reviews=10),
+        make_school("c", oids[2], board="ICSE", city="Bengaluru", fee=120000, rating=4.8, reviews=3),
+        make_school("d", oids[3], city="Mumbai", rating=3.9, reviews=50),
+        make_school("e", oids[4], board="ICSE", city="Bangalore East", fee=70000),
+        make_school("f", oids[5], city="Pune", fee=60000, rating=4.5, reviews=12),
+    ]:
+        catalogue.upsert(school)
+    return catalogue
+
+
+def test_rating_order_breaks_ties_on_id(catalogue):
+    ids, total = catalogue.query(RATING, 0, 10)
+    assert total == 6
+    # Missing ratings sort last descending
+    assert ids == ["c", "f", "a", "b", "d", "e"]
+
+
+def test_fee_order_puts_missing_fees_first(catalogue):
+    ids, _ = catalogue.query(FEE, 0, 10)
+    assert ids == ["d", "a", "f", "e", "b", "c"]
+    descending = [(field, -direction) for field, direction in FEE]
+    assert catalogue.query(descending, 0, 10)[0] == ["c", "b", "e", "f", "a", "d"]
+
+
+def test_paging(catalogue):
+    assert catalogue.query(RATING, 2, 2) == (["a", "b"], 6)
+    assert catalogue.query(RATING, 10, 2) == ([], 6)
+
+
+def test_board_and_fee_masks(catalogue):
+    assert catalogue.query(FEE, 0, 10, board="ICSE") == (["e", "c"], 2)
+    # Fee ranges never match schools without a fee; a bound of 0 is no bound
+    assert catalogue.query(FEE, 0, 10, min_fee=60000, max_fee=100000) == (["f", "e", "b"], 3)
+    assert catalogue.count(min_fee=0) == 6
+    assert catalogue.count(board="IB") == 0
+    assert catalogue.count(school_type="Boarding School") == 0
+
+
+def test_city_masks(catalogue):
+    assert catalogue.count(city="bangalore", city_match="exact") == 1
+    assert catalogue.count(city="Beng") == 2
+    assert catalogue.count(city="pune", city_match="exact") == 3
+
+
+def test_upsert_and_remove_update_the_order(catalogue):
+    catalogue.query(RATING, 0, 10)
+    catalogue.upsert(make_school("d", catalogue_oid(catalogue, "d"), city="Mumbai", rating=5.0, reviews=50))
+    assert catalogue.query(RATING, 0, 1)[0] == ["d"]
+    catalogue.remove("c")
+    assert "c" not in catalogue.query(RATING, 0, 10)[0]
+    assert catalogue.count() == 5
+    assert len(catalogue) == 5
+
+
+def catalogue_oid(catalogue, school_id):
+    row = catalogue.rows[school_id]
+    high, low = int(catalogue.oid_high[row]), int(catalogue.oid_low[row])
+    return ObjectId(high.to_bytes(4, "big") + low.to_bytes(8, "big"))
+
+
+def test_patched_permutations_match_a_fresh_sort():
+    rng = random.Random(3)
+    catalogue = SchoolCatalogue(capacity=4)
+    specs = [RATING, FEE, [(field, -direction) for field, direction in RATING], [("_id", 1)]]
+
+    def random_school(school_id):
+        return make_school(
+            school_id, ObjectId(), fee=rng.choice([None, 50000, 90000]), rating=rng.choice([None, 3.5, 4.0, 4.5]),
+            reviews=rng.randrange(3),
+        )
+
+    for i in range(50):
+        catalogue.upsert(random_school(f"s{i}"))
+    for spec in specs:
+        catalogue.query(spec, 0, 1)
+    for i in range(200):
+        school_id = f"s{rng.randrange(80)}"
+        if rng.random() < 0.2:
+            catalogue.remove(school_id)
+        else:
+            catalogue.upsert(random_school(school_id))
+    for spec in specs:
+        assert catalogue._order(spec).tolist() == catalogue._sort(spec, len(catalogue.ids)).tolist()
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from coordination import Lease, SchoolChangeFeed
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient().db
+
+
+def test_change_feed_replays_other_workers_writes_once(db):
+    replayed = []
+
+    async def apply(school_id, school, previous):
+        replayed.append((school_id, school, previous))
+
+    async def scenario():
+        writer = SchoolChangeFeed(db.school_changes, apply, origin="writer")
+        await writer.record("old", {"id": "old"}, None)
+        reader = SchoolChangeFeed(db.school_changes, apply, origin="reader")
+        await reader.start()
+        await writer.record("a", {"id": "a"}, None)
+        await reader.record("b", {"id": "b"}, None)
+        first = await reader.poll()
+        second = await reader.poll()
+        return first, second
+
+    # Writes logged before start are not replayed, nor the reader's own
+    assert asyncio.run(scenario()) == (1, 0)
+    assert replayed == [("a", {"id": "a"}, None)]
+
+
+def test_run_once_keeps_the_lease_after_the_job(db):
+    runs = []
+
+    async def job():
+        runs.append(1)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        first, second = Lease(db.leases, holder="one"), Lease(db.leases, holder="two")
+        assert await first.run_once("backfill", job)
+        assert not await second.run_once("backfill", job)
+        with pytest.raises(RuntimeError):
+            await first.run_once("rebuild", failing)
+        # A failed job frees the lease for the next worker
+        assert await second.run_once("rebuild", job)
+        return await db.leases.find_one({"_id": "backfill"})
+
+    lease = asyncio.run(scenario())
+    assert runs == [1, 1]
+    assert lease["holder"] == "one" and "completed_at" in lease
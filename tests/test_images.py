@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import httpx
+import pytest
+
+import images
+from images import UnsafeURL, check_public_url, pinned_request
+
+
+class Handler(BaseHTTPRequestHandler):
+    hosts = []
+
+    def do_GET(self):
+        Handler.hosts.append(self.headers["Host"])
+        if self.path == "/old":
+            self.send_response(302)
+            self.send_header("Location", "/new")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"image")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+
+
+def test_private_addresses_are_refused():
+    with pytest.raises(UnsafeURL):
+        asyncio.run(check_public_url(httpx.URL("http://127.0.0.1/a.jpg")))
+    with pytest.raises(UnsafeURL):
+        asyncio.run(check_public_url(httpx.URL("file:///etc/passwd")))
+
+
+def test_pinned_request_keeps_the_host():
+    client = httpx.AsyncClient()
+    request = pinned_request(client, httpx.URL("https://photos.example:8443/a.jpg?w=800"), "2001:db8::1")
+    assert str(request.url) == "https://[2001:db8::1]:8443/a.jpg?w=800"
+    assert request.headers["Host"] == "photos.example:8443"
+    assert request.extensions["sni_hostname"] == "photos.example"
+
+
+def test_fetch_connects_to_the_vetted_address(server, monkeypatch):
+    vetted = []
+
+    async def check(url):
+        vetted.append(url.host)
+        # Whatever "localhost" resolves to on the second lookup is never used
+        return "127.0.0.1"
+
+    monkeypatch.setattr(images, "check_public_url", check)
+
+    async def fetch():
+        service = images.ImageService.__new__(images.ImageService)
+        async with httpx.AsyncClient(follow_redirects=False) as client:
+            async with service._fetch(client, f"http://school-photos.test:{server}/old") as response:
+                return await response.aread()
+
+    Handler.hosts.clear()
+    assert asyncio.run(fetch()) == b"image"
+    assert vetted == ["school-photos.test", "school-photos.test"]
+    assert Handler.hosts == [f"school-photos.test:{server}"] * 2
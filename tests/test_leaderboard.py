@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from leaderboard import Leaderboards, cell_of, legacy_leaderboard_pipeline
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def make_school(school_id, city="pune", board="CBSE", school_type="Day School", rating=4.0, name="School"):
+    return {"id": school_id, "name": name, "board": board, "type": school_type, "rating": rating,
+            "reviews_count": 10, "location": {"city_key": city}}
+
+
+def serialize(doc):
+    doc = dict(doc)
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+@pytest.fixture
+def schools():
+    collection = mongomock_motor.AsyncMongoMockClient().db.schools
+    asyncio.run(collection.insert_many([
+        make_school("a", rating=4.5), make_school("b", rating=3.0), make_school("c", board="ICSE", rating=5.0),
+        make_school("d", city="mumbai", rating=4.0), make_school("e", board=None, rating=2.0),
+    ]))
+    return collection
+
+
+def names(result):
+    return [school["id"] for school in result[0]], result[1]
+
+
+def test_snapshot_answers_cells_and_wildcards(schools):
+    boards = Leaderboards(top_k=3)
+    assert boards.lookup("pune", None, None, "prefix", 0, 3) is None
+    asyncio.run(boards.refresh(schools, serialize))
+    assert boards._pipeline is legacy_leaderboard_pipeline
+    assert names(boards.lookup("pune", "CBSE", None, "prefix", 0, 3)) == (["a", "b"], 2)
+    assert names(boards.lookup("pune", None, None, "prefix", 0, 3)) == (["c", "a", "b"], 4)
+    assert names(boards.lookup("pu", None, None, "prefix", 1, 2)) == (["a", "b"], 4)
+    # Deeper than the snapshot keeps
+    assert boards.lookup("pune", None, None, "prefix", 2, 2) is None
+
+
+def test_writes_stale_only_the_cells_they_change(schools):
+    boards = Leaderboards(top_k=3)
+    asyncio.run(boards.refresh(schools, serialize))
+    a = make_school("a", rating=4.5)
+
+    # Unranked fields of a school no top list shows
+    boards.mark_written(dict(make_school("x", city="delhi"), name="New"), make_school("x", city="delhi"))
+    assert not boards._stale
+    # Shown in its cell's top list
+    boards.mark_written(dict(a, name="Renamed"), a)
+    assert boards._stale == {cell_of(a)}
+    assert boards.lookup("pune", "CBSE", None, "prefix", 0, 3) is None
+    # Other cells keep answering
+    assert boards.lookup("pune", "ICSE", None, "prefix", 0, 3) is not None
+    assert boards.lookup("mumbai", None, None, "prefix", 0, 3) is not None
+
+    boards._stale.clear()
+    boards.mark_written(dict(a, rating=1.0), a)
+    assert boards._stale == {cell_of(a)}
+    boards._stale.clear()
+    moved = make_school("a", city="mumbai", rating=4.5)
+    boards.mark_written(moved, a)
+    assert boards._stale == {cell_of(a), cell_of(moved)}
+
+
+def test_refreshing_stale_cells(schools):
+    boards = Leaderboards(top_k=3)
+    asyncio.run(boards.refresh(schools, serialize))
+    previous = make_school("d", city="mumbai", rating=4.0)
+    moved = make_school("d", rating=4.9)
+    asyncio.run(schools.replace_one({"id": "d"}, moved))
+    boards.mark_written(moved, previous)
+    asyncio.run(boards.refresh(schools, serialize, set(boards._stale)))
+    assert not boards._stale
+    assert names(boards.lookup("pune", "CBSE", None, "prefix", 0, 3)) == (["d", "a", "b"], 3)
+    # The emptied cell is gone
+    assert boards.lookup("mumbai", None, None, "prefix", 0, 3) == ([], 0)
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+
+from loan_scoring import DEFAULT_TERMS, emi, schedule, score_batch
+
+
+def test_emi_matches_amortization_formula():
+    principal, rate, months = 100000.0, 0.12, 12
+    r = rate / 12
+    expected = principal * r * (1 + r) ** months / ((1 + r) ** months - 1)
+    assert math.isclose(emi(np.array([principal]), rate, months)[0], expected)
+
+
+def test_emi_at_zero_rate_is_straight_line():
+    assert emi(np.array([1200.0, 0.0]), 0.0, 12).tolist() == [100.0, 0.0]
+
+
+def test_schedule_pays_off_the_principal():
+    rows = schedule(50000, DEFAULT_TERMS)
+    assert len(rows) == DEFAULT_TERMS["tenure_months"]
+    assert rows[-1]["balance"] == 0.0
+    assert math.isclose(sum(row["principal"] for row in rows), 50000, abs_tol=1.0)
+
+
+def test_score_batch_eligibility():
+    terms = dict(DEFAULT_TERMS)
+    result = score_batch(
+        amounts=[100000, 100000, 5000, 300000, 100000],
+        incomes=[1200000, 60000, 1200000, 1200000, 0],
+        annual_fees=[100000, 100000, 100000, 100000, float("nan")],
+        terms=terms,
+    )
+    # Affordable and within fees; EMI above 40% of income; under min_amount;
+    # over 1.5x the fee; no income at all
+    assert result["eligible"].tolist() == [True, False, False, False, False]
+    assert result["affordable"].tolist() == [True, False, True, True, False]
+    assert result["large_enough"].tolist() == [True, True, False, True, True]
+    assert result["within_fees"].tolist() == [True, True, True, False, True]
+    assert np.isinf(result["emi_ratio"][4])
+    assert (result["score"][~result["eligible"]] == 0).all()
+    assert 0 < result["score"][0] <= 100
+
+
+def test_score_batch_unknown_fee():
+    result = score_batch([100000, 100000], [1200000, 1200000], [float("nan"), 100000], DEFAULT_TERMS)
+    assert np.isnan(result["fee_coverage"][0])
+    assert result["within_fees"][0]
+    # An unknown fee only gets part of the fee-fit share
+    assert result["score"][0] < result["score"][1]
+
+
+def test_score_batch_prefers_more_headroom():
+    result = score_batch([100000, 100000], [2400000, 1200000], [100000, 100000], DEFAULT_TERMS)
+    assert result["score"][0] > result["score"][1]
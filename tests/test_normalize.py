@@ -0,0 +1,43 @@
+from normalize import city_condition, matches_city, normalize_key, prefix_keys
+
+
+def test_normalize_key_folds_case_diacritics_and_punctuation():
+    assert normalize_key("  SÃO   Tomé ") == "sao tome"
+    assert normalize_key("St. John's") == "st johns"
+    assert normalize_key("") == ""
+    assert normalize_key(None) == ""
+
+
+def test_normalize_key_maps_aliases():
+    assert normalize_key("Bengaluru") == "bangalore"
+    assert normalize_key("BOMBAY") == "mumbai"
+    assert normalize_key("New Delhi") == "delhi"
+    assert normalize_key("बेंगलुरु") == "bangalore"
+    # Word by word inside longer names
+    assert normalize_key("Bombay Scottish School") == "mumbai scottish school"
+
+
+def test_normalize_key_keeps_indic_combining_marks():
+    assert normalize_key("कानपुर") == "कानपुर"
+
+
+def test_prefix_keys_expand_partial_aliases():
+    assert prefix_keys("beng") == ["beng", "bangalore"]
+    assert prefix_keys("Bengaluru") == ["bangalore"]
+    assert "mumbai" in prefix_keys("bom")
+    assert prefix_keys("south bom") == ["south bom", "south mumbai"]
+    assert prefix_keys("") == []
+
+
+def test_matches_city():
+    assert matches_city("bangalore", "Beng")
+    assert matches_city("bangalore", "bengaluru", "exact")
+    assert not matches_city("bangalore east", "bangalore", "exact")
+    assert not matches_city("mumbai", "beng")
+
+
+def test_city_condition():
+    assert city_condition("Bengaluru", "exact") == "bangalore"
+    assert city_condition("pun") == {"$regex": "^pun"}
+    condition = city_condition("beng")
+    assert [pattern.pattern for pattern in condition["$in"]] == ["^beng", "^bangalore"]
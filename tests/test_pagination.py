@@ -0,0 +1,75 @@
+import pytest
+from bson import ObjectId
+
+from pagination import (
+    InvalidCursor, apply_cursor, cursor_for, decode_cursor, decode_offset_cursor, encode_cursor, keyset_filter,
+)
+
+SORT = [("rating", -1), ("reviews_count", -1), ("_id", 1)]
+
+
+def test_keyset_filter_single_field():
+    assert keyset_filter([("_id", 1)], [5]) == {"_id": {"$gt": 5}}
+    assert keyset_filter([("rating", -1)], [4.5]) == {"rating": {"$lt": 4.5}}
+
+
+def test_keyset_filter_compound():
+    oid = ObjectId()
+    assert keyset_filter(SORT, [4.5, 10, oid]) == {"$or": [
+        {"rating": {"$lt": 4.5}},
+        {"rating": 4.5, "reviews_count": {"$lt": 10}},
+        {"rating": 4.5, "reviews_count": 10, "_id": {"$gt": oid}},
+    ]}
+
+
+def test_keyset_filter_rejects_mismatched_cursor():
+    with pytest.raises(InvalidCursor):
+        keyset_filter(SORT, [4.5])
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    doc = {"_id": oid, "rating": 4.2, "reviews_count": 7, "fees": {"annual_fee": 90000}}
+    token = cursor_for(doc, SORT + [("fees.annual_fee", 1)])
+    assert decode_cursor(token) == [4.2, 7, oid, 90000]
+    assert decode_cursor(encode_cursor([])) == []
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not a cursor")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor({"a": 1}))
+
+
+@pytest.mark.parametrize("values", [[], [-1], ["10"], [1.5], [True], [10, 20]])
+def test_decode_offset_cursor_rejects_bad_offsets(values):
+    with pytest.raises(InvalidCursor):
+        decode_offset_cursor(encode_cursor(values))
+
+
+def test_decode_offset_cursor():
+    assert decode_offset_cursor(encode_cursor([40])) == 40
+
+
+def test_apply_cursor():
+    assert apply_cursor({"board": "CBSE"}, [("_id", 1)], "") == {"board": "CBSE"}
+    token = encode_cursor([3])
+    assert apply_cursor({}, [("_id", 1)], token) == {"_id": {"$gt": 3}}
+    assert apply_cursor({"board": "CBSE"}, [("_id", 1)], token) == {"$and": [{"board": "CBSE"}, {"_id": {"$gt": 3}}]}
+
+
+def test_keyset_pages_cover_every_document_once():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().db.schools
+    # Plenty of ties on the leading sort keys
+    collection.insert_many([{"rating": i % 3, "reviews_count": i % 2} for i in range(25)])
+    seen, token = [], ""
+    while True:
+        query = apply_cursor({}, SORT, token)
+        page = list(collection.find(query).sort(SORT).limit(4))
+        seen += [doc["_id"] for doc in page]
+        if len(page) < 4:
+            break
+        token = cursor_for(page[-1], SORT)
+    assert seen == [doc["_id"] for doc in collection.find().sort(SORT)]
@@ -0,0 +1,38 @@
+import random
+
+from scholarships import IntervalTree
+
+
+def brute_force(intervals, lo, hi):
+    return {key for start, end, key in intervals if start <= hi and end >= lo}
+
+
+def test_empty_tree():
+    assert IntervalTree([]).overlapping(0, 100) == set()
+
+
+def test_closed_endpoints():
+    tree = IntervalTree([(10, 20, "a"), (20, 30, "b"), (31, 40, "c")])
+    assert tree.overlapping(20, 20) == {"a", "b"}
+    assert tree.overlapping(30, 31) == {"b", "c"}
+    assert tree.overlapping(0, 9) == set()
+    assert tree.overlapping(41, 50) == set()
+
+
+def test_point_intervals():
+    tree = IntervalTree([(5, 5, "a"), (5, 5, "b"), (7, 7, "c")])
+    assert tree.overlapping(5, 6) == {"a", "b"}
+    assert tree.overlapping(0, 10) == {"a", "b", "c"}
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(500):
+        lo = rng.randrange(0, 1000)
+        intervals.append((lo, lo + rng.randrange(0, 200), f"s{i}"))
+    tree = IntervalTree(intervals)
+    for _ in range(300):
+        lo = rng.randrange(-50, 1250)
+        hi = lo + rng.randrange(0, 300)
+        assert tree.overlapping(lo, hi) == brute_force(intervals, lo, hi)
@@ -0,0 +1,100 @@
+import search
+from search import SchoolSearchIndex, tokenize
+
+
+def make_school(school_id, name, city="Pune", board="CBSE", school_type="Day School", fee=100000, rating=4.0,
+                facilities=("Library",), address=""):
+    return {
+        "id": school_id,
+        "name": name,
+        "type": school_type,
+        "board": board,
+        "location": {"city": city, "address": address},
+        "facilities": list(facilities),
+        "fees": {"annual_fee": fee},
+        "rating": rating,
+    }
+
+
+def build(*schools):
+    index = SchoolSearchIndex(capacity=2)
+    for school in schools:
+        index.upsert(school)
+    return index
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Sánt  Xavier's, PUNE") == ["sant", "xavier", "s", "pune"]
+    assert tokenize(None) == []
+
+
+def test_name_matches_rank_above_other_fields():
+    index = build(
+        make_school("name", "Greenwood High"),
+        make_school("facility", "Oak School", facilities=("Greenwood Garden",)),
+    )
+    assert index.search("greenwood") == (["name", "facility"], 2)
+
+
+def test_every_token_must_match():
+    index = build(make_school("a", "Delhi Public School"), make_school("b", "Public Academy", city="Delhi"),
+                  make_school("c", "Public School"))
+    ids, total = index.search("delhi public")
+    assert total == 2
+    assert set(ids) == {"a", "b"}
+
+
+def test_prefix_on_last_token_and_typos():
+    index = build(make_school("a", "International School"), make_school("b", "Interior Design Institute"))
+    assert index.search("internat")[0] == ["a"]
+    assert index.search("internatonal")[0] == ["a"]
+    # Only the last token is a prefix
+    assert index.search("inter school") == ([], 0)
+
+
+def test_ties_break_on_rating():
+    index = build(make_school("low", "Valley School", rating=3.0), make_school("high", "Valley School", rating=4.5))
+    assert index.search("valley")[0] == ["high", "low"]
+
+
+def test_filters():
+    index = build(
+        make_school("a", "Sunrise School", city="Bengaluru", board="ICSE", fee=80000),
+        make_school("b", "Sunrise School", city="Mumbai", fee=None),
+        make_school("c", "Sunrise School", city="Bangalore East", school_type="Boarding School", fee=200000),
+    )
+    assert index.search("sunrise", board="ICSE")[0] == ["a"]
+    assert index.search("sunrise", school_type="Boarding School")[0] == ["c"]
+    assert sorted(index.search("sunrise", city="beng")[0]) == ["a", "c"]
+    assert index.search("sunrise", city="bangalore", city_match="exact")[0] == ["a"]
+    # Fee bounds never match schools without a fee
+    assert sorted(index.search("sunrise", min_fee=50000)[0]) == ["a", "c"]
+    assert index.search("sunrise", max_fee=100000)[0] == ["a"]
+    assert index.search("sunrise", board="IB") == ([], 0)
+
+
+def test_upsert_replaces_and_remove_forgets():
+    index = build(make_school("a", "Maple School"))
+    index.upsert(make_school("a", "Cedar School"))
+    assert index.search("maple") == ([], 0)
+    assert index.search("cedar")[0] == ["a"]
+    index.remove("a")
+    assert index.search("cedar") == ([], 0)
+    assert len(index) == 0
+    # The freed slot is reused
+    index.upsert(make_school("b", "Birch School"))
+    assert index.search("school")[0] == ["b"]
+
+
+def test_deep_pages_are_never_empty(monkeypatch):
+    monkeypatch.setattr(search, "MAX_SCORED", 5)
+    index = build(*(make_school(f"s{i:02d}", "Lotus School", rating=i / 10) for i in range(30)))
+    seen = []
+    for offset in range(0, 30, 10):
+        ids, total = index.search("school", offset=offset, limit=10)
+        assert total == 30
+        assert len(ids) == 10
+        seen += ids
+    assert sorted(seen) == sorted(f"s{i:02d}" for i in range(30))
+    # Scoring is bounded, but the best-rated matches still lead
+    assert index.search("school", limit=3)[0] == ["s29", "s28", "s27"]
@@ -0,0 +1,27 @@
+import serialization
+from serialization import DESCRIPTION_PREVIEW, FieldSet
+
+
+def test_default_fields_preview_description_in_projection():
+    projection = FieldSet.parse(None).projection(lang="hi")
+    assert projection["description"]["$substrCP"][2] == DESCRIPTION_PREVIEW
+    assert "$substrCP" in projection["translations.hi.description"]
+    # Explicit fieldsets return the whole description
+    assert FieldSet.parse("name,description").projection()["description"] == 1
+
+
+def test_trim_only_when_previewing_in_python(monkeypatch):
+    field_set = FieldSet.parse(None)
+    doc = {"description": "x" * 500}
+    assert len(field_set.trim(dict(doc))["description"]) == 500
+
+    monkeypatch.setattr(serialization, "PREVIEW_IN_PYTHON", True)
+    assert field_set.projection()["description"] == 1
+    assert len(field_set.trim(dict(doc))["description"]) == DESCRIPTION_PREVIEW
+
+
+def test_apply_always_cuts_in_memory_documents():
+    doc = {"_id": 1, "id": "a", "name": "A", "description": "x" * 500, "contact": {}}
+    projected = FieldSet.parse(None).apply(doc)
+    assert len(projected["description"]) == DESCRIPTION_PREVIEW
+    assert "contact" not in projected
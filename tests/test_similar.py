@@ -0,0 +1,59 @@
+from similar import SimilarSchools
+
+
+def school(school_id, board="CBSE", school_type="Day School", city="Pune", fee=100000, rating=4.0,
+           facilities=("Library", "Lab")):
+    return {
+        "id": school_id,
+        "board": board,
+        "type": school_type,
+        "location": {"city": city},
+        "fees": {"annual_fee": fee},
+        "rating": rating,
+        "facilities": list(facilities),
+    }
+
+
+SCHOOLS = [
+    school("a"),
+    school("twin"),
+    school("other-city", city="Mumbai"),
+    school("other-board", board="IB", school_type="Boarding School", fee=600000, rating=2.5, facilities=("Pool",)),
+    school("bengaluru", city="Bengaluru"),
+]
+
+
+def test_unknown_school():
+    assert SimilarSchools(SCHOOLS).similar("missing") is None
+
+
+def test_ranking_and_self_exclusion():
+    ranked = SimilarSchools(SCHOOLS).similar("a", limit=10)
+    ids = [school_id for school_id, _ in ranked]
+    assert "a" not in ids
+    assert ids[0] == "twin"
+    assert ids[-1] == "other-board"
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_limit():
+    assert len(SimilarSchools(SCHOOLS).similar("a", limit=2)) == 2
+
+
+def test_city_aliases_share_a_code():
+    index = SimilarSchools(SCHOOLS + [school("bangalore", city="Bangalore")])
+    assert index.similar("bangalore", limit=1)[0][0] == "bengaluru"
+
+
+def test_upsert_and_remove():
+    index = SimilarSchools(SCHOOLS)
+    index.remove("twin")
+    assert "twin" not in [school_id for school_id, _ in index.similar("a")]
+    index.upsert(school("twin"))
+    assert index.similar("a", limit=1)[0][0] == "twin"
+    # Growing past the initial capacity keeps existing rows
+    for i in range(1100):
+        index.upsert(school(f"extra{i}", board="State Board", city="Agra", facilities=()))
+    assert index.similar("a", limit=1)[0][0] == "twin"
+    assert len(index) == len(SCHOOLS) + 1100